@@ -1,19 +1,25 @@
 import os
-import uuid
-from flask import Flask, render_template, request, send_from_directory, url_for
+from flask import Flask, Response, abort, jsonify, redirect, render_template, request, send_file, send_from_directory, url_for
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from carousel_generator import CarouselGenerator
 from youtube_extractor import get_transcript_text
-from content_processor import process_content
+from content_processor import process_content, regenerate_slides, summarize_source
+from config import METRICS_SETTINGS, OUTPUT_SETTINGS, PROFILING_SETTINGS, SERVING_SETTINGS
+from metrics import job_context, render_prometheus
+from output_store import get_output_store, start_cache_gc
+from prewarm import start_prewarm
+from profiler import profile_job
+from slide_assets import MIMETYPES, content_hash, variant_path
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'static/uploads'
-app.config['OUTPUT_FOLDER'] = 'static/output'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
 
-# Ensure directories exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
+# Per-request output (and uploaded logos) live in one job directory that the
+# store garbage-collects in the background
+output_store = get_output_store(OUTPUT_SETTINGS["flask_output_root"])
+app.config['OUTPUT_FOLDER'] = output_store.root
+start_cache_gc()
 
 @app.route('/')
 def index():
@@ -25,23 +31,28 @@ def generate():
     logo_file = request.files.get('logo')
     
     # Create unique session ID
-    session_id = str(uuid.uuid4())
-    session_output_dir = os.path.join(app.config['OUTPUT_FOLDER'], session_id)
-    os.makedirs(session_output_dir, exist_ok=True)
+    session_id, session_output_dir = output_store.create_job_dir()
+    # Profiled by sample rate, or on request (?profile=1) when allowed
+    force = True if PROFILING_SETTINGS["allow_request_trigger"] and request.values.get('profile') else None
+    with job_context(session_id), profile_job(session_output_dir, session_id, force):
+        return _generate(session_id, video_url, logo_file)
+
+def _generate(session_id, video_url, logo_file):
+    session_output_dir = output_store.job_path(session_id)
     
     logo_path = None
     if logo_file and logo_file.filename:
         filename = secure_filename(logo_file.filename)
-        logo_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{session_id}_{filename}")
+        logo_path = os.path.join(session_output_dir, f"upload_{filename}")
         logo_file.save(logo_path)
     
     # Logic
     slides_content = []
     if video_url:
         print(f"Processing URL: {video_url}")
-        text = get_transcript_text(video_url)
+        text, _ = get_transcript_text(video_url)
         if text:
-            slides_content = process_content(text)
+            slides_content, _ = process_content(text)
         else:
             # Fallback content if transcript fails
              slides_content = [
@@ -59,17 +70,111 @@ def generate():
     
     try:
         abs_paths = generator.generate_all_slides(slides_content, session_output_dir)
+        thumb = SERVING_SETTINGS["thumbnail_width"]
         for abs_path in abs_paths:
-             # Convert to relative URL for template
-            filename = os.path.basename(abs_path)
-            rel_url = url_for('static', filename=f'output/{session_id}/{filename}')
-            generated_images.append(rel_url)
+            # Content-hash URLs: thumbnails for the page, the original for download
+            generated_images.append({
+                "full": slide_url(session_id, abs_path),
+                "png": slide_url(session_id, abs_path, width=thumb),
+                "webp": slide_url(session_id, abs_path, width=thumb, fmt="webp"),
+                "webp_2x": slide_url(session_id, abs_path, width=thumb * 2, fmt="webp"),
+                "width": thumb
+            })
     except Exception as e:
         print(f"Generation failed: {e}")
+        output_store.release(session_id)
         # Handle error gracefully or show error page
         return f"Error: {e}", 500
         
     return render_template('result.html', images=generated_images)
 
+@app.route('/api/regenerate_slide', methods=['POST'])
+def regenerate_slide():
+    """
+    Rewrites one slide (or `start`..`end`) of a deck without regenerating
+    the rest. Expects JSON: slides, start, optional end, source_summary
+    (or source_text), content_type, instructions and api_key.
+    """
+    data = request.get_json(silent=True) or {}
+    slides = data.get('slides')
+    start = data.get('start')
+    if not isinstance(slides, list) or not isinstance(start, int):
+        return jsonify({"error": "'slides' (list) and 'start' (int) are required"}), 400
+
+    api_key = data.get('api_key') or os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        return jsonify({"error": "An API key is required to regenerate slides"}), 400
+
+    summary = data.get('source_summary') or summarize_source(data.get('source_text', ''))
+    new_slides, error = regenerate_slides(
+        slides,
+        start,
+        data.get('end'),
+        api_key=api_key,
+        source_summary=summary,
+        content_type=data.get('content_type', "Success Story"),
+        instructions=data.get('instructions', "")
+    )
+    if error:
+        return jsonify({"slides": new_slides, "error": error}), 502 if new_slides else 400
+    return jsonify({"slides": new_slides, "source_summary": summary})
+
+def slide_url(session_id, path, width=None, fmt=None):
+    """
+    Cache-busting URL for a rendered slide (or one of its variants).
+    """
+    params = {k: v for k, v in (("w", width), ("fmt", fmt)) if v}
+    return url_for('serve_slide', session_id=session_id, digest=content_hash(path), filename=os.path.basename(path), **params)
+
+@app.route('/slides/<session_id>/<digest>/<path:filename>')
+def serve_slide(session_id, digest, filename):
+    """
+    Serves a slide under its content hash with immutable caching, ETags and
+    range support. `?w=` and `?fmt=` select a resized/re-encoded variant,
+    encoded on first request and reused afterwards.
+    """
+    path = safe_join(output_store.job_path(session_id), filename)
+    if not path or not os.path.isfile(path):
+        abort(404)
+    current = content_hash(path)
+    if current != digest:
+        # The slide was re-rendered; point at the current content
+        response = redirect(url_for('serve_slide', session_id=session_id, digest=current, filename=filename, **request.args))
+        response.cache_control.no_cache = True
+        return response
+
+    width = request.args.get('w', type=int)
+    fmt = request.args.get('fmt')
+    try:
+        served_path = variant_path(path, width, fmt)
+    except ValueError as e:
+        abort(400, str(e))
+
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower().replace('jpg', 'jpeg')
+    response = send_file(
+        served_path,
+        mimetype=MIMETYPES.get(fmt),
+        conditional=True,
+        etag=f"{digest}-{width or 'full'}-{fmt}",
+        max_age=SERVING_SETTINGS["max_age_seconds"],
+        download_name=filename
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/output/<session_id>/<path:filename>')
+def serve_output(session_id, filename):
+    return send_from_directory(output_store.job_path(session_id), filename)
+
+@app.route('/metrics')
+def metrics():
+    if not METRICS_SETTINGS["prometheus_endpoint"]:
+        abort(404)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Heavy dependencies load lazily; pre-import them in the background after boot
+start_prewarm()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
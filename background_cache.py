@@ -0,0 +1,67 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from config import BACKGROUND_SETTINGS
+
+_memory_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def background_key(bg_mode, primary_color, secondary_color, bg_image_b64, bg_opacity, resolution, template_version):
+    """
+    Identifies a rasterized background. Anything that changes its pixels
+    (including the template CSS) is part of the key.
+    """
+    image_hash = hashlib.sha256(bg_image_b64.encode('utf-8')).hexdigest() if bg_image_b64 else None
+    payload = json.dumps([bg_mode, primary_color.lower(), secondary_color.lower(), image_hash, float(bg_opacity), resolution, template_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(BACKGROUND_SETTINGS["cache_dir"], f"{key}.png")
+
+
+def _remember(key, encoded):
+    with _lock:
+        _memory_cache[key] = encoded
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > BACKGROUND_SETTINGS["memory_cache_size"]:
+            _memory_cache.popitem(last=False)
+
+
+def load_background(key):
+    """
+    Returns the cached raster as base64 PNG, or None on a miss.
+    """
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode('utf-8')
+    # Keeps recently used rasters from being garbage-collected
+    os.utime(path)
+    _remember(key, encoded)
+    return encoded
+
+
+def store_background(key, png_bytes):
+    """
+    Saves a freshly rasterized background and returns it as base64 PNG.
+    """
+    os.makedirs(BACKGROUND_SETTINGS["cache_dir"], exist_ok=True)
+    tmp_path = _cache_path(key) + f".{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(png_bytes)
+    os.replace(tmp_path, _cache_path(key))
+
+    encoded = base64.b64encode(png_bytes).decode('utf-8')
+    _remember(key, encoded)
+    return encoded
@@ -0,0 +1,186 @@
+"""
+Deterministic, offline fixtures for the benchmark suite.
+Everything is generated from a fixed seed so runs are comparable.
+"""
+import json
+import random
+
+WORDS = (
+    "automation workflow revenue growth customer pipeline insight team data "
+    "process platform scale launch market strategy product feedback metric "
+    "quarter inventory partner integration dashboard adoption retention"
+).split()
+
+FILLERS = ["um", "uh", "you know", "like", "so", "[Music]", "[Applause]"]
+
+LAYOUT_CYCLE = ["layout-list", "layout-quote", "layout-data", "layout-split"]
+
+
+def _sentence(rng, min_words=6, max_words=14):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_deck(num_slides, seed=0):
+    """
+    Builds a slide deck covering every layout, cover first and CTA last.
+    """
+    rng = random.Random(seed)
+    slides = [{
+        "layout": "layout-cover",
+        "title": _sentence(rng, 4, 7).rstrip('.'),
+        "subtitle": "Success Story",
+        "body": _sentence(rng)
+    }]
+    for i in range(1, num_slides - 1):
+        layout = LAYOUT_CYCLE[i % len(LAYOUT_CYCLE)]
+        slide = {"layout": layout, "title": _sentence(rng, 3, 6).rstrip('.'), "subtitle": _sentence(rng, 2, 4).rstrip('.')}
+        if layout == "layout-list":
+            slide["body"] = [_sentence(rng, 4, 8) for _ in range(rng.randint(3, 5))]
+        elif layout == "layout-data":
+            slide["stats"] = [{"value": f"{rng.randint(10, 95)}%", "label": rng.choice(WORDS).title()} for _ in range(2)]
+        else:
+            slide["body"] = _sentence(rng, 10, 20)
+        slides.append(slide)
+    slides.append({
+        "layout": "layout-cta",
+        "title": "Ready to Scale?",
+        "subtitle": "Contact Us Today",
+        "body": "Link in bio"
+    })
+    return slides[:num_slides]
+
+
+def _caption_line(rng):
+    line = _sentence(rng, 5, 10).rstrip('.').lower()
+    if rng.random() < 0.3:
+        line = f"{rng.choice(FILLERS)} {line}"
+    return line
+
+
+def make_json3_transcript(num_events, seed=0):
+    """
+    Builds a YouTube json3 subtitle payload with `num_events` caption events.
+    """
+    rng = random.Random(seed)
+    events = []
+    for i in range(num_events):
+        words = _caption_line(rng).split()
+        events.append({
+            "tStartMs": i * 2000,
+            "dDurationMs": 2000,
+            "segs": [{"utf8": w + " ", "tOffsetMs": j * 150} for j, w in enumerate(words)]
+        })
+    return json.dumps({"wireMagic": "pb3", "events": events})
+
+
+def make_vtt_transcript(num_cues, seed=0):
+    """
+    Builds a WEBVTT subtitle payload with `num_cues` cues.
+    """
+    rng = random.Random(seed)
+    lines = ["WEBVTT", "Kind: captions", "Language: en", ""]
+    for i in range(num_cues):
+        start, end = i * 2, i * 2 + 2
+        lines.append(f"{i + 1}")
+        lines.append(f"00:{start // 60:02d}:{start % 60:02d}.000 --> 00:{end // 60:02d}:{end % 60:02d}.000")
+        lines.append(_caption_line(rng))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def make_transcript_text(num_sentences, seed=0):
+    """
+    Builds a plain-text transcript suitable as `process_content` input.
+    """
+    rng = random.Random(seed)
+    return " ".join(_sentence(rng) for _ in range(num_sentences))
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Stands in for genai.GenerativeModel: returns a canned deck as JSON after
+    an optional simulated latency, without touching the network.
+    """
+    latency = 0.0
+    response_slides = 6
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate_content(self, prompt):
+        import time
+        if self.latency:
+            time.sleep(self.latency)
+        deck = make_deck(self.response_slides, seed=len(prompt))
+        return FakeResponse("Here is your carousel:\n" + json.dumps(deck))
+
+
+class FakeGenAI:
+    """
+    Drop-in replacement for the `genai` module used by content_processor.
+    """
+    GenerativeModel = FakeGenerativeModel
+
+    @staticmethod
+    def configure(api_key=None):
+        pass
+
+
+class FakeYoutube:
+    """
+    Recorded-style yt-dlp responses for a channel with a "Videos" tab and a
+    playlist, so playlist ingestion runs without the network. Pass
+    `extract`/`fetch` to youtube_extractor.expand_source/ingest_source.
+    Every fifth video has no English subtitles; `flaky` videos fail once.
+    """
+    def __init__(self, num_videos=20, latency=0.0, flaky=(), seed=0):
+        self.num_videos = num_videos
+        self.latency = latency
+        self.flaky = set(flaky)
+        self.seed = seed
+        self.failures = {}
+
+    def video_id(self, i):
+        return f"vid{i:05d}"
+
+    def _sleep(self):
+        if self.latency:
+            import time
+            time.sleep(self.latency)
+
+    def extract(self, url, flat=False):
+        self._sleep()
+        if "/@" in url and not url.endswith("/videos"):
+            return {
+                "_type": "playlist", "id": "UCfixture", "title": "Fixture Channel",
+                "entries": [{"_type": "url", "ie_key": "YoutubeTab", "url": url.rstrip("/") + "/videos", "title": "Videos"}]
+            }
+        if "list=" in url or url.endswith("/videos"):
+            return {
+                "_type": "playlist", "id": "PLfixture", "title": "Fixture Playlist",
+                "entries": [
+                    {"_type": "url", "ie_key": "Youtube", "id": self.video_id(i),
+                     "url": f"https://www.youtube.com/watch?v={self.video_id(i)}", "title": f"Video {i}"}
+                    for i in range(self.num_videos)
+                ]
+            }
+        video_id = url.rsplit("v=", 1)[-1]
+        if video_id in self.flaky and not self.failures.get(video_id):
+            self.failures[video_id] = True
+            raise ConnectionError("HTTP Error 503: Service Unavailable")
+        index = int(video_id[3:])
+        info = {"id": video_id, "title": f"Video {index}", "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}
+        if index % 5 != 4:
+            info["automatic_captions"] = {"en": [{"ext": "json3", "url": f"https://fixture.invalid/subs/{video_id}.json3"}]}
+        return info
+
+    def fetch(self, url):
+        self._sleep()
+        video_id = url.rsplit("/", 1)[-1].split(".")[0]
+        return make_json3_transcript(200, seed=self.seed + int(video_id[3:]))
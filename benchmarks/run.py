@@ -0,0 +1,395 @@
+"""
+Benchmark harness for the generation and render pipeline.
+
+Runs offline against the fixtures in benchmarks/fixtures.py and reports
+throughput, p50/p95 latency and peak RSS per benchmark. Results are saved
+as JSON so runs can be compared to catch regressions:
+
+    python -m benchmarks.run
+    python -m benchmarks.run --only html_20,transcript_json3 --iterations 20
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import queue as queue_module
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks import fixtures
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def configure_offline():
+    """
+    Keeps every benchmark network-free and quiet.
+    """
+    os.chdir(REPO_ROOT)
+    from config import FONT_SETTINGS, METRICS_SETTINGS, RATE_LIMIT_SETTINGS
+    FONT_SETTINGS["allow_download"] = False
+    METRICS_SETTINGS["log_timings"] = False
+    # The fake LLM has no quota; throttling would only measure the limiter
+    RATE_LIMIT_SETTINGS["enabled"] = False
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process and its reaped children (e.g. Chrome).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# --- Benchmark definitions ---
+# Each factory returns (run, teardown, items_per_run). `run` is timed per
+# iteration; `items_per_run` feeds the throughput figure.
+
+def _generator():
+    from carousel_generator import CarouselGenerator
+    return CarouselGenerator(logo_path=None)
+
+
+def bench_html(num_slides):
+    def factory():
+        generator = _generator()
+        deck = fixtures.make_deck(num_slides)
+        return (lambda: generator.generate_html_only(deck, bg_mode="Gradient Pattern")), None, num_slides
+    return factory
+
+
+def bench_render(num_slides, warm, tabs=1):
+    def factory():
+        generator = _generator()
+        deck = fixtures.make_deck(num_slides)
+        output_dir = tempfile.mkdtemp(prefix="bench_render_")
+        driver = generator.create_driver() if warm else None
+
+        def run():
+            generator.generate_all_slides(deck, output_dir, bg_mode="Gradient Pattern", driver=driver, parallel_tabs=tabs)
+
+        def teardown():
+            if driver:
+                driver.quit()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        return run, teardown, num_slides
+    return factory
+
+
+def bench_pdf_vector(num_slides):
+    def factory():
+        generator = _generator()
+        deck = fixtures.make_deck(num_slides)
+        output_dir = tempfile.mkdtemp(prefix="bench_pdf_")
+        driver = generator.create_driver()
+
+        def run():
+            generator.generate_pdf(deck, os.path.join(output_dir, "carousel.pdf"), bg_mode="Gradient Pattern", driver=driver)
+
+        def teardown():
+            driver.quit()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        return run, teardown, num_slides
+    return factory
+
+
+def bench_variants(num_variants):
+    def factory():
+        from config import COLOR_SCHEMES, FONT_OPTIONS
+        from carousel_generator import generate_variants
+        generator = _generator()
+        deck = fixtures.make_deck(6)
+        schemes = list(COLOR_SCHEMES)[:4]
+        fonts = list(FONT_OPTIONS)[:max(1, num_variants // len(schemes))]
+        output_dir = tempfile.mkdtemp(prefix="bench_variants_")
+        driver = generator.create_driver()
+
+        def run():
+            generate_variants(generator, deck, output_dir, seeds=[42], schemes=schemes, fonts=fonts, bg_mode="Gradient Pattern", driver=driver)
+
+        def teardown():
+            driver.quit()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        return run, teardown, len(schemes) * len(fonts)
+    return factory
+
+
+def bench_transcript(kind, size):
+    def factory():
+        from youtube_extractor import parse_subtitle_content
+        if kind == "json3":
+            payload = fixtures.make_json3_transcript(size)
+        else:
+            payload = fixtures.make_vtt_transcript(size)
+        return (lambda: parse_subtitle_content(payload)), None, size
+    return factory
+
+
+def bench_ingest(num_videos, workers):
+    def factory():
+        from youtube_extractor import ingest_source
+        youtube = fixtures.FakeYoutube(num_videos, latency=0.02)
+
+        def run():
+            for _ in ingest_source("https://www.youtube.com/playlist?list=PLfixture", max_workers=workers, extract=youtube.extract, fetch=youtube.fetch):
+                pass
+
+        return run, None, num_videos
+    return factory
+
+
+def bench_process_content(num_sentences):
+    def factory():
+        import content_processor
+        content_processor.genai = fixtures.FakeGenAI
+        text = fixtures.make_transcript_text(num_sentences)
+        return (lambda: content_processor.process_content(text, api_key="offline-fake-key")), None, 1
+    return factory
+
+
+def bench_offline_summary(num_sentences):
+    def factory():
+        from offline_summarizer import summarize_to_slides
+        text = fixtures.make_transcript_text(num_sentences)
+        return (lambda: summarize_to_slides(text)), None, 1
+    return factory
+
+
+def _slide_images(num_slides, size=2160):
+    from PIL import Image, ImageDraw
+    image_dir = tempfile.mkdtemp(prefix="bench_export_")
+    paths = []
+    for i in range(num_slides):
+        image = Image.new("RGB", (size, size), (245, 245, 250))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([120, 120 + i * 40, size - 120, size // 2], fill=(113, 75, 103))
+        path = os.path.join(image_dir, f"slide_{i+1}.png")
+        image.save(path)
+        paths.append(path)
+    return image_dir, paths
+
+
+def bench_export(fmt, num_slides):
+    def factory():
+        import exporters
+        image_dir, paths = _slide_images(num_slides)
+        if fmt == "zip":
+            run = lambda: exporters.build_zip(paths)
+        elif fmt == "pdf":
+            run = lambda: exporters.build_pdf(paths)
+        else:
+            run = lambda: exporters.build_video(paths, image_dir)
+        return run, (lambda: shutil.rmtree(image_dir, ignore_errors=True)), num_slides
+    return factory
+
+
+BENCHMARKS = {
+    "html_5": bench_html(5),
+    "html_20": bench_html(20),
+    "html_50": bench_html(50),
+    "render_cold_5": bench_render(5, warm=False),
+    "render_warm_5": bench_render(5, warm=True),
+    "render_warm_20": bench_render(20, warm=True),
+    "render_warm_20_tabs4": bench_render(20, warm=True, tabs=4),
+    "transcript_json3": bench_transcript("json3", 20000),
+    "transcript_vtt": bench_transcript("vtt", 20000),
+    "ingest_playlist_50": bench_ingest(50, workers=8),
+    "process_content_fake_llm": bench_process_content(400),
+    "offline_summary_400": bench_offline_summary(400),
+    "export_zip": bench_export("zip", 10),
+    "export_pdf": bench_export("pdf", 10),
+    "export_mp4": bench_export("mp4", 5),
+    "render_pdf_vector_10": bench_pdf_vector(10),
+    "render_variants_20": bench_variants(20),
+}
+
+# Browser and video benchmarks are slow; they default to fewer iterations
+SLOW_BENCHMARKS = {"render_cold_5", "render_warm_5", "render_warm_20", "render_warm_20_tabs4", "export_mp4", "render_pdf_vector_10", "render_variants_20"}
+
+
+def run_benchmark(name, iterations, warmup):
+    """
+    Runs one benchmark in the current process and returns its result dict.
+    """
+    configure_offline()
+    result = {"name": name, "iterations": iterations}
+    teardown = None
+    try:
+        run, teardown, items = BENCHMARKS[name]()
+        for _ in range(warmup):
+            run()
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        total = sum(timings)
+        result.update({
+            "items_per_run": items,
+            "mean_ms": round(total / len(timings) * 1000, 3),
+            "min_ms": round(timings[0] * 1000, 3),
+            "max_ms": round(timings[-1] * 1000, 3),
+            "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+            "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+            "throughput_per_s": round(items * len(timings) / total, 2) if total else None,
+        })
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if teardown:
+            teardown()
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _isolated_worker(name, iterations, warmup, queue):
+    queue.put(run_benchmark(name, iterations, warmup))
+
+
+def run_isolated(name, iterations, warmup):
+    """
+    Runs a benchmark in a fresh process so its peak RSS is its own.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_isolated_worker, args=(name, iterations, warmup, queue))
+    process.start()
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except queue_module.Empty:
+            if not process.is_alive():
+                result = {"name": name, "iterations": iterations, "error": f"worker exited with code {process.exitcode}"}
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare_results(current, baseline, threshold):
+    """
+    Compares p50 latency against a baseline run. Returns the list of
+    regressions (benchmarks slower than `threshold`, e.g. 0.1 = 10%).
+    """
+    baseline_by_name = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'benchmark':<28}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+    for result in current["results"]:
+        old = baseline_by_name.get(result["name"])
+        if not old or "p50_ms" not in old or "p50_ms" not in result:
+            continue
+        change = (result["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{result['name']:<28}{old['p50_ms']:>12.2f}ms{result['p50_ms']:>12.2f}ms{change:>+9.1%}{flag}")
+        if flag:
+            regressions.append(result["name"])
+    return regressions
+
+
+def print_results(results):
+    print(f"{'benchmark':<28}{'p50':>10}{'p95':>10}{'items/s':>12}{'peak RSS':>12}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['name']:<28}  ERROR {r['error']}")
+            continue
+        print(f"{r['name']:<28}{r['p50_ms']:>8.2f}ms{r['p95_ms']:>8.2f}ms{r['throughput_per_s']:>12}{str(r['peak_rss_mb']) + 'MB':>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the carousel generation pipeline")
+    parser.add_argument("--only", help="Comma-separated benchmark names", default="")
+    parser.add_argument("--skip-browser", action="store_true", help="Skip benchmarks that need Chrome")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--no-isolate", action="store_true", help="Run everything in one process (peak RSS becomes cumulative)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regression threshold for --compare")
+    parser.add_argument("--list", action="store_true", help="List available benchmarks")
+    args = parser.parse_args()
+
+    # Resolve paths before benchmarks chdir to the repo root
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json"))
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    if args.skip_browser:
+        names = [n for n in names if not n.startswith("render_")]
+
+    results = []
+    for name in names:
+        iterations = min(args.iterations, 3) if name in SLOW_BENCHMARKS else args.iterations
+        print(f"Running {name} ({iterations} iterations)...")
+        if args.no_isolate:
+            results.append(run_benchmark(name, iterations, args.warmup))
+        else:
+            results.append(run_isolated(name, iterations, args.warmup))
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    print_results(results)
+    print(f"\nSaved results to {output_path}")
+
+    if compare_path:
+        with open(compare_path) as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,23 @@
 import os
+import copy
 import base64
 from jinja2 import Environment, FileSystemLoader
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
 import time
+import tempfile
+import hashlib
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from config import COLOR_SCHEMES, FONT_SETTINGS, RENDER_SETTINGS, BACKGROUND_SETTINGS, RENDER_SERVICE_SETTINGS
+from background_cache import background_key, load_background, store_background
+from font_store import deck_glyphs, get_font_face_css
+from metrics import timed, increment
+from output_store import scratch_dir
 
 class CarouselGenerator:
-    def __init__(self, logo_path, brand_color=None, secondary_color=None, font_name="Inter", author_handle="@metamorphosis", brand_name="Metamorphosis"):
+    def __init__(self, logo_path, brand_color=None, secondary_color=None, font_name="Inter", author_handle="@metamorphosis", brand_name="Metamorphosis", render_service=None):
         self.logo_path = logo_path
+        # URL of a render_server.py; defaults to RENDER_SERVICE_SETTINGS / RENDER_SERVICE_URL
+        self.render_service = render_service
         self.primary_color = brand_color if brand_color else "#714B67"
         self.secondary_color = secondary_color if secondary_color else "#017E84"
         self.font_name = font_name
@@ -20,6 +27,8 @@ class CarouselGenerator:
         # Setup Jinja2
         self.env = Environment(loader=FileSystemLoader('templates'))
         self.template = self.env.get_template('carousel_template.html')
+        self.slides_template = self.env.get_template('carousel_slides.html')
+        self._template_version = None
 
     def get_logo_base64(self):
         if self.logo_path and os.path.exists(self.logo_path):
@@ -39,54 +48,379 @@ class CarouselGenerator:
             print(f"Failed to download image: {e}")
         return None
 
-    def generate_html_only(self, slides_content, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color"):
+    def get_background_base64(self, bg_image_url):
+        # Handle local file paths vs URLs for background
+        if not bg_image_url:
+            return None
+        if os.path.exists(bg_image_url):
+            # Local file
+            with open(bg_image_url, "rb") as img_file:
+                return base64.b64encode(img_file.read()).decode('utf-8')
+        # URL
+        return self.get_image_base64_from_url(bg_image_url)
+
+    def generate_html_only(self, slides_content, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", bg_raster_base64=None):
         """
         Generates the HTML content for the carousel without taking screenshots.
-        Useful for live preview.
+        Useful for live preview. With `bg_raster_base64`, slides use that
+        pre-rasterized background instead of painting their own layers.
         """
         logo_b64 = self.get_logo_base64()
+        # A raster already contains the uploaded image, so don't inline it again
+        bg_image_b64 = None if bg_raster_base64 else self.get_background_base64(bg_image_url)
         
-        # Handle local file paths vs URLs for background
-        bg_image_b64 = None
-        if bg_image_url:
-            if os.path.exists(bg_image_url):
-                # Local file
-                with open(bg_image_url, "rb") as img_file:
-                    bg_image_b64 = base64.b64encode(img_file.read()).decode('utf-8')
-            else:
-                # URL
-                bg_image_b64 = self.get_image_base64_from_url(bg_image_url)
+        # Inline locally stored fonts so rendering never hits the network
+        font_face_css = None
+        if FONT_SETTINGS["embed_fonts"]:
+            glyphs = deck_glyphs(slides_content, self.brand_name, self.author_handle)
+            font_face_css = get_font_face_css(self.font_name, glyphs)
         
-        html_content = self.template.render(
-            slides=slides_content,
+        with timed("template_render"):
+            html_content = self.template.render(
+                slides=slides_content,
+                primary_color=self.primary_color,
+                secondary_color=self.secondary_color,
+                bg_color="#FFFFFF", # Default white bg for slides
+                text_color="#333333", # Default dark text
+                font_name=self.font_name,
+                font_face_css=font_face_css,
+                author_handle=self.author_handle,
+                brand_name=self.brand_name,
+                logo_base64=logo_b64,
+                bg_image_base64=bg_image_b64,
+                bg_opacity=bg_opacity,
+                bg_mode=bg_mode,
+                bg_raster=bool(bg_raster_base64),
+                bg_raster_base64=bg_raster_base64
+            )
+        
+        return html_content
+
+    def wait_until_ready(self, driver, timeout=5.0):
+        """
+        Blocks until the page's fonts have loaded and its images (including a
+        pre-rasterized background) are decoded. Falls back to a fixed delay
+        if the browser can't report readiness.
+        """
+        try:
+            driver.set_script_timeout(timeout)
+            driver.execute_async_script(PAGE_READY_SCRIPT)
+        except Exception as e:
+            print(f"Font readiness check failed: {e}")
+            time.sleep(2.0)
+
+    @contextmanager
+    def loaded_page(self, slides_content, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", driver=None):
+        """
+        Renders the deck HTML and loads it in Chrome, yielding (driver, page_url)
+        once fonts and images are ready. A driver created here is quit on exit;
+        a passed-in driver is left open.
+        """
+        owns_driver = driver is None
+        temp_html_path = None
+        
+        try:
+            # 1. Setup Selenium
+            if owns_driver:
+                with timed("browser_acquire"):
+                    driver = self.create_driver()
+
+            # 2. Render HTML (background rasterized once per theme and cached)
+            with timed("render_deck_html"):
+                bg_raster_b64 = self.get_background_raster(driver, bg_image_url, bg_opacity, bg_mode)
+                html_content = self.generate_html_only(slides_content, bg_image_url, bg_opacity, bg_mode, bg_raster_b64)
+            
+            # The page Chrome loads is scratch data; keep it out of the output directory
+            fd, temp_html_path = tempfile.mkstemp(prefix="carousel_", suffix=".html", dir=scratch_dir())
+            with os.fdopen(fd, "w") as f:
+                f.write(html_content)
+
+            # 3. Open File
+            page_url = f"file://{temp_html_path}"
+            with timed("page_load"):
+                driver.get(page_url)
+                self.wait_until_ready(driver)
+
+            yield driver, page_url
+
+        except Exception as e:
+            print(f"Selenium Error: {e}")
+            raise e
+        finally:
+            if owns_driver and driver:
+                driver.quit()
+            # Cleanup temp file
+            if temp_html_path:
+                os.remove(temp_html_path)
+
+    @timed("render_deck")
+    def generate_all_slides(self, slides_content, output_dir, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", driver=None, parallel_tabs=None, pdf_path=None, frame_sink=None):
+        """
+        Generates all slides at once by rendering a single HTML with all slides,
+        then taking screenshots of each slide element.
+        Pass an existing `driver` to reuse a warm browser; it is left open.
+        `parallel_tabs` overrides RENDER_SETTINGS["capture_tabs"].
+        With `pdf_path`, a vector PDF is also printed from the same page.
+        `frame_sink(index, png_bytes)` receives every capture instead of it
+        being written to disk, e.g. FramePipeline.submit_png to encode from
+        shared memory; include its "png" encoder to get the returned files.
+        Without a `driver`, decks go to the render service if one is configured.
+        """
+        if driver is None:
+            remote = self.render_remote(slides_content, output_dir, bg_image_url, bg_opacity, bg_mode, pdf_path, frame_sink)
+            if remote is not None:
+                return remote
+
+        with self.loaded_page(slides_content, bg_image_url, bg_opacity, bg_mode, driver) as (driver, page_url):
+            # 4. Screenshot each slide, across several tabs if allowed
+            tabs = self.capture_parallelism(len(slides_content), parallel_tabs)
+            if tabs > 1:
+                generated_files = self.capture_slides_parallel(driver, page_url, len(slides_content), output_dir, tabs, frame_sink)
+            else:
+                generated_files = self.capture_slides(driver, len(slides_content), output_dir, frame_sink=frame_sink)
+
+            if pdf_path:
+                self.print_pdf(driver, pdf_path)
+            
+        return generated_files
+
+    def render_remote(self, slides_content, output_dir, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", pdf_path=None, frame_sink=None):
+        """
+        Renders on the configured render service. Returns the slide paths, or
+        None if no service is configured (or it failed and local fallback is on).
+        """
+        from render_client import RenderClient, RenderServiceError, service_url
+        url = self.render_service or service_url()
+        if not url:
+            return None
+        theme = {
+            "brand_color": self.primary_color,
+            "secondary_color": self.secondary_color,
+            "font_name": self.font_name,
+            "author_handle": self.author_handle,
+            "brand_name": self.brand_name
+        }
+        try:
+            return RenderClient(url).render_to_dir(slides_content, output_dir, theme, self.logo_path, bg_image_url, bg_opacity, bg_mode, pdf_path, frame_sink)
+        except RenderServiceError as e:
+            if not RENDER_SERVICE_SETTINGS["fallback_local"]:
+                raise
+            increment("render_service_fallbacks")
+            print(f"Render service failed, rendering locally: {e}")
+            return None
+
+    @timed("render_pdf")
+    def generate_pdf(self, slides_content, pdf_path, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", driver=None):
+        """
+        Prints the carousel straight to a vector PDF, one 1080x1080 page per
+        slide, without taking any screenshots.
+        """
+        with self.loaded_page(slides_content, bg_image_url, bg_opacity, bg_mode, driver) as (driver, _):
+            return self.print_pdf(driver, pdf_path)
+
+    def print_pdf(self, driver, pdf_path):
+        """
+        Prints the loaded carousel page to pdf_path using Chrome's print-to-PDF.
+        Text stays selectable and fonts are embedded once for the whole file.
+        """
+        with timed("export", format="pdf_vector"):
+            result = driver.execute_cdp_cmd("Page.printToPDF", {
+                "printBackground": True,
+                "preferCSSPageSize": True,
+                # 1080 CSS px at 96 dpi, in case the @page size is ignored
+                "paperWidth": 11.25,
+                "paperHeight": 11.25,
+                "marginTop": 0,
+                "marginBottom": 0,
+                "marginLeft": 0,
+                "marginRight": 0
+            })
+            with open(pdf_path, "wb") as f:
+                f.write(base64.b64decode(result["data"]))
+        return pdf_path
+
+    def get_background_raster(self, driver, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color"):
+        """
+        Returns the slide background (base gradient plus the mode's layer) as a
+        base64 PNG, painting it in the browser only on a cache miss.
+        Returns None for modes that are cheap enough to paint directly.
+        """
+        if not BACKGROUND_SETTINGS["rasterize"] or bg_mode not in BACKGROUND_SETTINGS["raster_modes"]:
+            return None
+
+        bg_image_b64 = self.get_background_base64(bg_image_url) if bg_mode == "Uploaded Image" else None
+        try:
+            resolution = driver.execute_script("return window.devicePixelRatio") * 1080
+        except Exception:
+            resolution = None
+        key = background_key(bg_mode, self.primary_color, self.secondary_color, bg_image_b64, bg_opacity, resolution, self.template_version())
+
+        cached = load_background(key)
+        if cached:
+            increment("background_cache_hits")
+            return cached
+
+        increment("background_cache_misses")
+        html = self.template.render(
+            slides=[{}],
+            background_only=True,
             primary_color=self.primary_color,
             secondary_color=self.secondary_color,
-            bg_color="#FFFFFF", # Default white bg for slides
-            text_color="#333333", # Default dark text
+            bg_color="#FFFFFF",
+            text_color="#333333",
             font_name=self.font_name,
-            author_handle=self.author_handle,
-            brand_name=self.brand_name,
-            logo_base64=logo_b64,
+            font_face_css="",
             bg_image_base64=bg_image_b64,
             bg_opacity=bg_opacity,
             bg_mode=bg_mode
         )
-        
-        return html_content
+        fd, html_path = tempfile.mkstemp(prefix="carousel_bg_", suffix=".html", dir=scratch_dir())
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(html)
+            with timed("background_rasterize", mode=bg_mode):
+                driver.get(f"file://{html_path}")
+                png_bytes = driver.find_element("id", "slide-1").screenshot_as_png
+        except Exception as e:
+            print(f"Background rasterization failed, painting per slide: {e}")
+            return None
+        finally:
+            os.remove(html_path)
+        return store_background(key, png_bytes)
 
-    def generate_all_slides(self, slides_content, output_dir, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color"):
+    def template_version(self):
         """
-        Generates all slides at once by rendering a single HTML with all slides,
-        then taking screenshots of each slide element.
+        Hash of the carousel templates, so cached rasters follow CSS changes.
         """
-        # 1. Render HTML
-        html_content = self.generate_html_only(slides_content, bg_image_url, bg_opacity, bg_mode)
-        
-        temp_html_path = os.path.abspath(os.path.join(output_dir, "temp_carousel.html"))
-        with open(temp_html_path, "w") as f:
-            f.write(html_content)
-            
-        # 2. Setup Selenium
+        if self._template_version is None:
+            digest = hashlib.sha256()
+            for name in ('carousel_template.html', 'carousel_slides.html'):
+                digest.update(self.env.loader.get_source(self.env, name)[0].encode('utf-8'))
+            self._template_version = digest.hexdigest()[:16]
+        return self._template_version
+
+    def capture_slides(self, driver, num_slides, output_dir, indices=None, frame_sink=None):
+        """
+        Screenshots slide-1..slide-N of the loaded page into output_dir.
+        Pass `indices` (0-based) to capture only a subset. Chrome's PNG is
+        written as-is, unless a `frame_sink(index, png_bytes)` is attached:
+        then the sink gets it instead and its encoders write the files (e.g.
+        FramePipeline's "png" encoder writes the returned slide_N.png paths).
+        """
+        generated_files = []
+        for i in (range(num_slides) if indices is None else indices):
+            slide_id = f"slide-{i+1}"
+            try:
+                with timed("slide_capture"):
+                    element = driver.find_element("id", slide_id)
+                    png_bytes = element.screenshot_as_png
+                output_path = os.path.join(output_dir, f"slide_{i+1}.png")
+                if frame_sink:
+                    frame_sink(i, png_bytes)
+                else:
+                    with timed("slide_write"):
+                        with open(output_path, "wb") as f:
+                            f.write(png_bytes)
+                generated_files.append(output_path)
+                increment("slides_rendered")
+            except Exception as e:
+                increment("slide_capture_errors")
+                print(f"Error capturing slide {i+1}: {e}")
+        return generated_files
+
+    def capture_parallelism(self, num_slides, requested=None):
+        """
+        Number of tabs to capture with: the configured parallelism, capped by
+        slide count, CPU count and the memory guard.
+        """
+        tabs = requested or RENDER_SETTINGS["capture_tabs"]
+        tabs = max(1, min(tabs, num_slides, os.cpu_count() or 1))
+        if tabs > 1:
+            free_mb = available_memory_mb()
+            if free_mb is not None:
+                # The first tab is already open; each extra one needs its own budget
+                budget = free_mb - RENDER_SETTINGS["min_free_memory_mb"]
+                affordable = 1 + max(0, int(budget // RENDER_SETTINGS["tab_memory_mb"]))
+                if affordable < tabs:
+                    print(f"Memory guard: capturing with {affordable} tab(s) instead of {tabs} ({free_mb} MB free)")
+                    tabs = affordable
+        return tabs
+
+    def capture_slides_parallel(self, driver, page_url, num_slides, output_dir, tabs, frame_sink=None):
+        """
+        Captures disjoint subsets of slides concurrently from several tabs of
+        the same browser. `driver` (already on page_url) takes the first
+        subset; extra tabs are driven by sessions attached to the same Chrome.
+        Results are returned in slide order.
+        """
+        subsets = [list(range(k, num_slides, tabs)) for k in range(tabs)]
+        debugger_address = driver.capabilities.get("goog:chromeOptions", {}).get("debuggerAddress")
+        if not debugger_address:
+            return self.capture_slides(driver, num_slides, output_dir, frame_sink=frame_sink)
+
+        def capture_in_new_tab(indices):
+            helper = None
+            try:
+                with timed("tab_acquire"):
+                    helper = self.attach_driver(debugger_address)
+                    helper.switch_to.new_window('tab')
+                    helper.get(page_url)
+                    self.wait_until_ready(helper)
+                return self.capture_slides(helper, num_slides, output_dir, indices, frame_sink)
+            finally:
+                if helper:
+                    try:
+                        helper.close()
+                    finally:
+                        helper.quit()
+
+        with ThreadPoolExecutor(max_workers=tabs) as pool:
+            futures = [pool.submit(capture_in_new_tab, indices) for indices in subsets[1:]]
+            captured = self.capture_slides(driver, num_slides, output_dir, subsets[0], frame_sink)
+            for future in futures:
+                try:
+                    captured.extend(future.result())
+                except Exception as e:
+                    print(f"Tab capture failed: {e}")
+
+        slide_order = {os.path.join(output_dir, f"slide_{i+1}.png"): i for i in range(num_slides)}
+        return sorted(captured, key=slide_order.get)
+
+    def build_deck(self, slides_content, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", bg_raster_base64=None):
+        """
+        Renders just the slide markup and theme variables for a deck, so it
+        can be injected into an already loaded carousel page.
+        """
+        markup = self.slides_template.render(
+            slides=slides_content,
+            author_handle=self.author_handle,
+            brand_name=self.brand_name,
+            logo_base64=self.get_logo_base64(),
+            bg_image_base64=None if bg_raster_base64 else self.get_background_base64(bg_image_url),
+            bg_mode=bg_mode,
+            bg_raster=bool(bg_raster_base64)
+        )
+        theme = {
+            "--primary": self.primary_color,
+            "--secondary": self.secondary_color,
+            "--bg-opacity": str(bg_opacity),
+            "--font-family": f"'{self.font_name}', sans-serif",
+        }
+        if bg_raster_base64:
+            theme["--bg-raster"] = f"url('data:image/png;base64,{bg_raster_base64}')"
+        return {
+            "markup": markup,
+            "theme": theme,
+            "font_name": self.font_name,
+            "glyphs": deck_glyphs(slides_content, self.brand_name, self.author_handle),
+            "num_slides": len(slides_content),
+        }
+
+    def create_driver(self):
+        """
+        Starts a headless Chrome configured for slide capture.
+        """
+        from selenium.webdriver.chrome.options import Options
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--no-sandbox")
@@ -105,42 +439,325 @@ class CarouselGenerator:
         chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
         chrome_options.page_load_strategy = 'eager'
         
-        driver = None
-        generated_files = []
-        
-        try:
-            # Try using webdriver_manager (local) or system driver (cloud)
-            try:
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-            except:
-                # Fallback for environments where driver is in PATH (like Streamlit Cloud sometimes)
-                driver = webdriver.Chrome(options=chrome_options)
+        return _start_chrome(chrome_options)
 
-            # 3. Open File
-            driver.get(f"file://{temp_html_path}")
-            # Wait for fonts/render (Increased for safety)
-            time.sleep(2.0) 
+    def attach_driver(self, debugger_address):
+        """
+        Opens another WebDriver session on an already running Chrome, so
+        several tabs of one warm browser can be driven concurrently.
+        """
+        from selenium.webdriver.chrome.options import Options
+        chrome_options = Options()
+        chrome_options.debugger_address = debugger_address
+        return _start_chrome(chrome_options)
 
-            
-            # 4. Screenshot each slide
-            for i in range(len(slides_content)):
-                slide_id = f"slide-{i+1}"
-                try:
-                    element = driver.find_element(By.ID, slide_id)
-                    output_path = os.path.join(output_dir, f"slide_{i+1}.png")
-                    element.screenshot(output_path)
-                    generated_files.append(output_path)
-                except Exception as e:
-                    print(f"Error capturing slide {i+1}: {e}")
 
-        except Exception as e:
-            print(f"Selenium Error: {e}")
-            raise e
-        finally:
-            if driver:
-                driver.quit()
-            # Cleanup temp file
-            # os.remove(temp_html_path) 
-            
-        return generated_files
+_driver_path = None
+
+
+def resolve_driver_path():
+    """
+    Locates (downloading on first use) the chromedriver binary. Cached.
+    """
+    global _driver_path
+    if _driver_path is None:
+        from webdriver_manager.chrome import ChromeDriverManager
+        _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+
+def _start_chrome(chrome_options):
+    # Selenium is only imported once a browser is actually needed
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    # Try using webdriver_manager (local) or system driver (cloud)
+    try:
+        service = Service(resolve_driver_path())
+        return webdriver.Chrome(service=service, options=chrome_options)
+    except:
+        # Fallback for environments where driver is in PATH (like Streamlit Cloud sometimes)
+        return webdriver.Chrome(options=chrome_options)
+
+
+def available_memory_mb():
+    """
+    Memory available for new allocations, or None if it can't be determined.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available // (1024 * 1024)
+    except ImportError:
+        return None
+
+
+# Resolves once fonts are loaded and inline images plus the rasterized
+# background (if any) are decoded.
+PAGE_READY_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const pending = Array.from(document.images).map(img => img.decode().catch(() => null));
+const raster = getComputedStyle(document.documentElement).getPropertyValue('--bg-raster');
+const match = /url\\(["']?(.*?)["']?\\)/.exec(raster);
+if (match) {
+    const img = new Image();
+    img.src = match[1];
+    pending.push(img.decode().catch(() => null));
+}
+Promise.all(pending).then(() => document.fonts.ready).then(() => done(true));
+"""
+
+
+# Swaps a deck into #deck-root, then resolves once its images are decoded
+# and its fonts have loaded.
+INJECT_DECK_SCRIPT = """
+const markup = arguments[0];
+const theme = arguments[1];
+const done = arguments[arguments.length - 1];
+const root = document.getElementById('deck-root');
+root.removeAttribute('style');
+for (const [name, value] of Object.entries(theme)) {
+    root.style.setProperty(name, value);
+}
+root.innerHTML = markup;
+void root.offsetHeight;
+const pending = Array.from(root.querySelectorAll('img')).map(img => img.decode().catch(() => null));
+const backgrounds = Array.from(root.querySelectorAll('.bg-image')).map(el => el.style.backgroundImage);
+if (theme['--bg-raster']) {
+    backgrounds.push(theme['--bg-raster']);
+}
+backgrounds.forEach(value => {
+    const match = /url\\(["']?(.*?)["']?\\)/.exec(value);
+    if (match) {
+        const img = new Image();
+        img.src = match[1];
+        pending.push(img.decode().catch(() => null));
+    }
+});
+Promise.all(pending)
+    .then(() => document.fonts.ready)
+    .then(() => requestAnimationFrame(() => done(true)));
+"""
+
+
+def _batch_font_css(decks):
+    """
+    Collects @font-face rules covering every deck in a batch. Fonts missing
+    from the local store fall back to Google Fonts imports (which must come first).
+    """
+    imports = []
+    faces = []
+    for font_name in dict.fromkeys(deck["font_name"] for deck in decks):
+        glyphs = "".join(sorted(set("".join(d["glyphs"] for d in decks if d["font_name"] == font_name))))
+        css = get_font_face_css(font_name, glyphs) if FONT_SETTINGS["embed_fonts"] else None
+        if css:
+            faces.append(css)
+        else:
+            family = font_name.replace(' ', '+')
+            imports.append(f"@import url('https://fonts.googleapis.com/css2?family={family}:wght@300;400;500;600;700;800;900&display=swap');")
+    return "\n".join(imports + faces)
+
+
+@timed("render_batch")
+def generate_batch(jobs, driver=None):
+    """
+    Renders many decks through a single page load. Each job is a dict with
+    "generator", "slides" and "output_dir" (plus optional "bg_image_url",
+    "bg_opacity" and "bg_mode"). The page is loaded once with fonts for all
+    decks; each deck is then injected into #deck-root with its own theme
+    variables and captured into its own output directory.
+    Returns the generated file lists in job order.
+    """
+    if not jobs:
+        return []
+
+    first = jobs[0]["generator"]
+    owns_driver = driver is None
+    shell_path = None
+    results = []
+    try:
+        if owns_driver:
+            with timed("browser_acquire"):
+                driver = first.create_driver()
+
+        with timed("render_deck_html"):
+            decks = []
+            for job in jobs:
+                generator = job["generator"]
+                bg_args = (job.get("bg_image_url"), job.get("bg_opacity", 0.15), job.get("bg_mode", "Solid Color"))
+                bg_raster_b64 = generator.get_background_raster(driver, *bg_args)
+                decks.append(generator.build_deck(job["slides"], *bg_args, bg_raster_base64=bg_raster_b64))
+            shell_html = first.template.render(
+                slides=[],
+                primary_color=first.primary_color,
+                secondary_color=first.secondary_color,
+                bg_color="#FFFFFF",
+                text_color="#333333",
+                font_name=first.font_name,
+                font_face_css=_batch_font_css(decks),
+                bg_opacity=jobs[0].get("bg_opacity", 0.15),
+            )
+
+        fd, shell_path = tempfile.mkstemp(prefix="carousel_batch_", suffix=".html", dir=scratch_dir())
+        with os.fdopen(fd, "w") as f:
+            f.write(shell_html)
+
+        with timed("page_load"):
+            driver.get(f"file://{shell_path}")
+            first.wait_until_ready(driver)
+
+        driver.set_script_timeout(30)
+        for job, deck in zip(jobs, decks):
+            os.makedirs(job["output_dir"], exist_ok=True)
+            with timed("deck_inject"):
+                driver.execute_async_script(INJECT_DECK_SCRIPT, deck["markup"], deck["theme"])
+            results.append(job["generator"].capture_slides(driver, deck["num_slides"], job["output_dir"]))
+            increment("decks_rendered")
+
+    except Exception as e:
+        print(f"Selenium Error: {e}")
+        raise e
+    finally:
+        if owns_driver and driver:
+            driver.quit()
+        if shell_path:
+            os.remove(shell_path)
+
+    return results
+
+
+# Applies one variant's theme variables to the injected deck, then resolves
+# once its font and background raster are ready.
+APPLY_THEME_SCRIPT = """
+const theme = arguments[0];
+const done = arguments[arguments.length - 1];
+const root = document.getElementById('deck-root');
+for (const [name, value] of Object.entries(theme)) {
+    root.style.setProperty(name, value);
+}
+void root.offsetHeight;
+const pending = [document.fonts.load('700 48px ' + theme['--font-family']).catch(() => null)];
+const match = /url\\(["']?(.*?)["']?\\)/.exec(theme['--bg-raster'] || '');
+if (match) {
+    const img = new Image();
+    img.src = match[1];
+    pending.push(img.decode().catch(() => null));
+}
+Promise.all(pending)
+    .then(() => document.fonts.ready)
+    .then(() => requestAnimationFrame(() => done(true)));
+"""
+
+
+@timed("render_variants")
+def generate_variants(generator, slides_content, output_dir, seeds=None, schemes=None, fonts=None, content_type="Success Story", bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", preview_slides=3, driver=None):
+    """
+    Renders a (seed x color scheme x font) matrix of style variants of one
+    deck in a single page load, and a contact sheet to pick from.
+
+    Seeds re-draw layouts (restyle_layouts), so the deck markup is injected
+    once per seed; schemes and fonts are pure CSS variables and are swapped
+    in place. Only the first `preview_slides` slides of each variant are
+    captured. Returns {"variants": [...], "contact_sheet": path}; each
+    variant has "seed", "scheme", "font", "slides" and "paths".
+    """
+    from content_processor import restyle_layouts
+    from exporters import build_contact_sheet
+
+    seeds = list(seeds) if seeds else [42]
+    schemes = list(schemes) if schemes else [None]
+    fonts = list(fonts) if fonts else [generator.font_name]
+    unknown = [name for name in schemes if name and name not in COLOR_SCHEMES]
+    if unknown:
+        raise ValueError(f"Unknown color scheme(s): {', '.join(unknown)}")
+
+    owns_driver = driver is None
+    shell_path = None
+    variants = []
+    try:
+        if owns_driver:
+            with timed("browser_acquire"):
+                driver = generator.create_driver()
+
+        # One generator per scheme, so each gets its own (cached) background raster
+        themed = {}
+        for name in schemes:
+            scheme_generator = copy.copy(generator)
+            if name:
+                scheme_generator.primary_color = COLOR_SCHEMES[name]["primary"]
+                scheme_generator.secondary_color = COLOR_SCHEMES[name]["secondary"]
+            themed[name] = scheme_generator
+        rasters = {name: g.get_background_raster(driver, bg_image_url, bg_opacity, bg_mode) for name, g in themed.items()}
+        # Markup differs with and without a raster, so it's all or nothing
+        if not all(rasters.values()):
+            rasters = dict.fromkeys(rasters)
+
+        with timed("render_deck_html"):
+            restyled = {seed: restyle_layouts(slides_content, seed, content_type) for seed in seeds}
+            decks = {}
+            for seed in seeds:
+                decks[seed] = generator.build_deck(restyled[seed][:preview_slides or None], bg_image_url, bg_opacity, bg_mode, bg_raster_base64=rasters[schemes[0]])
+            font_decks = [{"font_name": font, "glyphs": "".join(d["glyphs"] for d in decks.values())} for font in fonts]
+            shell_html = generator.template.render(
+                slides=[],
+                primary_color=generator.primary_color,
+                secondary_color=generator.secondary_color,
+                bg_color="#FFFFFF",
+                text_color="#333333",
+                font_name=generator.font_name,
+                font_face_css=_batch_font_css(font_decks),
+                bg_opacity=bg_opacity,
+            )
+
+        fd, shell_path = tempfile.mkstemp(prefix="carousel_variants_", suffix=".html", dir=scratch_dir())
+        with os.fdopen(fd, "w") as f:
+            f.write(shell_html)
+
+        with timed("page_load"):
+            driver.get(f"file://{shell_path}")
+            generator.wait_until_ready(driver)
+
+        driver.set_script_timeout(30)
+        for seed, deck in decks.items():
+            with timed("deck_inject"):
+                driver.execute_async_script(INJECT_DECK_SCRIPT, deck["markup"], deck["theme"])
+            for name in schemes:
+                for font in fonts:
+                    theme = dict(deck["theme"])
+                    theme["--primary"] = themed[name].primary_color
+                    theme["--secondary"] = themed[name].secondary_color
+                    theme["--font-family"] = f"'{font}', sans-serif"
+                    if rasters[name]:
+                        theme["--bg-raster"] = f"url('data:image/png;base64,{rasters[name]}')"
+
+                    variant_dir = os.path.join(output_dir, f"variant_{len(variants) + 1:02d}")
+                    os.makedirs(variant_dir, exist_ok=True)
+                    with timed("theme_swap"):
+                        driver.execute_async_script(APPLY_THEME_SCRIPT, theme)
+                    paths = generator.capture_slides(driver, deck["num_slides"], variant_dir)
+                    variants.append({
+                        "seed": seed,
+                        "scheme": name or "Custom",
+                        "font": font,
+                        "slides": restyled[seed],
+                        "paths": paths
+                    })
+                    increment("variants_rendered")
+
+    except Exception as e:
+        print(f"Selenium Error: {e}")
+        raise e
+    finally:
+        if owns_driver and driver:
+            driver.quit()
+        if shell_path:
+            os.remove(shell_path)
+
+    labels = [f"#{i + 1}  seed {v['seed']} · {v['scheme']} · {v['font']}" for i, v in enumerate(variants)]
+    contact_sheet = build_contact_sheet([v["paths"] for v in variants], labels, os.path.join(output_dir, "contact_sheet.png"))
+    return {"variants": variants, "contact_sheet": contact_sheet}
@@ -85,12 +85,27 @@ FONT_OPTIONS = {
     }
 }
 
+# Local Font Store
+# Fonts are vendored into cache_dir (run `python font_store.py`) and inlined
+# into the carousel HTML so renders never wait on fonts.googleapis.com.
+FONT_SETTINGS = {
+    "cache_dir": "fonts",
+    "embed_fonts": True,
+    "subset_fonts": True,
+    "allow_download": True,
+    # A failed download isn't retried for this long
+    "download_retry_s": 600,
+    # Inlined CSS kept per (font, glyph set)
+    "css_cache_size": 64
+}
+
 # Background Modes
 BACKGROUND_MODES = {
     "Solid Color": "Clean white or custom color background",
     "Gradient Pattern": "Animated gradient mesh overlay",
     "Uploaded Image": "Custom background image with opacity control",
-    "Geometric Pattern": "Modern geometric shapes and patterns"
+    "Geometric Pattern": "Modern geometric shapes and patterns",
+    "Abstract Shapes": "Soft blurred shapes in your brand colors"
 }
 
 # Default Settings
@@ -119,5 +134,181 @@ AI_SETTINGS = {
     "max_transcript_length": 15000,
     "fallback_enabled": True,
     "content_tone": ["Professional", "Casual", "Inspirational", "Educational"],
-    "models_priority": ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash']
+    "models_priority": ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash'],
+    # End-to-end latency we aim for per generation; slower models are skipped
+    # (or given a smaller input budget) when the transcript would blow it.
+    "latency_target_s": 45,
+    "chars_per_token": 4.0,
+    # Rough per-model costs: fixed latency, seconds per 1k input tokens and
+    # the most transcript tokens worth sending. Unlisted models fall back to
+    # max_transcript_length characters.
+    "model_profiles": {
+        'gemini-3-pro-preview': {"base_latency_s": 20, "s_per_1k_input": 1.5, "input_budget_tokens": 6000},
+        'gemini-2.5-pro': {"base_latency_s": 15, "s_per_1k_input": 1.0, "input_budget_tokens": 6000},
+        'gemini-2.5-flash': {"base_latency_s": 5, "s_per_1k_input": 0.3, "input_budget_tokens": 8000}
+    }
+}
+
+# Instrumentation
+# Stage timings are kept in-process (see metrics.py), logged as JSON lines
+# and exposed by the Flask app at /metrics in Prometheus text format.
+METRICS_SETTINGS = {
+    "enabled": True,
+    "log_timings": True,
+    "prometheus_endpoint": True,
+    "buckets": [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+}
+
+# Output Lifecycle
+# Job directories are garbage-collected in the background by age and total
+# size (see output_store.py). With use_tmpfs, outputs and scratch files live
+# under tmpfs_path (RAM-backed) instead of the working directory.
+OUTPUT_SETTINGS = {
+    "streamlit_root": "output",
+    "flask_output_root": "static/output",
+    "use_tmpfs": False,
+    "tmpfs_path": "/dev/shm/carousel",
+    "max_total_mb": 2048,
+    "max_age_hours": 24,
+    "min_age_seconds": 300,
+    "gc_interval_seconds": 600,
+    # Per cache directory (backgrounds, previews, render service uploads);
+    # entries are refreshed on use, so only cold ones expire
+    "cache_limits": {"max_total_mb": 512, "max_age_hours": 168}
+}
+
+# Rendering
+# vector_pdf prints the PDF export from the rendered page (selectable text,
+# embedded fonts) instead of stitching the PNG screenshots.
+# capture_tabs > 1 captures disjoint slide subsets from several tabs of one
+# browser at once. Each extra tab is budgeted at tab_memory_mb and is only
+# opened if min_free_memory_mb would still remain available.
+RENDER_SETTINGS = {
+    "vector_pdf": True,
+    "capture_tabs": 1,
+    "tab_memory_mb": 300,
+    "min_free_memory_mb": 512
+}
+
+# Background Rasterization
+# Expensive backgrounds (gradients, dot patterns, large blurs, blended images)
+# are painted once per theme/resolution into a cached PNG that slides reuse.
+BACKGROUND_SETTINGS = {
+    "rasterize": True,
+    "cache_dir": "cache/backgrounds",
+    "raster_modes": ["Gradient Pattern", "Geometric Pattern", "Abstract Shapes", "Uploaded Image"],
+    "memory_cache_size": 32
+}
+
+# LLM Rate Limiting
+# Token buckets shared by every worker process through a SQLite file, one per
+# (API key, model) plus one per API key across models. Identical in-flight
+# prompts share a single call; rate-limit errors back off using the
+# provider's retry hint when it gives one.
+RATE_LIMIT_SETTINGS = {
+    "enabled": True,
+    "db_path": "cache/rate_limits.sqlite",
+    "per_key": {"rate_per_min": 30, "burst": 5},
+    "per_model": {
+        'gemini-3-pro-preview': {"rate_per_min": 5, "burst": 2},
+        'gemini-2.5-pro': {"rate_per_min": 5, "burst": 2},
+        'gemini-2.5-flash': {"rate_per_min": 10, "burst": 4}
+    },
+    "default_model": {"rate_per_min": 5, "burst": 2},
+    "max_wait_s": 20,
+    "max_retries": 3,
+    "backoff_base_s": 2.0,
+    "backoff_max_s": 60.0,
+    "coalesce_ttl_s": 120
+}
+
+# Slide Serving (Flask)
+# Slides are served under content-hash URLs with immutable caching; smaller
+# variants are encoded once on first request and kept next to the originals.
+SERVING_SETTINGS = {
+    "variant_widths": [360, 720, 1080],
+    "variant_formats": ["webp", "png", "jpeg"],
+    "thumbnail_width": 360,
+    "webp_quality": 82,
+    "jpeg_quality": 85,
+    "max_age_seconds": 31536000,
+    # Content hashes remembered in memory (LRU), keyed by path, size and mtime
+    "hash_cache_size": 4096
+}
+
+# Cold Start
+# Heavy dependencies are imported when their stage first runs. After the UI
+# is up, a background thread pre-imports them (and optionally resolves
+# chromedriver and starts Chrome once) so the first generation doesn't pay.
+PREWARM_SETTINGS = {
+    "enabled": True,
+    "delay_s": 1.0,
+    "modules": ["google.generativeai", "yt_dlp", "selenium.webdriver", "webdriver_manager.chrome", "numpy", "PIL.Image"],
+    "browser": False
+}
+
+# Frame Transport
+# Captured slides are decoded once into shared-memory slots that encoder
+# processes read in place (see frame_transport.py). Memory per in-flight
+# deck is slots x width x height x 4 bytes (~75 MB at the defaults).
+FRAME_SETTINGS = {
+    "slots": 4,
+    "width": 2160,
+    "height": 2160
+}
+
+# Render Service
+# A standalone render_server.py owns the browsers; app nodes with a url set
+# (or RENDER_SERVICE_URL in the environment) send decks to it instead of
+# starting Chrome. url is "http://host:port" or "unix:///path/to.sock".
+RENDER_SERVICE_SETTINGS = {
+    "url": None,
+    "fallback_local": True,
+    "host": "127.0.0.1",
+    "port": 5100,
+    "browser_slots": 2,
+    "slot_timeout_s": 120,
+    "request_timeout_s": 300,
+    "asset_dir": "cache/render_assets",
+    "output_root": "render_output"
+}
+
+# Profiling
+# Opt-in per-job profiles (see profiler.py): a sampling profiler writes
+# collapsed stacks and tracemalloc records the top allocations, saved under
+# <job output>/profile/, or fallback_dir/<job>/profile/ for jobs without an
+# output directory (collected with the other caches). sample_rate picks a
+# fraction of jobs at random; CAROUSEL_PROFILE=1 in the environment profiles
+# every job. Profiles of jobs faster than min_duration_s are discarded. Sampling alone costs a few
+# percent; tracemalloc slows allocation-heavy code several times over, more
+# with deeper tracemalloc_frames.
+PROFILING_SETTINGS = {
+    "enabled": False,
+    "sample_rate": 0.05,
+    "interval_ms": 10,
+    "all_threads": False,
+    "tracemalloc": True,
+    "tracemalloc_frames": 1,
+    "top_allocations": 30,
+    "min_duration_s": 0.0,
+    "allow_request_trigger": False,
+    "fallback_dir": "cache/profiles"
+}
+
+# Live Preview
+# "Thumbnails" renders each slide once at `width` px in a background browser
+# and reuses it until that slide's content or the theme changes; edits are
+# debounced by debounce_s. "Interactive HTML" embeds the full deck instead
+# (and is used while the preview browser is unavailable).
+PREVIEW_SETTINGS = {
+    "mode": "Thumbnails",
+    "width": 270,
+    "debounce_s": 0.4,
+    "poll_s": 0.5,
+    "retry_after_s": 30,
+    "format": "webp",
+    "memory_cache_size": 512,
+    "cache_dir": "cache/previews",
+    # Uploaded logos/backgrounds for the preview, stored by content hash
+    "asset_dir": "preview_assets"
 }
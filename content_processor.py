@@ -2,18 +2,31 @@ import os
 import json
 import re
 import random
-import google.generativeai as genai
+import hashlib
+import rate_limiter
+from metrics import timed, increment
+from config import AI_SETTINGS
+from prompt_budget import compact_prompt, compact_transcript, estimate_tokens, fit_to_budget, plan_models
+
+# The Gemini SDK is slow to import; it is loaded on the first LLM call.
+# Tests and benchmarks may assign a stand-in before that.
+genai = None
+
+def _genai():
+    global genai
+    if genai is None:
+        import google.generativeai
+        genai = google.generativeai
+    return genai
 
 def verify_api_key(api_key):
     """
     Verifies if the provided Gemini API key is valid and finds a working model.
     """
     try:
-        genai.configure(api_key=api_key)
-        # Try models in order of preference (Updated December 2, 2025)
-        models_to_try = ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash']
-        
-        for model_name in models_to_try:
+        _genai().configure(api_key=api_key)
+        # Try models in order of preference
+        for model_name in AI_SETTINGS["models_priority"]:
             try:
                 model = genai.GenerativeModel(model_name)
                 model.generate_content("Test")
@@ -25,6 +38,109 @@ def verify_api_key(api_key):
     except Exception as e:
         return False, str(e)
 
+LAYOUTS = ["layout-cover", "layout-quote", "layout-list", "layout-data", "layout-split", "layout-cta"]
+
+# Fields each layout needs (type-checked) and may have
+SLIDE_SCHEMAS = {
+    "layout-cover": {"required": {"title": str}, "optional": {"subtitle": str, "body": str}},
+    "layout-quote": {"required": {"title": str, "body": str}, "optional": {"subtitle": str}},
+    "layout-list": {"required": {"title": str, "body": list}, "optional": {"subtitle": str}},
+    "layout-data": {"required": {"title": str, "stats": list}, "optional": {"subtitle": str}},
+    "layout-split": {"required": {"title": str, "body": str}, "optional": {"subtitle": str}},
+    "layout-cta": {"required": {"title": str}, "optional": {"subtitle": str, "body": str}}
+}
+
+_summary_cache = {}
+
+def validate_slide(slide, layout=None):
+    """
+    Checks a generated slide against its layout's schema and returns a
+    cleaned copy. Raises ValueError if it can't be used.
+    """
+    if not isinstance(slide, dict):
+        raise ValueError("Slide is not an object")
+    layout = layout or slide.get("layout")
+    if layout not in SLIDE_SCHEMAS:
+        raise ValueError(f"Unknown layout: {layout}")
+    schema = SLIDE_SCHEMAS[layout]
+
+    cleaned = {"layout": layout}
+    if "image_prompt" in slide:
+        cleaned["image_prompt"] = str(slide["image_prompt"])
+    for field, kind in list(schema["required"].items()) + list(schema["optional"].items()):
+        value = slide.get(field)
+        if value is None:
+            if field in schema["required"]:
+                raise ValueError(f"{layout} slide is missing '{field}'")
+            continue
+        # Tolerate the common LLM slips: a bullet string or a list for prose
+        if kind is list and isinstance(value, str):
+            value = [value]
+        elif kind is str and isinstance(value, list):
+            value = " ".join(str(item) for item in value)
+        if not isinstance(value, kind):
+            raise ValueError(f"{layout} slide field '{field}' should be {kind.__name__}")
+        cleaned[field] = value.strip() if kind is str else value
+
+    if not cleaned["title"]:
+        raise ValueError(f"{layout} slide has an empty title")
+    if layout == "layout-list":
+        cleaned["body"] = [str(item).strip() for item in cleaned["body"] if str(item).strip()]
+        if not cleaned["body"]:
+            raise ValueError("layout-list slide has no items")
+    if layout == "layout-data":
+        stats = [stat for stat in cleaned["stats"] if isinstance(stat, dict) and stat.get("value") and stat.get("label")]
+        if not stats:
+            raise ValueError("layout-data slide has no usable stats")
+        cleaned["stats"] = [{"value": str(stat["value"]), "label": str(stat["label"])} for stat in stats[:4]]
+    return cleaned
+
+def fits_layout(slide, layout):
+    """
+    True if the slide already has every field the layout requires, with the
+    right types (no coercion), so it can switch layout without losing copy.
+    """
+    required = SLIDE_SCHEMAS[layout]["required"]
+    return all(isinstance(slide.get(field), kind) and slide.get(field) for field, kind in required.items())
+
+def restyle_layouts(slides, seed, content_type="Success Story"):
+    """
+    Returns a copy of the deck with middle-slide layouts re-drawn from
+    `seed` via get_layout_for_slide, wherever the slide's fields fit the
+    new layout. Copy is never regenerated.
+    """
+    restyled = []
+    for i, slide in enumerate(slides):
+        slide = dict(slide)
+        if 0 < i < len(slides) - 1:
+            layout = get_layout_for_slide(i, len(slides), content_type, seed)
+            if not fits_layout(slide, layout):
+                layout = slide.get("layout")
+            slide["layout"] = layout
+        restyled.append(slide)
+    return restyled
+
+def summarize_source(text, max_sentences=12):
+    """
+    Short extractive summary of the source, cached per text. Sent with
+    single-slide regeneration requests instead of the whole transcript.
+    """
+    if not text:
+        return ""
+    key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if key not in _summary_cache:
+        summary = ""
+        try:
+            from offline_summarizer import rank_sentences
+            sentences, ranked = rank_sentences(compact_transcript(text))
+            summary = " ".join(sentences[i] for i in sorted(ranked[:max_sentences]))
+        except Exception as e:
+            print(f"Source summary failed: {e}")
+        if len(_summary_cache) >= 64:
+            _summary_cache.clear()
+        _summary_cache[key] = summary or text[:2000]
+    return _summary_cache[key]
+
 def get_layout_for_slide(slide_index, total_slides, content_type, seed=0):
     """
     Deterministically selects a layout based on slide position and seed.
@@ -47,20 +163,36 @@ def get_layout_for_slide(slide_index, total_slides, content_type, seed=0):
         
     return random.choice(options)
 
-def process_content(text, api_key=None, provider="gemini", content_type="Success Story", style_seed=42):
+def summarize_offline(text, content_type="Success Story", style_seed=42):
+    """
+    Builds a deck from the text without any network calls.
+    Fast, so it doubles as the fallback when the LLM fails.
+    Returns [] if the text can't be summarized.
+    """
+    try:
+        from offline_summarizer import summarize_to_slides
+        with timed("offline_summary"):
+            return summarize_to_slides(text, content_type=content_type, style_seed=style_seed)
+    except Exception as e:
+        print(f"Offline summary failed: {e}")
+        return []
+
+def process_content(text, api_key=None, provider="gemini", content_type="Success Story", style_seed=42, draft=None):
     """
     Analyzes the transcript using an LLM to generate structured carousel content.
     Returns a list of slide objects with layout information.
+    `draft` is an offline summary already made for this text, used as the
+    fallback instead of summarizing again.
     """
     if not text:
         return [], "No text provided"
 
     error_msg = None
     
-    if api_key:
+    if api_key and provider != "offline":
         try:
             if provider == "gemini":
-                genai.configure(api_key=api_key)
+                _genai().configure(api_key=api_key)
                 
                 # Define content-type-specific prompts
                 prompts = {
@@ -112,23 +244,25 @@ def process_content(text, api_key=None, provider="gemini", content_type="Success
                 4. Extract specific stats for 'layout-data'.
                 """
                 
-                final_prompt = f"""
-                {system_prompt}
-                
-                **Input Text:**
-                {text[:20000]}
-                """
-                
-                # Try models in sequence (Updated December 2, 2025)
-                models_to_try = ['gemini-3-pro-preview', 'gemini-2.5-pro', 'gemini-2.5-flash']
+                system_prompt = compact_prompt(system_prompt)
+                with timed("prompt_compaction"):
+                    compacted = compact_transcript(text)
+                increment("transcript_tokens", estimate_tokens(text), kind="raw")
+                increment("transcript_tokens", estimate_tokens(compacted), kind="compacted")
+
+                # Models ordered by fit to the latency target, each with its input budget
+                plan = plan_models(compacted, prompt_tokens=estimate_tokens(system_prompt))
                 last_exception = None
                 
-                for model_name in models_to_try:
+                for model_name, budget in plan:
                     try:
-                        # print(f"Trying model: {model_name}...")
+                        model_text = fit_to_budget(compacted, budget, model_name)
+                        final_prompt = f"{system_prompt}\n\n**Input Text:**\n{model_text}"
+                        increment("llm_input_tokens", estimate_tokens(final_prompt, model_name), model=model_name)
                         model = genai.GenerativeModel(model_name)
-                        response = model.generate_content(final_prompt)
-                        content = response.text
+                        # Shared quotas across workers; identical in-flight prompts share one call
+                        with timed("llm_call", model=model_name):
+                            content = rate_limiter.generate(api_key, model_name, final_prompt, lambda: model.generate_content(final_prompt).text)
                         
                         # Robust JSON Extraction
                         start_idx = content.find('[')
@@ -136,11 +270,12 @@ def process_content(text, api_key=None, provider="gemini", content_type="Success
                         
                         if start_idx != -1 and end_idx != -1:
                             json_str = content[start_idx:end_idx+1]
-                            slides = json.loads(json_str)
+                            with timed("json_parse"):
+                                slides = json.loads(json_str)
                             
                             # Post-processing: Ensure layouts are valid and add variety if needed
                             for i, slide in enumerate(slides):
-                                if "layout" not in slide or slide["layout"] not in ["layout-cover", "layout-quote", "layout-list", "layout-data", "layout-split", "layout-cta"]:
+                                if "layout" not in slide or slide["layout"] not in LAYOUTS:
                                     slide["layout"] = get_layout_for_slide(i, len(slides), content_type, style_seed)
                                 
                                 # Ensure body is a list for list layouts
@@ -163,8 +298,13 @@ def process_content(text, api_key=None, provider="gemini", content_type="Success
             error_msg = f"AI generation failed: {str(e)}"
             print(f"{error_msg}. Falling back to heuristic.")
     
+    # Offline fallback: extractive summary of the actual text
+    slides = draft if draft is not None else summarize_offline(text, content_type, style_seed)
+    if slides:
+        return slides, error_msg
+
     # Fallback Heuristic (Updated for new structure)
-    # This is a basic fallback if AI fails or no key is provided
+    # Last resort if the text is too short to summarize
     random.seed(style_seed)
     
     fallback_slides = [
@@ -201,3 +341,72 @@ def process_content(text, api_key=None, provider="gemini", content_type="Success
     
     return fallback_slides, error_msg
 
+def regenerate_slides(slides, start, end=None, api_key=None, source_summary="", content_type="Success Story", instructions=""):
+    """
+    Rewrites slides[start:end+1] with the LLM, given their neighbours, their
+    layouts and a short source summary (see summarize_source), keeping each
+    slide's layout. Returns (new_slides, error_msg); on failure new_slides
+    is the unchanged range.
+    """
+    end = start if end is None else end
+    if not 0 <= start <= end < len(slides):
+        return [], f"Slide range {start}-{end} is out of bounds"
+    targets = slides[start:end + 1]
+    if not api_key:
+        return targets, "An API key is required to regenerate slides"
+
+    layouts = [slide.get("layout") if slide.get("layout") in LAYOUTS else get_layout_for_slide(start + i, len(slides), content_type) for i, slide in enumerate(targets)]
+    schema_lines = []
+    for layout in dict.fromkeys(layouts):
+        fields = [f"{name} ({kind.__name__})" for name, kind in SLIDE_SCHEMAS[layout]["required"].items()]
+        fields += [f"{name} ({kind.__name__}, optional)" for name, kind in SLIDE_SCHEMAS[layout]["optional"].items()]
+        schema_lines.append(f"- `{layout}`: " + ", ".join(fields))
+
+    context = {
+        "previous_slide": slides[start - 1] if start > 0 else None,
+        "next_slide": slides[end + 1] if end + 1 < len(slides) else None
+    }
+    prompt = compact_prompt(f"""
+        You are an expert Social Media Copywriter editing a {len(slides)}-slide "{content_type}" LinkedIn carousel.
+        Rewrite slides {start + 1}-{end + 1} so they are sharper and fit between their neighbours.
+        Keep each slide's layout. Keep text concise. {instructions}
+
+        **Layouts and fields:**
+        {chr(10).join(schema_lines)}
+
+        **Source summary:**
+        {source_summary}
+
+        **Neighbours:**
+        {json.dumps(context, ensure_ascii=False)}
+
+        **Current slides:**
+        {json.dumps(targets, ensure_ascii=False)}
+
+        Output ONLY a JSON array of exactly {len(targets)} slide objects with layouts {json.dumps(layouts)}.
+    """)
+
+    try:
+        _genai().configure(api_key=api_key)
+    except Exception as e:
+        return targets, f"AI regeneration failed: {e}"
+
+    last_error = None
+    for model_name, _ in plan_models(prompt):
+        try:
+            model = genai.GenerativeModel(model_name)
+            with timed("llm_call", model=model_name, kind="regenerate"):
+                content = rate_limiter.generate(api_key, model_name, prompt, lambda: model.generate_content(prompt).text)
+            start_idx = content.find('[')
+            end_idx = content.rfind(']')
+            if start_idx == -1 or end_idx == -1:
+                raise ValueError("No JSON array found")
+            with timed("json_parse"):
+                generated = json.loads(content[start_idx:end_idx + 1])
+            if len(generated) != len(targets):
+                raise ValueError(f"Expected {len(targets)} slides, got {len(generated)}")
+            return [validate_slide(slide, layout) for slide, layout in zip(generated, layouts)], None
+        except Exception as e:
+            last_error = e
+            continue
+    return targets, f"AI regeneration failed: {last_error}"
@@ -0,0 +1,78 @@
+import os
+import zipfile
+from io import BytesIO
+from metrics import timed
+
+
+@timed("export", format="zip")
+def build_zip(image_paths):
+    """
+    Packs the rendered slides into an in-memory ZIP archive.
+    """
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for i, path in enumerate(image_paths):
+            zip_file.write(path, f"slide_{i+1}.png")
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+@timed("export", format="pdf")
+def build_pdf(image_paths):
+    """
+    Builds a PDF with one rasterized page per slide. Returns None if there
+    are no slides.
+    """
+    from PIL import Image
+    images = [Image.open(p).convert('RGB') for p in image_paths]
+    if not images:
+        return None
+
+    pdf_buffer = BytesIO()
+    images[0].save(
+        pdf_buffer, "PDF", resolution=100.0, save_all=True, append_images=images[1:]
+    )
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+
+@timed("export", format="mp4")
+def build_video(image_paths, output_dir, seconds_per_slide=2):
+    """
+    Renders the slides into an MP4 slideshow and returns its path.
+    Requires moviepy.
+    """
+    from moviepy.editor import ImageSequenceClip
+
+    video_path = os.path.join(output_dir, "carousel.mp4")
+    clip = ImageSequenceClip(list(image_paths), fps=1.0 / seconds_per_slide)
+    clip.write_videofile(video_path, codec="libx264", fps=24, logger=None)
+    return video_path
+
+
+@timed("export", format="contact_sheet")
+def build_contact_sheet(rows, labels, output_path, thumb_size=270, padding=24, label_height=40):
+    """
+    Lays out one row of slide thumbnails per variant, labelled, and saves
+    it as a PNG. `rows` is a list of image path lists. Returns output_path.
+    """
+    from PIL import Image, ImageDraw
+
+    columns = max((len(paths) for paths in rows), default=0)
+    if not columns:
+        return None
+    cell = thumb_size + padding
+    sheet = Image.new("RGB", (padding + columns * cell, padding + len(rows) * (cell + label_height)), (255, 255, 255))
+    draw = ImageDraw.Draw(sheet)
+
+    for r, (paths, label) in enumerate(zip(rows, labels)):
+        top = padding + r * (cell + label_height)
+        draw.text((padding, top), label, fill=(51, 51, 51))
+        for c, path in enumerate(paths):
+            with Image.open(path) as image:
+                thumb = image.convert("RGB")
+                thumb.thumbnail((thumb_size, thumb_size))
+            sheet.paste(thumb, (padding + c * cell, top + label_height))
+
+    sheet.save(output_path, "PNG", optimize=True)
+    return output_path
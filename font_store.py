@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import base64
+import time
+import string
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from config import FONT_OPTIONS, FONT_SETTINGS
+
+# Google Fonts only serves woff2 (with unicode-range subsets) to modern browsers
+CSS_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+FONT_FACE_RE = re.compile(r"(?:/\*\s*([\w-]+)\s*\*/\s*)?@font-face\s*\{([^}]*)\}", re.S)
+SRC_RE = re.compile(r"url\(([^)]+)\)")
+
+# Glyphs the template renders on its own, independent of slide content
+TEMPLATE_GLYPHS = string.digits + string.punctuation + " “”’•"
+
+_css_cache = OrderedDict()
+_css_cache_lock = threading.Lock()
+# font name -> time of the last failed download
+_download_failures = {}
+
+
+def _slug(font_name):
+    return font_name.lower().replace(' ', '-')
+
+
+def _font_dir(font_name):
+    return os.path.join(FONT_SETTINGS["cache_dir"], _slug(font_name))
+
+
+def _manifest_path(font_name):
+    return os.path.join(_font_dir(font_name), "manifest.json")
+
+
+def _css_property(block, name):
+    match = re.search(rf"{name}\s*:\s*([^;]+);", block)
+    return match.group(1).strip() if match else None
+
+
+def parse_unicode_range(value):
+    """
+    Parses a CSS unicode-range value into a list of (start, end) codepoint tuples.
+    """
+    ranges = []
+    if not value:
+        return ranges
+    for part in value.split(','):
+        part = part.strip().upper().replace('U+', '')
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+        elif '?' in part:
+            start, end = part.replace('?', '0'), part.replace('?', 'F')
+        else:
+            start = end = part
+        ranges.append((int(start, 16), int(end, 16)))
+    return ranges
+
+
+def parse_font_css(css):
+    """
+    Extracts the @font-face entries from a Google Fonts stylesheet.
+    """
+    faces = []
+    for subset_name, block in FONT_FACE_RE.findall(css):
+        src = SRC_RE.search(_css_property(block, "src") or "")
+        if not src:
+            continue
+        faces.append({
+            "subset": subset_name or "default",
+            "style": _css_property(block, "font-style") or "normal",
+            "weight": _css_property(block, "font-weight") or "400",
+            "unicode_range": _css_property(block, "unicode-range"),
+            "url": src.group(1).strip('\'"'),
+        })
+    return faces
+
+
+def download_font(font_name):
+    """
+    Downloads a FONT_OPTIONS family into the local font store.
+    Returns the manifest describing the stored faces, or None on failure.
+    """
+    if font_name not in FONT_OPTIONS:
+        return None
+    failed_at = _download_failures.get(font_name)
+    if failed_at and time.monotonic() - failed_at < FONT_SETTINGS["download_retry_s"]:
+        # Offline or blocked: don't wait out the timeout on every render
+        return None
+
+    try:
+        import requests
+        response = requests.get(FONT_OPTIONS[font_name]["url"], headers={"User-Agent": CSS_USER_AGENT}, timeout=15)
+        response.raise_for_status()
+        faces = parse_font_css(response.text)
+        if not faces:
+            raise ValueError("No @font-face rules found")
+
+        font_dir = _font_dir(font_name)
+        os.makedirs(font_dir, exist_ok=True)
+
+        # Variable fonts share one file across weights, so download each URL once
+        files_by_url = {}
+        for face in faces:
+            if face["url"] not in files_by_url:
+                filename = f"{_slug(font_name)}-{face['subset']}-{len(files_by_url)}.woff2"
+                font_response = requests.get(face["url"], timeout=30)
+                font_response.raise_for_status()
+                with open(os.path.join(font_dir, filename), "wb") as f:
+                    f.write(font_response.content)
+                files_by_url[face["url"]] = filename
+            face["file"] = files_by_url[face.pop("url")]
+
+        manifest = {"family": font_name, "faces": faces}
+        with open(_manifest_path(font_name), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    except Exception as e:
+        print(f"Failed to download font {font_name}: {e}")
+        _download_failures[font_name] = time.monotonic()
+        return None
+
+
+def download_all_fonts():
+    """
+    Vendors every FONT_OPTIONS family into the local font store.
+    """
+    for font_name in FONT_OPTIONS:
+        manifest = download_font(font_name)
+        status = f"{len(manifest['faces'])} faces" if manifest else "failed"
+        print(f"{font_name}: {status}")
+
+
+def load_manifest(font_name):
+    """
+    Returns the stored manifest for a font, downloading it first if allowed.
+    """
+    path = _manifest_path(font_name)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    if FONT_SETTINGS["allow_download"]:
+        return download_font(font_name)
+    return None
+
+
+def _subset_font(font_bytes, glyphs):
+    """
+    Subsets a woff2 font to the given glyphs. Requires fontTools (and brotli);
+    returns the original bytes when unavailable.
+    """
+    try:
+        from fontTools import subset
+    except ImportError:
+        return font_bytes
+
+    try:
+        options = subset.Options()
+        options.flavor = "woff2"
+        options.layout_features = ["*"]
+        font = subset.load_font(BytesIO(font_bytes), options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(text=glyphs)
+        subsetter.subset(font)
+        buffer = BytesIO()
+        subset.save_font(font, buffer, options)
+        return buffer.getvalue()
+    except Exception as e:
+        print(f"Font subsetting failed: {e}")
+        return font_bytes
+
+
+def deck_glyphs(slides_content, *extra_text):
+    """
+    Collects the set of characters a deck will render, including the
+    uppercased forms produced by text-transform rules in the template.
+    """
+    parts = list(extra_text)
+    for slide in slides_content:
+        for key in ("title", "subtitle", "body"):
+            value = slide.get(key)
+            if isinstance(value, list):
+                parts.extend(str(item) for item in value)
+            elif value:
+                parts.append(str(value))
+        for stat in slide.get("stats") or []:
+            parts.append(str(stat.get("value", "")))
+            parts.append(str(stat.get("label", "")))
+
+    text = " ".join(parts)
+    return "".join(sorted(set(text + text.upper() + TEMPLATE_GLYPHS)))
+
+
+def get_font_face_css(font_name, glyphs=None):
+    """
+    Builds @font-face rules for a font with the files inlined as data URIs.
+    Only faces covering the given glyphs are included, and each face is
+    subset to them when fontTools is installed. Returns None if the font
+    is not available locally.
+    """
+    cache_key = (font_name, glyphs)
+    with _css_cache_lock:
+        if cache_key in _css_cache:
+            _css_cache.move_to_end(cache_key)
+            return _css_cache[cache_key]
+
+    manifest = load_manifest(font_name)
+    if not manifest:
+        return None
+
+    codepoints = {ord(c) for c in glyphs} if glyphs else None
+    font_dir = _font_dir(font_name)
+    encoded_files = {}
+    rules = []
+
+    for face in manifest["faces"]:
+        ranges = parse_unicode_range(face.get("unicode_range"))
+        if codepoints is not None and ranges:
+            face_glyphs = "".join(chr(cp) for cp in codepoints if any(lo <= cp <= hi for lo, hi in ranges))
+            if not face_glyphs:
+                continue
+        else:
+            face_glyphs = glyphs
+
+        if face["file"] not in encoded_files:
+            with open(os.path.join(font_dir, face["file"]), "rb") as f:
+                font_bytes = f.read()
+            if face_glyphs and FONT_SETTINGS["subset_fonts"]:
+                font_bytes = _subset_font(font_bytes, face_glyphs)
+            encoded_files[face["file"]] = base64.b64encode(font_bytes).decode('utf-8')
+
+        rule = (
+            "@font-face {"
+            f" font-family: '{manifest['family']}';"
+            f" font-style: {face['style']};"
+            f" font-weight: {face['weight']};"
+            " font-display: block;"
+            f" src: url(data:font/woff2;base64,{encoded_files[face['file']]}) format('woff2');"
+        )
+        if face.get("unicode_range"):
+            rule += f" unicode-range: {face['unicode_range']};"
+        rules.append(rule + " }")
+
+    css = "\n".join(rules) if rules else None
+    with _css_cache_lock:
+        _css_cache[cache_key] = css
+        while len(_css_cache) > FONT_SETTINGS["css_cache_size"]:
+            _css_cache.popitem(last=False)
+    return css
+
+
+if __name__ == "__main__":
+    download_all_fonts()
@@ -0,0 +1,292 @@
+"""
+Shared-memory frame transport from slide capture to encoder processes.
+
+Captured slides are decoded once into a fixed ring of shared-memory slots;
+encoder processes (WebP, JPEG, PNG, raster PDF) read the pixels in place.
+Only slot numbers and frame sizes travel through queues, and memory per
+in-flight deck is bounded by slots x frame size.
+
+    with FramePipeline(output_dir, encoders=("webp", "pdf")) as pipeline:
+        generator.generate_all_slides(slides, output_dir, frame_sink=pipeline.submit_png)
+    pipeline.outputs  # {"webp": [...], "pdf": [...]}
+"""
+import os
+import time
+import queue as queue_module
+import multiprocessing
+from io import BytesIO
+from multiprocessing import shared_memory
+from config import FRAME_SETTINGS
+from metrics import timed, increment
+
+ENCODERS = ("webp", "jpeg", "png", "pdf")
+CHANNELS = 4  # RGBA
+
+
+class FrameRing:
+    """
+    A fixed number of RGBA frame slots in one shared-memory segment.
+    Each published frame is read by every consumer; a slot is reused once
+    all of them have released it. Picklable into spawned processes.
+    """
+
+    def __init__(self, consumers, slots=None, width=None, height=None, ctx=None):
+        ctx = ctx or multiprocessing.get_context("spawn")
+        self.slots = slots or FRAME_SETTINGS["slots"]
+        self.width = width or FRAME_SETTINGS["width"]
+        self.height = height or FRAME_SETTINGS["height"]
+        self.frame_bytes = self.width * self.height * CHANNELS
+        self.consumers = consumers
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * self.frame_bytes)
+        self._owner = True
+        self._free = ctx.Semaphore(self.slots)
+        self._free_slots = ctx.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._refcounts = ctx.Array('i', self.slots)
+        self._queues = [ctx.Queue() for _ in range(consumers)]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = self._shm.name
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Spawned children share the parent's resource tracker, so attaching
+        # here doesn't hand ownership of the segment to this process
+        self._shm = shared_memory.SharedMemory(name=state["_shm"])
+
+    def slot_array(self, slot, width=None, height=None):
+        """
+        numpy view (no copy) of a slot's pixels as height x width x 4.
+        """
+        import numpy as np
+        width, height = width or self.width, height or self.height
+        return np.ndarray((height, width, CHANNELS), dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.frame_bytes)
+
+    def acquire_slot(self, timeout=None):
+        """
+        Waits for a free slot. This is the backpressure that bounds memory.
+        """
+        if not self._free.acquire(timeout=timeout):
+            raise TimeoutError("No free frame slot; encoders are not keeping up")
+        return self._free_slots.get()
+
+    def publish(self, slot, index, width, height):
+        with self._refcounts.get_lock():
+            self._refcounts[slot] = self.consumers
+        for q in self._queues:
+            q.put((slot, index, width, height))
+
+    def release(self, slot):
+        with self._refcounts.get_lock():
+            self._refcounts[slot] -= 1
+            done = self._refcounts[slot] == 0
+        if done:
+            self._free_slots.put(slot)
+            self._free.release()
+
+    def finish(self):
+        """
+        Tells every consumer that no more frames are coming.
+        """
+        for q in self._queues:
+            q.put(None)
+
+    def frames(self, consumer):
+        """
+        Yields (slot, index, pixels) for one consumer; `pixels` is a view
+        into shared memory, valid until release(slot).
+        """
+        while True:
+            item = self._queues[consumer].get()
+            if item is None:
+                return
+            slot, index, width, height = item
+            yield slot, index, self.slot_array(slot, width, height)
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _encode_frames(ring, consumer, kind, output_dir, results):
+    """
+    Encoder process: writes each frame as `kind` and reports the paths.
+    """
+    from PIL import Image
+    from config import SERVING_SETTINGS
+
+    paths = {}
+    pdf_path = os.path.join(output_dir, "carousel_raster.pdf")
+    # Pages are appended in slide order; only out-of-order ones are held back
+    pending_pages = {}
+    next_page = 0
+    pages_written = 0
+
+    def append_page(image):
+        nonlocal pages_written
+        image.save(pdf_path, "PDF", resolution=144.0, append=pages_written > 0)
+        pages_written += 1
+
+    def append_ready_pages():
+        nonlocal next_page
+        while next_page in pending_pages:
+            append_page(pending_pages.pop(next_page))
+            next_page += 1
+
+    try:
+        for slot, index, pixels in ring.frames(consumer):
+            try:
+                image = Image.fromarray(pixels, "RGBA")
+                if kind == "pdf":
+                    pending_pages[index] = image.convert("RGB")
+                    append_ready_pages()
+                else:
+                    path = os.path.join(output_dir, f"slide_{index + 1}.{'jpg' if kind == 'jpeg' else kind}")
+                    if kind == "webp":
+                        image.save(path, "WEBP", quality=SERVING_SETTINGS["webp_quality"], method=4)
+                    elif kind == "jpeg":
+                        image.convert("RGB").save(path, "JPEG", quality=SERVING_SETTINGS["jpeg_quality"], optimize=True)
+                    else:
+                        image.save(path, "PNG", optimize=True)
+                    paths[index] = path
+                del image
+            finally:
+                del pixels
+                ring.release(slot)
+
+        if pending_pages:
+            # A slide never arrived; keep the pages after the gap rather than drop them
+            missing = sorted(set(range(next_page, max(pending_pages))) - set(pending_pages))
+            print(f"PDF is missing slide(s) {', '.join(str(i + 1) for i in missing)}")
+            for index in sorted(pending_pages):
+                append_page(pending_pages.pop(index))
+        if kind == "pdf" and pages_written:
+            paths[0] = pdf_path
+        results.put((kind, [paths[i] for i in sorted(paths)], None))
+    except Exception as e:
+        results.put((kind, [], f"{type(e).__name__}: {e}"))
+    finally:
+        ring.close()
+
+
+class FramePipeline:
+    """
+    Owns a FrameRing and one encoder process per requested format.
+    Use as a context manager; `submit_png` is thread-safe and can be passed
+    as `frame_sink` to CarouselGenerator.generate_all_slides.
+    """
+
+    def __init__(self, output_dir, encoders=("webp",), slots=None, width=None, height=None):
+        unknown = [kind for kind in encoders if kind not in ENCODERS]
+        if unknown:
+            raise ValueError(f"Unknown encoder(s): {', '.join(unknown)}")
+        self.output_dir = output_dir
+        self.encoders = list(encoders)
+        self.outputs = {}
+        self.errors = {}
+        ctx = multiprocessing.get_context("spawn")
+        self.ring = FrameRing(len(self.encoders), slots, width, height, ctx=ctx)
+        self._results = ctx.Queue()
+        self._processes = [
+            ctx.Process(target=_encode_frames, args=(self.ring, i, kind, output_dir, self._results), name=f"encode-{kind}", daemon=True)
+            for i, kind in enumerate(self.encoders)
+        ]
+
+    def __enter__(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for process in self._processes:
+            process.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit_png(self, index, png_bytes, timeout=60):
+        """
+        Decodes a captured PNG straight into a free slot and hands it to
+        every encoder. Blocks while all slots are in use.
+        """
+        from PIL import Image
+        with timed("frame_decode"):
+            image = Image.open(BytesIO(png_bytes))
+            if image.mode != "RGBA":
+                image = image.convert("RGBA")
+        width, height = image.size
+        if width > self.ring.width or height > self.ring.height:
+            raise ValueError(f"Frame {width}x{height} exceeds slot size {self.ring.width}x{self.ring.height}")
+
+        self._check_encoders()
+        deadline = time.monotonic() + timeout
+        with timed("frame_slot_wait"):
+            while True:
+                try:
+                    slot = self.ring.acquire_slot(min(1.0, max(0.0, deadline - time.monotonic())))
+                    break
+                except TimeoutError:
+                    # A dead encoder never releases its slots; don't wait out the timeout
+                    self._check_encoders()
+                    if time.monotonic() >= deadline:
+                        raise
+        self.ring.slot_array(slot, width, height)[:] = image
+        self.ring.publish(slot, index, width, height)
+        increment("frames_transported")
+
+    def _collect(self, timeout):
+        """
+        Records one encoder's result. Returns False if none arrived in time.
+        """
+        try:
+            kind, paths, error = self._results.get(timeout=timeout)
+        except queue_module.Empty:
+            return False
+        self.outputs[kind] = paths
+        if error:
+            self.errors[kind] = error
+            print(f"Encoder {kind} failed: {error}")
+        return True
+
+    def _dead_encoders(self):
+        return [(kind, process) for kind, process in zip(self.encoders, self._processes) if kind not in self.outputs and not process.is_alive()]
+
+    def _check_encoders(self):
+        """
+        Raises with the encoder's error if one has exited before the deck was done.
+        """
+        dead = self._dead_encoders()
+        if not dead:
+            return
+        while self._collect(0.1):
+            pass
+        kind, process = dead[0]
+        error = self.errors.get(kind) or f"exited with code {process.exitcode}"
+        raise RuntimeError(f"Encoder {kind} stopped: {error}")
+
+    def close(self, timeout=120):
+        """
+        Flushes the ring, waits for the encoders and collects their outputs.
+        """
+        if not self._processes:
+            return self.outputs
+        self.ring.finish()
+        deadline = time.monotonic() + timeout
+        while any(kind not in self.outputs for kind in self.encoders):
+            if self._collect(1.0):
+                continue
+            dead = self._dead_encoders()
+            if dead or time.monotonic() >= deadline:
+                for kind, process in dead or [(kind, None) for kind in self.encoders if kind not in self.outputs]:
+                    self.errors[kind] = f"exited with code {process.exitcode}" if process else "timed out"
+                    print(f"Encoder {kind} failed: {self.errors[kind]}")
+                    self.outputs[kind] = []
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self.ring.close()
+        return self.outputs
@@ -1,17 +1,39 @@
 import os
 import sys
 import argparse
-from carousel_generator import CarouselGenerator
-from youtube_extractor import get_transcript_text
+import json
+from carousel_generator import CarouselGenerator, generate_batch, generate_variants
+from youtube_extractor import get_transcript_text, ingest_source
 from content_processor import process_content
+from config import COLOR_SCHEMES
+from profiler import profile_job
 
 def main():
     parser = argparse.ArgumentParser(description="Generate LinkedIn Carousel from YouTube Video")
     parser.add_argument("--url", help="YouTube Video URL", required=False)
     parser.add_argument("--logo", help="Path to logo file", default="/Users/musfiqurtuhin/Documents/WorkSpace/LinkedIn/637125294162617682.png")
     parser.add_argument("--output", help="Output directory", default="/Users/musfiqurtuhin/Documents/WorkSpace/LinkedIn_Carousel_Generator/output")
+    parser.add_argument("--pdf", action="store_true", help="Also print a vector PDF (carousel.pdf) from the same render")
+    parser.add_argument("--encode", help="Comma-separated extra formats encoded from shared memory while capturing (webp,jpeg,png,pdf)", default="")
+    parser.add_argument("--batch", help="JSON file with a list of decks to render in one browser page")
+    parser.add_argument("--playlist", help="Playlist or channel URL: write a --batch file with one deck per video")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent transcript downloads for --playlist")
+    parser.add_argument("--limit", type=int, help="Maximum videos to ingest for --playlist")
+    parser.add_argument("--variants", action="store_true", help="Render a contact sheet of style variants instead of one deck")
+    parser.add_argument("--seeds", help="Comma-separated layout seeds for --variants", default="42")
+    parser.add_argument("--schemes", help="Comma-separated color schemes for --variants (default: all)", default="")
+    parser.add_argument("--fonts", help="Comma-separated fonts for --variants", default="Inter")
+    parser.add_argument("--profile", action="store_true", help="Save a sampling profile and top allocations to <output>/profile")
     
     args = parser.parse_args()
+    with profile_job(args.output, force=args.profile or None):
+        return run(args)
+
+def run(args):
+    if args.batch:
+        return run_batch(args)
+    if args.playlist:
+        return run_playlist(args)
     
     # Ensure output directory exists
     os.makedirs(args.output, exist_ok=True)
@@ -20,10 +42,10 @@ def main():
     
     if args.url:
         print(f"Fetching transcript from {args.url}...")
-        text = get_transcript_text(args.url)
+        text, _ = get_transcript_text(args.url)
         if text:
             print("Processing content...")
-            slides_content = process_content(text)
+            slides_content, _ = process_content(text)
         else:
             print("Failed to extract transcript. Using default content.")
     
@@ -73,12 +95,97 @@ def main():
     print("Initializing Generator...")
     generator = CarouselGenerator(logo_path=args.logo)
     
+    if args.variants:
+        return run_variants(args, generator, slides_content)
+    
     print(f"Generating {len(slides_content)} slides...")
-    for i, slide in enumerate(slides_content):
-        path = generator.generate_slide(slide, i + 1, len(slides_content), args.output)
+    pdf_path = os.path.join(args.output, "carousel.pdf") if args.pdf else None
+    encoders = [kind.strip().lower() for kind in args.encode.split(",") if kind.strip()]
+    if encoders:
+        from frame_transport import FramePipeline
+        # Captures go straight to shared memory; the PNG encoder writes the slide files
+        if "png" not in encoders:
+            encoders.append("png")
+        with FramePipeline(args.output, encoders=encoders) as pipeline:
+            paths = generator.generate_all_slides(slides_content, args.output, pdf_path=pdf_path, frame_sink=pipeline.submit_png)
+    else:
+        paths = generator.generate_all_slides(slides_content, args.output, pdf_path=pdf_path)
+    for path in paths:
         print(f"Generated: {path}")
+    if pdf_path:
+        print(f"Generated: {pdf_path}")
+    if encoders:
+        for kind, encoded in pipeline.outputs.items():
+            print(f"Encoded {kind}: {len(encoded)} file(s)")
 
     print(f"Done! Images are in {args.output}")
 
+def run_batch(args):
+    """
+    Renders every deck in a batch file through a single page load.
+    Each entry: {"slides": [...], "output": "subdir", "font": ..., "primary": ...,
+    "secondary": ..., "bg_mode": ..., "bg_image": ..., "bg_opacity": ...}
+    """
+    with open(args.batch) as f:
+        decks = json.load(f)
+    
+    jobs = []
+    for i, deck in enumerate(decks):
+        generator = CarouselGenerator(
+            logo_path=deck.get("logo", args.logo),
+            brand_color=deck.get("primary"),
+            secondary_color=deck.get("secondary"),
+            font_name=deck.get("font", "Inter")
+        )
+        jobs.append({
+            "generator": generator,
+            "slides": deck["slides"],
+            "output_dir": os.path.join(args.output, deck.get("output", f"deck_{i+1}")),
+            "bg_image_url": deck.get("bg_image"),
+            "bg_opacity": deck.get("bg_opacity", 0.15),
+            "bg_mode": deck.get("bg_mode", "Solid Color")
+        })
+    
+    print(f"Rendering {len(jobs)} decks in one page...")
+    for job, paths in zip(jobs, generate_batch(jobs)):
+        print(f"{job['output_dir']}: {len(paths)} slides")
+
+def run_playlist(args):
+    """
+    Turns a playlist or channel into a carousel backlog: transcripts are
+    fetched concurrently and each becomes a deck in <output>/backlog.json,
+    ready for --batch.
+    """
+    os.makedirs(args.output, exist_ok=True)
+    backlog = []
+    failed = 0
+    for result in ingest_source(args.playlist, max_workers=args.workers, limit=args.limit):
+        if result["error"]:
+            failed += 1
+            print(f"✗ {result['id']} ({result['title']}): {result['error']}")
+            continue
+        slides, _ = process_content(result["text"])
+        backlog.append({"slides": slides, "output": result["id"], "title": result["title"]})
+        print(f"✓ {result['id']} ({result['title']}): {len(slides)} slides")
+    
+    backlog_path = os.path.join(args.output, "backlog.json")
+    with open(backlog_path, "w") as f:
+        json.dump(backlog, f, indent=2)
+    print(f"{len(backlog)} decks written to {backlog_path} ({failed} failed). Render with --batch {backlog_path}")
+
+def run_variants(args, generator, slides_content):
+    """
+    Renders seed x scheme x font style variants in one browser session.
+    """
+    seeds = [int(seed) for seed in args.seeds.split(",") if seed.strip()]
+    schemes = [name.strip() for name in args.schemes.split(",") if name.strip()] or list(COLOR_SCHEMES)
+    fonts = [name.strip() for name in args.fonts.split(",") if name.strip()]
+    
+    print(f"Rendering {len(seeds) * len(schemes) * len(fonts)} style variants...")
+    result = generate_variants(generator, slides_content, args.output, seeds=seeds, schemes=schemes, fonts=fonts)
+    for i, variant in enumerate(result["variants"]):
+        print(f"#{i+1}: seed {variant['seed']}, {variant['scheme']}, {variant['font']}")
+    print(f"Contact sheet: {result['contact_sheet']}")
+
 if __name__ == "__main__":
     main()
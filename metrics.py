@@ -0,0 +1,188 @@
+import sys
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from config import METRICS_SETTINGS
+
+logger = logging.getLogger("carousel.metrics")
+if METRICS_SETTINGS["log_timings"] and not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_current_job = contextvars.ContextVar("carousel_job", default=None)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def quantile(self, q):
+        """
+        Estimates a quantile from the bucket counts (upper bucket bound).
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, cumulative in zip(self.buckets, self.bucket_counts):
+            if cumulative >= target:
+                return bound
+        return self.max
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+@contextmanager
+def job_context(job_id):
+    """
+    Tags every timing logged inside the block with a job id.
+    """
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def observe(stage, duration, ok=True, **labels):
+    """
+    Records one stage duration (seconds) into the in-process histograms
+    and emits a structured log line.
+    """
+    if not METRICS_SETTINGS["enabled"]:
+        return
+
+    with _lock:
+        key = _key(stage, labels)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(METRICS_SETTINGS["buckets"])
+        histogram.observe(duration)
+        if not ok:
+            error_key = _key("stage_errors", dict(labels, stage=stage))
+            _counters[error_key] = _counters.get(error_key, 0) + 1
+
+    if METRICS_SETTINGS["log_timings"]:
+        record = {"event": "stage_timing", "stage": stage, "duration_ms": round(duration * 1000, 2), "ok": ok}
+        record.update(labels)
+        if _current_job.get():
+            record["job_id"] = _current_job.get()
+        logger.info(json.dumps(record))
+
+
+def increment(name, amount=1, **labels):
+    """
+    Increments a named counter.
+    """
+    if not METRICS_SETTINGS["enabled"]:
+        return
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timed(stage, **labels):
+    """
+    Times the enclosed block as a pipeline stage. Usable as a context
+    manager or a decorator; exceptions are counted and re-raised.
+    """
+    start = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start, ok=ok, **labels)
+
+
+def get_metrics():
+    """
+    Returns a snapshot of all histograms and counters as plain dicts.
+    """
+    with _lock:
+        stages = []
+        for (name, labels), h in sorted(_histograms.items()):
+            stages.append({
+                "stage": name,
+                "labels": dict(labels),
+                "count": h.count,
+                "total_s": round(h.total, 6),
+                "avg_s": round(h.total / h.count, 6) if h.count else None,
+                "min_s": h.min,
+                "max_s": h.max,
+                "p50_s": h.quantile(0.5),
+                "p95_s": h.quantile(0.95),
+            })
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    return {"stages": stages, "counters": counters}
+
+
+def reset_metrics():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + [(k, str(v)) for k, v in extra.items()]
+    if not items:
+        return ""
+    escaped = [(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in items]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def render_prometheus():
+    """
+    Renders the metrics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP carousel_stage_duration_seconds Time spent per pipeline stage.",
+        "# TYPE carousel_stage_duration_seconds histogram",
+    ]
+    with _lock:
+        for (name, labels), h in sorted(_histograms.items()):
+            base = (("stage", name),) + labels
+            for bound, cumulative in zip(h.buckets, h.bucket_counts):
+                lines.append(f"carousel_stage_duration_seconds_bucket{_format_labels(base, le=bound)} {cumulative}")
+            lines.append(f"carousel_stage_duration_seconds_bucket{_format_labels(base, le='+Inf')} {h.count}")
+            lines.append(f"carousel_stage_duration_seconds_sum{_format_labels(base)} {h.total}")
+            lines.append(f"carousel_stage_duration_seconds_count{_format_labels(base)} {h.count}")
+
+        typed = set()
+        for (name, labels), value in sorted(_counters.items()):
+            metric = f"carousel_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
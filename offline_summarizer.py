@@ -0,0 +1,302 @@
+"""
+Network-free extractive summarizer that turns a transcript into a carousel.
+Used when no API key is available and when the LLM fails.
+"""
+import re
+import numpy as np
+from content_processor import get_layout_for_slide
+
+STOPWORDS = set("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just let like me more most my myself no nor not now
+of off on once only or other our ours ourselves out over own really right same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very was
+we were what when where which while who whom why will with would you your yours yourself yourselves gonna
+wanna yeah okay ok um uh oh also actually basically get got go going thing things lot kind sort know mean say
+said think one two well without within
+""".split())
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'])')
+WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z'\-]+")
+NOISE_RE = re.compile(r'\[[^\]]*\]|\([^)]*(?:music|applause|laughter)[^)]*\)', re.I)
+STAT_RE = re.compile(
+    r'(?<!\w)(?P<value>[$€£]?\d+(?:[.,]\d+)?\s?(?:%|percent\b|x\b|[kKmMbB]\b|million\b|billion\b|thousand\b)?)'
+)
+CLAUSE_BREAK_RE = re.compile(r'[.!?,;:]\s|[.!?,;:]$')
+
+# Auto-captions often have no punctuation; chunk them into pseudo-sentences
+CHUNK_WORDS = 22
+# The similarity matrix is n x n; beyond this, adjacent sentences are merged
+MAX_RANKED_SENTENCES = 1500
+
+
+def split_sentences(text):
+    """
+    Segments text into sentences, chunking unpunctuated caption text.
+    """
+    text = NOISE_RE.sub(' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    if not text:
+        return []
+
+    sentences = [s.strip() for s in SENTENCE_SPLIT_RE.split(text) if s.strip()]
+    result = []
+    for sentence in sentences:
+        words = sentence.split()
+        if len(words) <= CHUNK_WORDS * 2:
+            result.append(sentence)
+            continue
+        for i in range(0, len(words), CHUNK_WORDS):
+            result.append(" ".join(words[i:i + CHUNK_WORDS]))
+    # Captions repeat themselves; keep the first occurrence of each sentence
+    seen = set()
+    unique = []
+    for sentence in result:
+        key = re.sub(r'\W+', ' ', sentence.lower()).strip()
+        if len(sentence.split()) >= 4 and key not in seen:
+            seen.add(key)
+            unique.append(sentence)
+    return unique
+
+
+def _merge_for_ranking(sentences):
+    group = -(-len(sentences) // MAX_RANKED_SENTENCES)
+    if group <= 1:
+        return sentences
+    return [" ".join(sentences[i:i + group]) for i in range(0, len(sentences), group)]
+
+
+def _tokens(sentence):
+    return [w for w in (m.group(0).lower() for m in WORD_RE.finditer(sentence)) if w not in STOPWORDS and len(w) > 2]
+
+
+def tfidf_matrix(sentences):
+    """
+    Returns (L2-normalized TF-IDF matrix, vocabulary list) for the sentences.
+    """
+    tokenized = [_tokens(s) for s in sentences]
+    vocab = {}
+    for tokens in tokenized:
+        for token in tokens:
+            vocab.setdefault(token, len(vocab))
+
+    counts = np.zeros((len(sentences), max(len(vocab), 1)), dtype=np.float64)
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            counts[row, vocab[token]] += 1.0
+
+    lengths = counts.sum(axis=1, keepdims=True)
+    tf = np.divide(counts, lengths, out=np.zeros_like(counts), where=lengths > 0)
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1.0 + len(sentences)) / (1.0 + df)) + 1.0
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    return matrix, sorted(vocab, key=vocab.get)
+
+
+def textrank_scores(similarity, damping=0.85, iterations=50, tolerance=1e-6):
+    """
+    PageRank over the sentence similarity graph (power iteration).
+    """
+    n = similarity.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    weights = similarity.copy()
+    np.fill_diagonal(weights, 0.0)
+    row_sums = weights.sum(axis=1, keepdims=True)
+    # Sentences with no neighbours link uniformly so the walk stays stochastic
+    transition = np.where(row_sums > 0, weights / np.where(row_sums > 0, row_sums, 1.0), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * transition.T @ scores
+        if np.abs(updated - scores).sum() < tolerance:
+            return updated
+        scores = updated
+    return scores
+
+
+def _stat_label(sentence, match):
+    """
+    Up to three content words describing a stat: the ones right after it
+    ("40% fewer tickets"), or the ones before it when the clause ends or
+    moves on ("grew revenue by 45% in 2023").
+    """
+    after = sentence[match.end():]
+    # The clause ends at punctuation or the next number, whichever is first
+    ends = [m.start() for m in (CLAUSE_BREAK_RE.search(after), re.search(r'\d', after)) if m]
+    after = after[:min(ends)] if ends else after
+    after_words = [m.group(0).lower() for m in WORD_RE.finditer(after)]
+    if after_words and after_words[0] not in STOPWORDS:
+        return _tokens(" ".join(after_words[:4]))[:3]
+
+    before = sentence[:match.start()]
+    breaks = list(CLAUSE_BREAK_RE.finditer(before))
+    before = before[breaks[-1].end():] if breaks else before
+    return _tokens(before)[-3:] or _tokens(after)[:3]
+
+
+def extract_stats(sentences, limit=4):
+    """
+    Finds numbers, percentages and multipliers with a short label taken
+    from the words around them.
+    """
+    stats = []
+    seen = set()
+    for sentence in sentences:
+        for match in STAT_RE.finditer(sentence):
+            value = match.group("value").strip().replace(" percent", "%").replace("percent", "%")
+            if not re.search(r'[%$€£xkKmMbB]|million|billion|thousand', value) and len(value.strip('.,')) < 2:
+                continue
+            if re.fullmatch(r'(19|20)\d\d', value):
+                continue  # A year, not a statistic
+            label_words = _stat_label(sentence, match)
+            if not label_words or value in seen:
+                continue
+            seen.add(value)
+            stats.append({"value": value, "label": " ".join(label_words).title()})
+            if len(stats) >= limit:
+                return stats
+    return stats
+
+
+def _shorten(sentence, max_words):
+    words = sentence.split()
+    if len(words) <= max_words:
+        return sentence.rstrip(' ,;:')
+    words = words[:max_words]
+    while words and words[-1].lower().strip(',.;:') in STOPWORDS:
+        words.pop()
+    return " ".join(words).rstrip(',;:') + "…"
+
+
+def _headline(sentence, max_words=9):
+    return _shorten(sentence, max_words).rstrip('.…!?').strip().capitalize()
+
+
+def _keywords(matrix, vocab, rows, limit=3):
+    if not len(rows) or not vocab:
+        return []
+    weights = matrix[rows].sum(axis=0)
+    return [vocab[i] for i in np.argsort(-weights)[:limit] if weights[i] > 0]
+
+
+def _score(sentences):
+    matrix, vocab = tfidf_matrix(sentences)
+    similarity = matrix @ matrix.T
+    scores = textrank_scores(similarity)
+    # Slight lead bias: openings usually frame the topic
+    scores = scores * (1.0 + 0.15 * np.exp(-np.arange(len(sentences)) / max(len(sentences) / 10.0, 1.0)))
+    return matrix, vocab, similarity, scores
+
+
+def rank_sentences(text):
+    """
+    Returns (sentences, indices ordered from most to least central).
+    """
+    sentences = _merge_for_ranking(split_sentences(text or ""))
+    if not sentences:
+        return [], []
+    scores = _score(sentences)[3]
+    return sentences, [int(i) for i in np.argsort(-scores)]
+
+
+def summarize_to_slides(text, content_type="Success Story", style_seed=42, num_slides=None):
+    """
+    Builds a carousel deck from the text alone, in milliseconds.
+    Returns [] if the text is too short to summarize.
+    """
+    sentences = _merge_for_ranking(split_sentences(text or ""))
+    if len(sentences) < 3:
+        return []
+
+    matrix, vocab, similarity, scores = _score(sentences)
+    ranked = [int(i) for i in np.argsort(-scores)]
+
+    if num_slides is None:
+        num_slides = min(8, max(5, 4 + len(sentences) // 15))
+
+    used = set()
+
+    def take(count):
+        picked = [i for i in ranked if i not in used][:count]
+        used.update(picked)
+        return sorted(picked)
+
+    def take_group(size):
+        # A seed sentence plus its most similar unused neighbours form one list
+        available = [i for i in ranked if i not in used]
+        if not available:
+            return []
+        seed = available[0]
+        neighbours = sorted(available[1:], key=lambda i: -similarity[seed, i])[:size - 1]
+        group = sorted([seed] + neighbours)
+        used.update(group)
+        return group
+
+    stats = extract_stats([sentences[i] for i in ranked])
+    all_keywords = _keywords(matrix, vocab, list(range(len(sentences))), limit=3)
+
+    slides = []
+    for index in range(num_slides):
+        layout = get_layout_for_slide(index, num_slides, content_type, style_seed)
+        if layout == "layout-data" and len(stats) < 2:
+            layout = "layout-list"
+
+        if layout == "layout-cover":
+            picked = take(2)
+            lead = max(picked, key=lambda i: scores[i])
+            other = [i for i in picked if i != lead]
+            slides.append({
+                "layout": layout,
+                "title": _headline(sentences[lead], 8),
+                "subtitle": content_type,
+                "body": _shorten(sentences[other[0]], 22) if other else ""
+            })
+        elif layout == "layout-cta":
+            slides.append({
+                "layout": layout,
+                "title": "Ready to Put This Into Practice?",
+                "subtitle": " · ".join(word.title() for word in all_keywords) or content_type,
+                "body": "Follow for more"
+            })
+        elif layout == "layout-data":
+            picked = take(1)
+            slides.append({
+                "layout": layout,
+                "title": _headline(sentences[picked[0]], 7) if picked else "By the Numbers",
+                "subtitle": "By the Numbers",
+                "stats": stats[:4]
+            })
+            stats = stats[4:]
+        elif layout == "layout-list":
+            group = take_group(4)
+            if not group:
+                break
+            slides.append({
+                "layout": layout,
+                "title": " & ".join(word.title() for word in _keywords(matrix, vocab, group, limit=2)) or "Key Points",
+                "body": [_shorten(sentences[i], 12) for i in group]
+            })
+        else:
+            picked = take(1)
+            if not picked:
+                break
+            sentence = sentences[picked[0]]
+            slides.append({
+                "layout": layout,
+                "title": " ".join(word.title() for word in _keywords(matrix, vocab, picked, limit=2)) or "Insight",
+                "subtitle": content_type,
+                "body": _shorten(sentence, 30)
+            })
+
+    # Make sure the deck always ends on a call to action
+    if slides and slides[-1]["layout"] != "layout-cta":
+        slides.append({
+            "layout": "layout-cta",
+            "title": "Ready to Put This Into Practice?",
+            "subtitle": " · ".join(word.title() for word in all_keywords) or content_type,
+            "body": "Follow for more"
+        })
+    return slides
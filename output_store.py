@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import shutil
+import tempfile
+import threading
+from config import OUTPUT_SETTINGS
+from metrics import increment
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _use_tmpfs():
+    tmpfs_parent = os.path.dirname(os.path.normpath(OUTPUT_SETTINGS["tmpfs_path"]))
+    return OUTPUT_SETTINGS["use_tmpfs"] and os.path.isdir(tmpfs_parent)
+
+
+def _resolve_root(root):
+    """
+    Maps a store root onto tmpfs when in-memory operation is enabled.
+    """
+    if _use_tmpfs():
+        # Named after the whole path: "static/output" and "output" must not
+        # share (and garbage-collect) one directory
+        normalized = os.path.normpath(root)
+        slug = re.sub(r'[^\w.-]+', '_', normalized).strip('_') or "root"
+        digest = hashlib.sha1(os.path.abspath(normalized).encode('utf-8')).hexdigest()[:8]
+        return os.path.join(OUTPUT_SETTINGS["tmpfs_path"], f"{slug}-{digest}")
+    return root
+
+
+def scratch_dir():
+    """
+    Directory for short-lived render files (e.g. the HTML page Chrome loads).
+    Lives on tmpfs when in-memory operation is enabled.
+    """
+    if _use_tmpfs():
+        path = os.path.join(OUTPUT_SETTINGS["tmpfs_path"], "scratch")
+        os.makedirs(path, exist_ok=True)
+        return path
+    return tempfile.gettempdir()
+
+
+def _entry_stats(path):
+    """
+    Returns (last_modified, total_bytes) for a job directory or cache file.
+    """
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+    last_modified = os.path.getmtime(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                stat = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            total += stat.st_size
+            last_modified = max(last_modified, stat.st_mtime)
+    return last_modified, total
+
+
+class OutputStore:
+    """
+    Per-job output directories under one root, with age- and size-based
+    garbage collection. Jobs younger than `min_age_seconds` are never
+    evicted for size, so in-progress renders aren't pulled from under a request.
+    """
+
+    def __init__(self, root, max_total_mb=None, max_age_hours=None, min_age_seconds=None, use_tmpfs=True):
+        self.root = _resolve_root(root) if use_tmpfs else root
+        max_total_mb = OUTPUT_SETTINGS["max_total_mb"] if max_total_mb is None else max_total_mb
+        max_age_hours = OUTPUT_SETTINGS["max_age_hours"] if max_age_hours is None else max_age_hours
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_hours * 3600
+        self.min_age_seconds = OUTPUT_SETTINGS["min_age_seconds"] if min_age_seconds is None else min_age_seconds
+        self._gc_thread = None
+        self._stop = threading.Event()
+        os.makedirs(self.root, exist_ok=True)
+
+    def create_job_dir(self, job_id=None):
+        """
+        Creates a fresh job directory. Returns (job_id, path).
+        """
+        job_id = job_id or str(uuid.uuid4())
+        path = self.job_path(job_id)
+        os.makedirs(path, exist_ok=True)
+        return job_id, path
+
+    def job_path(self, job_id):
+        return os.path.join(self.root, os.path.basename(job_id))
+
+    def release(self, job):
+        """
+        Deletes a job directory (by id or path) as soon as it is no longer needed.
+        """
+        if not job:
+            return
+        path = job if os.sep in job else self.job_path(job)
+        if os.path.abspath(path).startswith(os.path.abspath(self.root) + os.sep):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def collect_garbage(self):
+        """
+        Removes expired jobs, then evicts the oldest ones until the store fits
+        its quota. Returns (jobs_removed, bytes_freed).
+        """
+        now = time.time()
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0, 0
+
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                last_modified, size = _entry_stats(path)
+            except OSError:
+                continue
+            entries.append((last_modified, size, path))
+
+        removed, freed = 0, 0
+        total = sum(size for _, size, _ in entries)
+        for last_modified, size, path in sorted(entries):
+            age = now - last_modified
+            expired = age > self.max_age_seconds
+            over_quota = total > self.max_total_bytes and age > self.min_age_seconds
+            if not (expired or over_quota):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            removed += 1
+            freed += size
+            total -= size
+
+        if removed:
+            increment("output_jobs_collected", removed)
+            increment("output_bytes_collected", freed)
+        return removed, freed
+
+    def start_background_gc(self, interval=None):
+        """
+        Runs collect_garbage() periodically on a daemon thread. Idempotent.
+        """
+        if self._gc_thread and self._gc_thread.is_alive():
+            return
+        interval = interval or OUTPUT_SETTINGS["gc_interval_seconds"]
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.collect_garbage()
+                except Exception as e:
+                    print(f"Output GC failed: {e}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._gc_thread = threading.Thread(target=loop, name=f"output-gc:{self.root}", daemon=True)
+        self._gc_thread.start()
+
+    def stop_background_gc(self):
+        self._stop.set()
+
+
+def get_output_store(root, start_gc=True):
+    """
+    Returns the process-wide store for a root, starting its background GC.
+    """
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = OutputStore(root)
+    if start_gc:
+        store.start_background_gc()
+    return store
+
+
+def cache_dirs():
+    """
+    Flat caches that grow with use: rasterized backgrounds, preview
+    thumbnails and their assets, render service uploads and profiles of
+    jobs without an output directory.
+    """
+    from config import BACKGROUND_SETTINGS, PREVIEW_SETTINGS, PROFILING_SETTINGS, RENDER_SERVICE_SETTINGS
+    return [BACKGROUND_SETTINGS["cache_dir"], PREVIEW_SETTINGS["cache_dir"], PREVIEW_SETTINGS["asset_dir"], RENDER_SERVICE_SETTINGS["asset_dir"], PROFILING_SETTINGS["fallback_dir"]]
+
+
+def start_cache_gc():
+    """
+    Garbage-collects every cache directory by age and size, like job
+    directories. Caches stay where their modules expect them (never tmpfs).
+    Idempotent.
+    """
+    limits = OUTPUT_SETTINGS["cache_limits"]
+    stores = []
+    for root in cache_dirs():
+        key = ("cache", root)
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = OutputStore(root, limits["max_total_mb"], limits["max_age_hours"], use_tmpfs=False)
+        store.start_background_gc()
+        stores.append(store)
+    return stores
@@ -0,0 +1,221 @@
+"""
+Low-resolution slide thumbnails for the live preview.
+
+A single background thread (with its own small browser) renders only the
+slides whose content or theme changed, at PREVIEW_SETTINGS["width"] pixels.
+Requests are debounced per session, so a burst of edits renders once, and
+thumbnails are cached by content so unchanged slides are shown immediately.
+"""
+import os
+import io
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from config import PREVIEW_SETTINGS, SERVING_SETTINGS
+from metrics import timed, increment
+from slide_assets import content_hash
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+class PreviewRenderer:
+    def __init__(self, width=None, debounce_s=None, driver_factory=None):
+        self.width = width or PREVIEW_SETTINGS["width"]
+        self.debounce_s = PREVIEW_SETTINGS["debounce_s"] if debounce_s is None else debounce_s
+        self.driver_factory = driver_factory
+        self.error = None
+        self._error_at = 0.0
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._in_flight = set()
+        # Per session, the keys being rendered for it right now
+        self._waiting = {}
+        self._cond = threading.Condition()
+        self._driver = None
+        self._thread = None
+
+    def slide_key(self, slide, theme):
+        """
+        Identifies a thumbnail: the slide's own content plus everything in the
+        theme that changes its pixels (asset files by content hash).
+        """
+        theme = dict(theme)
+        for field in ("logo_path", "bg_image_url"):
+            path = theme.get(field)
+            if path and os.path.exists(path):
+                theme[field] = content_hash(path)
+        payload = json.dumps([slide, theme, self.width], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+    def get(self, key):
+        with self._cond:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        path = self._cache_path(key)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            self._remember(key, data)
+            return data
+        return None
+
+    def thumbnails(self, session_id, slides, theme):
+        """
+        Returns [(key, image bytes or None)] for the deck, and schedules the
+        missing ones to render once edits have paused for debounce_s.
+        """
+        keyed = [(self.slide_key(slide, theme), slide) for slide in slides]
+        results = [(key, self.get(key)) for key, _ in keyed]
+        missing = [(key, slide) for (key, slide), (_, data) in zip(keyed, results) if data is None]
+        if missing:
+            self.schedule(session_id, missing, theme)
+        return results
+
+    def available(self):
+        """
+        False for retry_after_s after a failed render (e.g. no Chrome).
+        """
+        return not self.error or time.monotonic() - self._error_at >= PREVIEW_SETTINGS["retry_after_s"]
+
+    def schedule(self, session_id, keyed_slides, theme):
+        if not self.available():
+            return
+        # Snapshot now: the editor keeps mutating the same slide dicts
+        keyed_slides = copy.deepcopy(keyed_slides)
+        with self._cond:
+            # A newer request from the same session replaces the pending one
+            self._pending[session_id] = (time.monotonic() + self.debounce_s, keyed_slides, dict(theme))
+            self._ensure_thread()
+            self._cond.notify()
+
+    def is_pending(self, session_id):
+        with self._cond:
+            return session_id in self._pending or session_id in self._waiting
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="preview-renderer", daemon=True)
+            self._thread.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._pending:
+                    session_id, (due, keyed_slides, theme) = min(self._pending.items(), key=lambda item: item[1][0])
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        del self._pending[session_id]
+                        todo = OrderedDict((key, slide) for key, slide in keyed_slides if key not in self._cache and key not in self._in_flight)
+                        self._in_flight.update(todo)
+                        if todo:
+                            self._waiting.setdefault(session_id, set()).update(todo)
+                        return todo, theme
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            todo, theme = self._next_job()
+            if not todo:
+                continue
+            try:
+                with timed("preview_render", slides=len(todo)):
+                    self._render(todo, theme)
+                self.error = None
+            except Exception as e:
+                self.error = str(e)
+                self._error_at = time.monotonic()
+                print(f"Preview render failed: {e}")
+                self._reset_driver()
+            finally:
+                with self._cond:
+                    self._in_flight.difference_update(todo)
+                    for session_id in list(self._waiting):
+                        self._waiting[session_id].difference_update(todo)
+                        if not self._waiting[session_id]:
+                            del self._waiting[session_id]
+
+    def _render(self, todo, theme):
+        from PIL import Image
+        from carousel_generator import CarouselGenerator
+
+        generator = CarouselGenerator(
+            logo_path=theme.get("logo_path"),
+            brand_color=theme.get("brand_color"),
+            secondary_color=theme.get("secondary_color"),
+            font_name=theme.get("font_name", "Inter"),
+            author_handle=theme.get("author_handle", "@metamorphosis"),
+            brand_name=theme.get("brand_name", "Metamorphosis")
+        )
+        keys = list(todo)
+        driver = self._get_driver(generator)
+        # Only the changed slides are laid out, as a small deck of their own
+        with generator.loaded_page(list(todo.values()), theme.get("bg_image_url"), theme.get("bg_opacity", 0.15), theme.get("bg_mode", "Solid Color"), driver=driver):
+            for i, key in enumerate(keys):
+                png_bytes = driver.find_element("id", f"slide-{i+1}").screenshot_as_png
+                image = Image.open(io.BytesIO(png_bytes))
+                if image.width != self.width:
+                    image = image.resize((self.width, round(image.height * self.width / image.width)), Image.LANCZOS)
+                buffer = io.BytesIO()
+                if PREVIEW_SETTINGS["format"] == "webp":
+                    image.save(buffer, "WEBP", quality=SERVING_SETTINGS["webp_quality"])
+                else:
+                    image.save(buffer, "PNG", optimize=True)
+                self._store(key, buffer.getvalue())
+                increment("preview_thumbnails_rendered")
+
+    def _get_driver(self, generator):
+        if self._driver is None:
+            self._driver = self.driver_factory() if self.driver_factory else generator.create_driver()
+            try:
+                # Paint at thumbnail scale instead of downsizing 2160px captures
+                self._driver.execute_cdp_cmd("Emulation.setDeviceMetricsOverride", {
+                    "width": 1200, "height": 1200, "deviceScaleFactor": self.width / 1080.0, "mobile": False
+                })
+            except Exception as e:
+                print(f"Could not lower preview scale, resizing instead: {e}")
+        return self._driver
+
+    def _reset_driver(self):
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+            self._driver = None
+
+    def _cache_path(self, key):
+        return os.path.join(PREVIEW_SETTINGS["cache_dir"], f"{key}.{PREVIEW_SETTINGS['format']}")
+
+    def _remember(self, key, data):
+        with self._cond:
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            while len(self._cache) > PREVIEW_SETTINGS["memory_cache_size"]:
+                self._cache.popitem(last=False)
+
+    def _store(self, key, data):
+        os.makedirs(PREVIEW_SETTINGS["cache_dir"], exist_ok=True)
+        tmp_path = self._cache_path(key) + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._cache_path(key))
+        self._remember(key, data)
+
+
+def get_preview_renderer():
+    """
+    The process-wide renderer shared by every session.
+    """
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PreviewRenderer()
+        return _renderer
@@ -0,0 +1,118 @@
+"""
+Background pre-warming of heavy dependencies, and an import-time report.
+
+    python prewarm.py            # what each heavy module costs to import
+"""
+import sys
+import time
+import importlib
+import threading
+import subprocess
+from config import PREWARM_SETTINGS
+from metrics import timed
+
+APP_MODULES = ["app", "content_processor", "carousel_generator", "youtube_extractor", "exporters"]
+
+_started = False
+_lock = threading.Lock()
+
+
+def import_timed(module_name):
+    """
+    Imports a module, recording how long it took as the "import" stage.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    with timed("import", module=module_name):
+        return importlib.import_module(module_name)
+
+
+def warm_browser():
+    """
+    Resolves chromedriver and starts Chrome once, so binaries are on disk
+    and in the page cache before the first render.
+    """
+    from carousel_generator import CarouselGenerator, resolve_driver_path
+    with timed("browser_prewarm"):
+        resolve_driver_path()
+        CarouselGenerator(logo_path=None).create_driver().quit()
+
+
+def _prewarm(modules, browser, delay):
+    time.sleep(delay)
+    for module_name in modules:
+        try:
+            import_timed(module_name)
+        except Exception as e:
+            print(f"Pre-warm import of {module_name} failed: {e}")
+    if browser:
+        try:
+            warm_browser()
+        except Exception as e:
+            print(f"Browser pre-warm failed: {e}")
+
+
+def start_prewarm(modules=None, browser=None):
+    """
+    Starts pre-warming on a daemon thread, once per process.
+    Call it after the UI has been served.
+    """
+    global _started
+    if not PREWARM_SETTINGS["enabled"]:
+        return False
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    thread = threading.Thread(
+        target=_prewarm,
+        args=(
+            modules or PREWARM_SETTINGS["modules"],
+            PREWARM_SETTINGS["browser"] if browser is None else browser,
+            PREWARM_SETTINGS["delay_s"]
+        ),
+        name="prewarm",
+        daemon=True
+    )
+    thread.start()
+    return True
+
+
+def import_cost(module_name):
+    """
+    Cold import time of one module, measured in a fresh interpreter with
+    -X importtime. Returns (self_ms, cumulative_ms), or None if it fails.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module_name and not parts[2][1:].startswith(" "):
+            self_us = int(parts[0].split(":")[1])
+            return round(self_us / 1000, 1), round(int(parts[1]) / 1000, 1)
+    return None
+
+
+def import_report(modules=None):
+    """
+    Returns [(module, cumulative_ms)] for the app modules and the heavy
+    dependencies, slowest first.
+    """
+    modules = modules or APP_MODULES + PREWARM_SETTINGS["modules"]
+    report = []
+    for module_name in modules:
+        cost = import_cost(module_name)
+        report.append((module_name, cost[1] if cost else None))
+    return sorted(report, key=lambda item: -(item[1] or 0))
+
+
+if __name__ == "__main__":
+    print(f"{'module':<28}{'cold import':>14}")
+    for module_name, cumulative_ms in import_report():
+        print(f"{module_name:<28}{'failed' if cumulative_ms is None else f'{cumulative_ms:.0f} ms':>14}")
@@ -0,0 +1,233 @@
+"""
+Opt-in per-job profiling: a low-overhead sampling profiler plus tracemalloc
+snapshots, saved next to the job's output.
+
+    with profile_job(output_dir, job_id):
+        ...  # the whole job
+
+Writes <output_dir>/profile/:
+    stacks.collapsed   one "frame;frame;frame count" line per stack, for
+                       flamegraph.pl, speedscope or inferno
+    allocations.txt    top allocation sites grown during the job
+    summary.json       duration, sample count, hottest functions, peak memory
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from config import PROFILING_SETTINGS
+from metrics import increment
+
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+_tracemalloc_lock = threading.Lock()
+
+
+def should_profile(force=None):
+    """
+    Whether to profile this job: `force` wins, then CAROUSEL_PROFILE, then
+    the configured sample rate.
+    """
+    if force is not None:
+        return bool(force)
+    env = os.environ.get("CAROUSEL_PROFILE")
+    if env:
+        return env not in ("0", "false", "no")
+    if not PROFILING_SETTINGS["enabled"]:
+        return False
+    return random.random() < PROFILING_SETTINGS["sample_rate"]
+
+
+_labels = {}
+
+
+def _frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        label = _labels[code] = _format_frame(code)
+    return label
+
+
+def _format_frame(code):
+    path = code.co_filename
+    if "site-packages" in path:
+        # Keep the package path so "selenium/..." and "jinja2/..." stand out
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif os.path.basename(path) == "__init__.py":
+        path = os.path.join(os.path.basename(os.path.dirname(path)), "__init__.py")
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """
+    Samples thread stacks every `interval_s` from a background thread and
+    counts them as collapsed stacks. Without `all_threads`, only the
+    starting thread and threads created during the job are sampled.
+    """
+
+    def __init__(self, interval_s, all_threads=False):
+        self.interval_s = interval_s
+        self.all_threads = all_threads
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._job_thread = threading.get_ident()
+        self._preexisting = set()
+
+    def start(self):
+        self._preexisting = {t.ident for t in threading.enumerate()} - {self._job_thread}
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (not self.all_threads and thread_id in self._preexisting):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(f"thread:{names.get(thread_id, thread_id)}")
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def hottest(self, limit=20):
+        """
+        Functions by self samples (top of stack) and by total samples.
+        """
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in self.counts.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        return {
+            "self": [{"frame": frame, "samples": n} for frame, n in self_counts.most_common(limit)],
+            "total": [{"frame": frame, "samples": n} for frame, n in total_counts.most_common(limit)]
+        }
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            # Concurrent jobs share one trace; leave -X tracemalloc runs alone
+            tracemalloc.start(PROFILING_SETTINGS["tracemalloc_frames"])
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+    return tracemalloc.take_snapshot()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    snapshot = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+    return snapshot, peak
+
+
+class JobProfile:
+    def __init__(self, job_id=None):
+        self.job_id = job_id
+        self.sampler = StackSampler(PROFILING_SETTINGS["interval_ms"] / 1000.0, PROFILING_SETTINGS["all_threads"])
+        self.use_tracemalloc = PROFILING_SETTINGS["tracemalloc"]
+        self.started = None
+        self.duration = None
+        self._first_snapshot = None
+        self.allocations = []
+        self.peak_bytes = None
+        self.profile_dir = None
+
+    def start(self):
+        if self.use_tracemalloc:
+            self._first_snapshot = _start_tracemalloc()
+        self.started = time.perf_counter()
+        self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+        self.duration = time.perf_counter() - self.started
+        if self.use_tracemalloc:
+            snapshot, self.peak_bytes = _stop_tracemalloc()
+            # Leave out the profiler's own bookkeeping
+            own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            stats = snapshot.filter_traces(own).compare_to(self._first_snapshot.filter_traces(own), "lineno")
+            self.allocations = [stat for stat in stats if stat.size_diff > 0][:PROFILING_SETTINGS["top_allocations"]]
+            self._first_snapshot = None
+
+    def save(self, profile_dir):
+        os.makedirs(profile_dir, exist_ok=True)
+        self.sampler.write_collapsed(os.path.join(profile_dir, "stacks.collapsed"))
+        if self.use_tracemalloc:
+            with open(os.path.join(profile_dir, "allocations.txt"), "w") as f:
+                for stat in self.allocations:
+                    f.write(f"{stat}\n")
+        summary = {
+            "job_id": self.job_id,
+            "duration_s": round(self.duration, 3),
+            "samples": self.sampler.samples,
+            "interval_ms": PROFILING_SETTINGS["interval_ms"],
+            "peak_traced_mb": round(self.peak_bytes / (1024 * 1024), 2) if self.peak_bytes is not None else None,
+            "hottest": self.sampler.hottest(),
+            "allocations": [
+                {"site": str(stat.traceback[0]), "size_diff_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+                for stat in self.allocations[:10]
+            ]
+        }
+        with open(os.path.join(profile_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return profile_dir
+
+
+@contextmanager
+def profile_job(output_dir=None, job_id=None, force=None):
+    """
+    Profiles the enclosed job if it is selected (see should_profile) and
+    saves the result to <output_dir>/profile. Yields the JobProfile, or None
+    when this job isn't profiled.
+    """
+    if not should_profile(force):
+        yield None
+        return
+
+    profile = JobProfile(job_id)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        if profile.duration >= PROFILING_SETTINGS["min_duration_s"]:
+            base_dir = output_dir or os.path.join(PROFILING_SETTINGS["fallback_dir"], job_id or time.strftime("%Y%m%d-%H%M%S"))
+            try:
+                profile.profile_dir = profile.save(os.path.join(base_dir, "profile"))
+                increment("jobs_profiled")
+                print(f"Profile saved to {profile.profile_dir}")
+            except OSError as e:
+                print(f"Failed to save profile: {e}")
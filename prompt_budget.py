@@ -0,0 +1,118 @@
+"""
+Shrinks transcripts before they are sent to the LLM and picks the model
+and input budget for a generation.
+"""
+import re
+from config import AI_SETTINGS
+
+NOISE_RE = re.compile(r'\[[^\]]*\]|\((?:music|applause|laughter|inaudible|crosstalk)[^)]*\)|>>', re.I)
+# Phrase fillers only when set off by a comma; "you know what" is content
+FILLER_RE = re.compile(r"\b(?:u+m+|u+h+|e+r+m+|h+m+)\b[,.]?\s*|,?\s*\b(?:you know|i mean)\b,", re.I)
+REPEATED_WORD_RE = re.compile(r'\b(\w+)(?:\s+\1\b)+', re.I)
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def estimate_tokens(text, model_name=None):
+    """
+    Cheap token estimate (no tokenizer round trip).
+    """
+    if not text:
+        return 0
+    chars_per_token = _profile(model_name).get("chars_per_token", AI_SETTINGS["chars_per_token"])
+    return int(len(text) / chars_per_token) + 1
+
+
+def compact_prompt(prompt):
+    """
+    Strips the indentation and blank lines a triple-quoted prompt carries.
+    """
+    lines = [line.strip() for line in prompt.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def compact_transcript(text):
+    """
+    Normalizes a raw transcript: drops caption noise and fillers, collapses
+    stuttered words and whitespace, and removes repeated sentences.
+    """
+    text = NOISE_RE.sub(' ', text)
+    text = FILLER_RE.sub('', text)
+    text = REPEATED_WORD_RE.sub(r'\1', text)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+
+    seen = set()
+    sentences = []
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        key = re.sub(r'\W+', ' ', sentence.lower()).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    return " ".join(sentences)
+
+
+def fit_to_budget(text, max_tokens, model_name=None):
+    """
+    Cuts text down to `max_tokens`. Keeps the highest-ranked sentences
+    (offline TextRank) in their original order rather than the first N
+    characters, so the ending of a long video isn't lost.
+    """
+    if estimate_tokens(text, model_name) <= max_tokens:
+        return text
+
+    max_chars = int(max_tokens * _profile(model_name).get("chars_per_token", AI_SETTINGS["chars_per_token"]))
+    try:
+        from offline_summarizer import rank_sentences
+        sentences, ranked = rank_sentences(text)
+    except Exception as e:
+        print(f"Sentence ranking failed, truncating instead: {e}")
+        return text[:max_chars]
+
+    kept, used = set(), 0
+    for index in ranked:
+        length = len(sentences[index]) + 1
+        if used + length > max_chars:
+            continue
+        kept.add(index)
+        used += length
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def _profile(model_name):
+    return AI_SETTINGS.get("model_profiles", {}).get(model_name, {})
+
+
+def _input_budget(model_name):
+    profile = _profile(model_name)
+    if "input_budget_tokens" in profile:
+        return profile["input_budget_tokens"]
+    return int(AI_SETTINGS["max_transcript_length"] / AI_SETTINGS["chars_per_token"])
+
+
+def plan_models(text, prompt_tokens=0, latency_target_s=None, models=None):
+    """
+    Orders the models to try for this input and assigns each an input budget.
+    Returns [(model_name, transcript_token_budget), ...].
+
+    Models are kept in priority order, but any whose estimated latency would
+    exceed the target are moved behind the ones that fit. A model that only
+    fits with a smaller input gets that smaller budget.
+    """
+    models = models or AI_SETTINGS["models_priority"]
+    latency_target_s = latency_target_s or AI_SETTINGS["latency_target_s"]
+
+    fitting, slow = [], []
+    for model_name in models:
+        text_tokens = estimate_tokens(text, model_name)
+        budget = min(text_tokens, _input_budget(model_name))
+        profile = _profile(model_name)
+        if profile.get("s_per_1k_input"):
+            # Largest input that still meets the latency target
+            affordable = (latency_target_s - profile.get("base_latency_s", 0)) * 1000.0 / profile["s_per_1k_input"] - prompt_tokens
+            if affordable < min(budget, 1000):
+                slow.append((model_name, budget))
+                continue
+            budget = min(budget, int(affordable))
+        fitting.append((model_name, budget))
+    return fitting + slow
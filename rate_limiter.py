@@ -0,0 +1,268 @@
+"""
+Admission control for LLM calls shared by every worker process.
+
+Token buckets and in-flight call records live in one SQLite file, so
+Streamlit sessions, Flask workers and CLI runs on the same machine draw
+from the same quotas without an external service.
+"""
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+from config import RATE_LIMIT_SETTINGS
+from metrics import increment, observe
+
+_local = threading.local()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+RETRY_HINT_RES = [
+    re.compile(r'retry in ([\d.]+)\s*s', re.I),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.I),
+    re.compile(r'retry-after:?\s*([\d.]+)', re.I),
+]
+
+
+class RateLimited(Exception):
+    """
+    Raised when a call can't be admitted within max_wait_s.
+    """
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        db_path = RATE_LIMIT_SETTINGS["db_path"]
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL, blocked_until REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS calls (key TEXT PRIMARY KEY, owner TEXT, started REAL, finished REAL, result TEXT, error TEXT)")
+        _local.conn = conn
+    return conn
+
+
+def _key_id(api_key):
+    # Quotas are per key, but the key itself is never written to disk
+    return hashlib.sha256((api_key or "anonymous").encode('utf-8')).hexdigest()[:16]
+
+
+def _buckets_for(api_key, model_name):
+    key_id = _key_id(api_key)
+    model_quota = RATE_LIMIT_SETTINGS["per_model"].get(model_name, RATE_LIMIT_SETTINGS["default_model"])
+    return [
+        (f"{key_id}:*", RATE_LIMIT_SETTINGS["per_key"]),
+        (f"{key_id}:{model_name}", model_quota),
+    ]
+
+
+def try_acquire(buckets, cost=1.0):
+    """
+    Takes `cost` tokens from every bucket, or from none. Returns 0 on
+    success, otherwise the seconds until all buckets could afford it.
+    """
+    conn = _connection()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        states = []
+        wait = 0.0
+        for key, quota in buckets:
+            row = conn.execute("SELECT tokens, updated, blocked_until FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated, blocked_until = row if row else (quota["burst"], now, 0.0)
+            rate = quota["rate_per_min"] / 60.0
+            tokens = min(quota["burst"], tokens + (now - updated) * rate)
+            if blocked_until > now:
+                wait = max(wait, blocked_until - now)
+            elif tokens < cost:
+                wait = max(wait, (cost - tokens) / rate)
+            states.append((key, tokens, blocked_until))
+
+        for key, tokens, blocked_until in states:
+            remaining = tokens - cost if not wait else tokens
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)", (key, remaining, now, blocked_until))
+        conn.execute("COMMIT")
+        return wait
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def acquire(api_key, model_name, max_wait=None):
+    """
+    Blocks until the key's and model's buckets admit one call. Raises
+    RateLimited if that would take longer than `max_wait` seconds.
+    """
+    max_wait = RATE_LIMIT_SETTINGS["max_wait_s"] if max_wait is None else max_wait
+    buckets = _buckets_for(api_key, model_name)
+    started = time.monotonic()
+    while True:
+        wait = try_acquire(buckets)
+        if not wait:
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                observe("rate_limit_wait", waited, model=model_name)
+            return
+        if time.monotonic() - started + wait > max_wait:
+            increment("rate_limit_rejections", model=model_name)
+            raise RateLimited(f"{model_name} is rate limited; retry in {wait:.1f}s", retry_after=wait)
+        time.sleep(min(wait, 1.0) + random.uniform(0, 0.05))
+
+
+def penalize(api_key, model_name, seconds):
+    """
+    Blocks the model's bucket for everyone using this key, e.g. after the
+    provider answered 429 with a retry hint.
+    """
+    conn = _connection()
+    key = _buckets_for(api_key, model_name)[1][0]
+    until = time.time() + seconds
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT tokens, updated, blocked_until FROM buckets WHERE key = ?", (key,)).fetchone()
+        tokens, updated, blocked_until = row if row else (0.0, time.time(), 0.0)
+        conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)", (key, tokens, updated, max(until, blocked_until)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def is_rate_limit_error(error):
+    text = f"{type(error).__name__} {error}"
+    return "429" in text or "ResourceExhausted" in text or "quota" in text.lower() or "rate limit" in text.lower()
+
+
+def retry_hint(error):
+    """
+    Seconds the provider asked us to wait, if the error says.
+    """
+    retry_delay = getattr(error, "retry_delay", None)
+    if hasattr(retry_delay, "total_seconds"):
+        return retry_delay.total_seconds()
+    if isinstance(retry_delay, (int, float)):
+        return float(retry_delay)
+    for pattern in RETRY_HINT_RES:
+        match = pattern.search(str(error))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _call_with_backoff(api_key, model_name, call):
+    max_retries = RATE_LIMIT_SETTINGS["max_retries"]
+    for attempt in range(max_retries + 1):
+        acquire(api_key, model_name)
+        try:
+            return call()
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            increment("rate_limit_errors", model=model_name)
+            hint = retry_hint(e)
+            delay = hint if hint is not None else min(
+                RATE_LIMIT_SETTINGS["backoff_max_s"],
+                RATE_LIMIT_SETTINGS["backoff_base_s"] * (2 ** attempt)
+            ) * random.uniform(0.5, 1.5)
+            # Everyone sharing the key backs off, not just this caller
+            penalize(api_key, model_name, delay)
+            if attempt == max_retries or delay > RATE_LIMIT_SETTINGS["max_wait_s"]:
+                raise RateLimited(f"{model_name} rate limited: {e}", retry_after=delay)
+
+
+def _claim(call_key, owner):
+    """
+    Records this process as the one making `call_key`. Returns True if
+    claimed, False if the same call is already in flight elsewhere.
+    Finished calls are never reused, so asking again gets a fresh answer.
+    """
+    conn = _connection()
+    now = time.time()
+    ttl = RATE_LIMIT_SETTINGS["coalesce_ttl_s"]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM calls WHERE finished < ?", (now - ttl,))
+        row = conn.execute("SELECT started, finished FROM calls WHERE key = ?", (call_key,)).fetchone()
+        in_flight = row is not None and not row[1] and now - row[0] < ttl
+        if not in_flight:
+            conn.execute("INSERT OR REPLACE INTO calls VALUES (?, ?, ?, NULL, NULL, NULL)", (call_key, owner, now))
+        conn.execute("COMMIT")
+        return not in_flight
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _finish(call_key, result=None, error=None):
+    _connection().execute("UPDATE calls SET finished = ?, result = ?, error = ? WHERE key = ?", (time.time(), result, error, call_key))
+
+
+def _wait_for_other_process(call_key):
+    deadline = time.time() + RATE_LIMIT_SETTINGS["coalesce_ttl_s"]
+    while time.time() < deadline:
+        row = _connection().execute("SELECT finished, result, error FROM calls WHERE key = ?", (call_key,)).fetchone()
+        if row is None:
+            return None
+        if row[0]:
+            if row[2]:
+                return None  # The other attempt failed; make our own
+            return row[1]
+        time.sleep(0.25)
+    return None
+
+
+def _run_shared(call_key, api_key, model_name, call):
+    owner = f"{os.getpid()}:{threading.get_ident()}"
+    while not _claim(call_key, owner):
+        increment("llm_calls_coalesced", model=model_name)
+        result = _wait_for_other_process(call_key)
+        if result is not None:
+            return result
+        # The other attempt failed; only one of its waiters wins the next claim
+
+    try:
+        result = _call_with_backoff(api_key, model_name, call)
+    except Exception as e:
+        _finish(call_key, error=str(e))
+        raise
+    _finish(call_key, result=result)
+    return result
+
+
+def generate(api_key, model_name, prompt, call):
+    """
+    Runs `call()` (which must return the response text) under the shared
+    rate limits. Identical prompts to the same model that are in flight, in
+    this process or another, share one call.
+    """
+    if not RATE_LIMIT_SETTINGS["enabled"]:
+        return call()
+
+    call_key = hashlib.sha256(f"{_key_id(api_key)}\0{model_name}\0{prompt}".encode('utf-8')).hexdigest()
+    with _inflight_lock:
+        future = _inflight.get(call_key)
+        leader = future is None
+        if leader:
+            future = _inflight[call_key] = Future()
+
+    if not leader:
+        increment("llm_calls_coalesced", model=model_name)
+        return future.result()
+
+    try:
+        result = _run_shared(call_key, api_key, model_name, call)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(call_key, None)
@@ -0,0 +1,185 @@
+"""
+Client for render_server.py, used by CarouselGenerator when a render
+service is configured. Talks HTTP over TCP or a Unix socket (stdlib only).
+"""
+import os
+import json
+import socket
+import base64
+import hashlib
+import http.client
+from urllib.parse import urlsplit
+from config import RENDER_SERVICE_SETTINGS
+from metrics import timed, increment
+from slide_assets import content_hash
+
+
+class RenderServiceError(Exception):
+    pass
+
+
+def service_url():
+    """
+    The configured render service, or None to render in-process.
+    """
+    return os.environ.get("RENDER_SERVICE_URL") or RENDER_SERVICE_SETTINGS["url"]
+
+
+def _download(url):
+    """
+    Fetches an http(s) image for upload. Returns its bytes, or None.
+    """
+    from urllib.request import urlopen
+    if urlsplit(url).scheme not in ("http", "https"):
+        return None
+    try:
+        with urlopen(url, timeout=10) as response:
+            return response.read()
+    except (OSError, ValueError) as e:
+        print(f"Failed to download image: {e}")
+        return None
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RenderClient:
+    def __init__(self, url=None, timeout=None):
+        self.url = url or service_url()
+        if not self.url:
+            raise RenderServiceError("No render service configured")
+        self.timeout = timeout or RENDER_SERVICE_SETTINGS["request_timeout_s"]
+        self._known_assets = set()
+
+    def _connection(self):
+        parts = urlsplit(self.url)
+        if parts.scheme == "unix":
+            return _UnixHTTPConnection(parts.path, timeout=self.timeout)
+        if parts.scheme == "https":
+            return http.client.HTTPSConnection(parts.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Returns (status, body bytes).
+        """
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.read()
+        except OSError as e:
+            raise RenderServiceError(f"Render service unreachable at {self.url}: {e}")
+        finally:
+            conn.close()
+
+    def _json(self, method, path, payload):
+        status, body = self.request(method, path, json.dumps(payload).encode('utf-8'), {"Content-Type": "application/json"})
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            data = {"error": body[:200].decode('utf-8', 'replace')}
+        return status, data
+
+    def health(self):
+        status, body = self.request("GET", "/health")
+        return json.loads(body) if status == 200 else None
+
+    def ensure_asset(self, path):
+        """
+        Makes sure the service has this file (or these bytes), uploading it
+        only if its content hash is unknown there. Returns the hash.
+        """
+        if isinstance(path, bytes):
+            data, digest = path, hashlib.sha256(path).hexdigest()[:16]
+        else:
+            data, digest = None, content_hash(path)
+        if digest in self._known_assets:
+            return digest
+        status, _ = self.request("HEAD", f"/assets/{digest}")
+        if status == 404:
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            status, body = self.request("PUT", f"/assets/{digest}", data, {"Content-Type": "application/octet-stream"})
+            if status not in (200, 201):
+                raise RenderServiceError(f"Asset upload failed ({status}): {body[:200]!r}")
+            increment("render_assets_sent")
+        self._known_assets.add(digest)
+        return digest
+
+    def render(self, slides_content, theme, logo_path=None, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", pdf=False, inline=True):
+        """
+        Renders a deck on the service. Returns its JSON response: image URLs
+        and hashes (plus base64 data when `inline`) and an optional PDF URL.
+        """
+        local_assets = {}
+        if logo_path and os.path.exists(logo_path):
+            local_assets["logo"] = logo_path
+        if bg_image_url and os.path.exists(bg_image_url):
+            local_assets["background"] = bg_image_url
+        elif bg_image_url:
+            # The service only reads uploaded assets, so remote images are fetched here
+            background = _download(bg_image_url)
+            if background:
+                local_assets["background"] = background
+        assets = {key: self.ensure_asset(path) for key, path in local_assets.items()}
+
+        payload = {
+            "slides": slides_content,
+            "theme": theme,
+            "assets": assets,
+            "bg_mode": bg_mode,
+            "bg_opacity": bg_opacity,
+            "pdf": pdf,
+            "inline": inline
+        }
+        with timed("render_service_request"):
+            status, data = self._json("POST", "/render", payload)
+            if status == 409:
+                # The service lost (or never had) an asset; upload again and retry
+                self._known_assets.difference_update(data.get("missing", []))
+                for key, path in local_assets.items():
+                    assets[key] = self.ensure_asset(path)
+                status, data = self._json("POST", "/render", payload)
+        if status != 200:
+            raise RenderServiceError(f"Render failed ({status}): {data.get('error')}")
+        return data
+
+    def fetch(self, url):
+        status, body = self.request("GET", url)
+        if status != 200:
+            raise RenderServiceError(f"Fetching {url} failed ({status})")
+        return body
+
+    def render_to_dir(self, slides_content, output_dir, theme, logo_path=None, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", pdf_path=None, frame_sink=None):
+        """
+        Renders remotely and writes slide_N.png (and the PDF) into output_dir,
+        like CarouselGenerator.generate_all_slides (including handing slides
+        to `frame_sink` instead of writing them). Returns the slide paths.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        result = self.render(slides_content, theme, logo_path, bg_image_url, bg_opacity, bg_mode, pdf=bool(pdf_path), inline=True)
+        paths = []
+        for i, image in enumerate(result["images"]):
+            png_bytes = base64.b64decode(image["data"]) if "data" in image else self.fetch(image["url"])
+            path = os.path.join(output_dir, os.path.basename(image["url"]))
+            if frame_sink:
+                frame_sink(i, png_bytes)
+            else:
+                with open(path, "wb") as f:
+                    f.write(png_bytes)
+            paths.append(path)
+            increment("slides_rendered")
+        if pdf_path and result.get("pdf"):
+            with open(pdf_path, "wb") as f:
+                f.write(self.fetch(result["pdf"]))
+        return paths
@@ -0,0 +1,283 @@
+"""
+Standalone render service: owns a few warm Chrome instances and renders
+decks for any number of app nodes.
+
+    python render_server.py --port 5100
+    python render_server.py --socket /tmp/carousel-render.sock
+
+API (JSON unless noted):
+    GET  /health                   slot usage
+    HEAD /assets/<hash>            200 if the asset is already stored
+    PUT  /assets/<hash>            raw bytes; stored once per content hash
+    POST /render                   {slides, theme, assets, bg_mode, bg_opacity, pdf, inline}
+    GET  /artifacts/<job>/<file>   rendered slides and PDF
+
+Identical requests (same slides, theme and asset hashes) are answered from
+the previous render while its output is still around.
+"""
+import os
+import json
+import queue
+import base64
+import hashlib
+import argparse
+import threading
+import weakref
+from contextlib import contextmanager
+from flask import Flask, abort, jsonify, request, send_from_directory
+from config import RENDER_SERVICE_SETTINGS
+from metrics import job_context, increment, timed
+from output_store import get_output_store, start_cache_gc
+from slide_assets import content_hash
+
+THEME_FIELDS = ("brand_color", "secondary_color", "font_name", "author_handle", "brand_name")
+
+
+class AssetStore:
+    """
+    Uploaded logos and backgrounds, stored once under their content hash.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        if not digest or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        path = os.path.join(self.root, digest)
+        return path if os.path.exists(path) else None
+
+    def put(self, digest, data):
+        """
+        Stores `data` if it hashes to `digest`. Returns True if it was new.
+        """
+        if hashlib.sha256(data).hexdigest()[:len(digest)] != digest or len(digest) < 16:
+            raise ValueError("Asset content does not match its hash")
+        if self.path(digest):
+            return False
+        tmp_path = os.path.join(self.root, f".{digest}.{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, os.path.join(self.root, digest))
+        return True
+
+
+class BrowserPool:
+    """
+    A fixed number of browser slots. Drivers are started on first use and
+    reused; one that fails a render is quit and replaced next time.
+    """
+
+    def __init__(self, slots, factory=None):
+        self.slots = slots
+        self.factory = factory or _new_driver
+        self._free = threading.Semaphore(slots)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.waiting = 0
+
+    @contextmanager
+    def slot(self, timeout=None):
+        with self._lock:
+            self.waiting += 1
+        try:
+            with timed("render_slot_wait"):
+                acquired = self._free.acquire(timeout=timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            raise TimeoutError("All browser slots are busy")
+
+        with self._lock:
+            self.busy += 1
+        driver = None
+        healthy = False
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with timed("browser_acquire"):
+                    driver = self.factory()
+            yield driver
+            healthy = True
+        finally:
+            if driver is not None:
+                if healthy:
+                    self._idle.put(driver)
+                else:
+                    _quit(driver)
+            with self._lock:
+                self.busy -= 1
+            self._free.release()
+
+    def close(self):
+        while True:
+            try:
+                _quit(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _new_driver():
+    from carousel_generator import CarouselGenerator
+    return CarouselGenerator(logo_path=None).create_driver()
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        print(f"Failed to quit browser: {e}")
+
+
+def request_key(data):
+    """
+    Stable id for a render request, so repeats can reuse the output.
+    """
+    from carousel_generator import CarouselGenerator
+    fields = {k: data.get(k) for k in ("slides", "theme", "assets", "bg_mode", "bg_opacity", "pdf")}
+    fields["template"] = CarouselGenerator(logo_path=None).template_version()
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+
+def create_app(slots=None, asset_dir=None, output_root=None, driver_factory=None):
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 32 * 1024 * 1024
+    assets = AssetStore(asset_dir or RENDER_SERVICE_SETTINGS["asset_dir"])
+    store = get_output_store(output_root or RENDER_SERVICE_SETTINGS["output_root"])
+    start_cache_gc()
+    pool = BrowserPool(slots or RENDER_SERVICE_SETTINGS["browser_slots"], driver_factory)
+    # A job's lock lives only while some request holds it, failed renders included
+    job_locks = weakref.WeakValueDictionary()
+    job_locks_lock = threading.Lock()
+    app.extensions["render_pool"] = pool
+    app.extensions["render_job_locks"] = job_locks
+
+    @app.route('/health')
+    def health():
+        return jsonify({"slots": pool.slots, "busy": pool.busy, "waiting": pool.waiting})
+
+    @app.route('/assets/<digest>', methods=['HEAD', 'GET'])
+    def has_asset(digest):
+        path = assets.path(digest)
+        if not path:
+            abort(404)
+        return send_from_directory(assets.root, digest)
+
+    @app.route('/assets/<digest>', methods=['PUT'])
+    def put_asset(digest):
+        try:
+            created = assets.put(digest, request.get_data())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        increment("render_assets_uploaded" if created else "render_assets_deduplicated")
+        return jsonify({"hash": digest}), 201 if created else 200
+
+    @app.route('/render', methods=['POST'])
+    def render():
+        data = request.get_json(silent=True) or {}
+        slides = data.get('slides')
+        if not isinstance(slides, list) or not slides:
+            return jsonify({"error": "'slides' (non-empty list) is required"}), 400
+
+        if data.get('bg_image_url'):
+            # Never read server paths or fetch URLs on a client's behalf
+            return jsonify({"error": "Backgrounds must be uploaded as assets"}), 400
+
+        asset_refs = data.get('assets') or {}
+        missing = [digest for digest in asset_refs.values() if digest and not assets.path(digest)]
+        if missing:
+            # The client uploads these and retries
+            return jsonify({"error": "Unknown assets", "missing": missing}), 409
+
+        job_id = request_key(data)
+        with job_locks_lock:
+            lock = job_locks.setdefault(job_id, threading.Lock())
+        with lock, job_context(job_id):
+            job_dir = store.job_path(job_id)
+            manifest_path = os.path.join(job_dir, "manifest.json")
+            cached = os.path.exists(manifest_path)
+            if cached:
+                increment("render_requests_cached")
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+            else:
+                try:
+                    manifest = _render_job(data, job_dir, assets, pool, store, job_id)
+                except TimeoutError as e:
+                    return jsonify({"error": str(e)}), 503
+                except Exception as e:
+                    print(f"Render failed: {e}")
+                    store.release(job_id)
+                    return jsonify({"error": str(e)}), 500
+
+        response = {"job": job_id, "cached": cached, "images": [], "pdf": None}
+        for filename in manifest["images"]:
+            image = {"url": f"/artifacts/{job_id}/{filename}", "hash": content_hash(os.path.join(job_dir, filename))}
+            if data.get('inline'):
+                with open(os.path.join(job_dir, filename), "rb") as f:
+                    image["data"] = base64.b64encode(f.read()).decode('utf-8')
+            response["images"].append(image)
+        if manifest.get("pdf"):
+            response["pdf"] = f"/artifacts/{job_id}/{manifest['pdf']}"
+        return jsonify(response)
+
+    @app.route('/artifacts/<job_id>/<path:filename>')
+    def artifact(job_id, filename):
+        return send_from_directory(store.job_path(job_id), filename, max_age=3600)
+
+    return app
+
+
+def _render_job(data, job_dir, assets, pool, store, job_id):
+    from carousel_generator import CarouselGenerator
+
+    theme = data.get('theme') or {}
+    asset_refs = data.get('assets') or {}
+    store.create_job_dir(job_id)
+    generator = CarouselGenerator(logo_path=assets.path(asset_refs.get('logo')), **{k: theme[k] for k in THEME_FIELDS if theme.get(k)})
+    bg_image = assets.path(asset_refs.get('background'))
+    pdf_path = os.path.join(job_dir, "carousel.pdf") if data.get('pdf') else None
+
+    with pool.slot(RENDER_SERVICE_SETTINGS["slot_timeout_s"]) as driver:
+        paths = generator.generate_all_slides(
+            data['slides'],
+            job_dir,
+            bg_image,
+            float(data.get('bg_opacity', 0.15)),
+            data.get('bg_mode', "Solid Color"),
+            driver=driver,
+            pdf_path=pdf_path
+        )
+        if len(paths) < len(data['slides']):
+            # Usually a crashed tab; don't hand this browser to the next job
+            raise RuntimeError(f"Captured {len(paths)} of {len(data['slides'])} slides")
+    increment("render_requests_rendered")
+
+    manifest = {
+        "images": [os.path.basename(path) for path in paths],
+        "pdf": "carousel.pdf" if pdf_path and os.path.exists(pdf_path) else None
+    }
+    with open(os.path.join(job_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carousel render service")
+    parser.add_argument("--host", default=RENDER_SERVICE_SETTINGS["host"])
+    parser.add_argument("--port", type=int, default=RENDER_SERVICE_SETTINGS["port"])
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--slots", type=int, help="Browser slots (concurrent renders)")
+    args = parser.parse_args()
+
+    app = create_app(slots=args.slots)
+    host = f"unix://{args.socket}" if args.socket else args.host
+    app.run(host=host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Content-addressed slide files for HTTP serving: stable hashes for cache
+busting and immutable caching, plus resized/re-encoded variants that are
+generated once and stored beside the original.
+"""
+import os
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from config import SERVING_SETTINGS
+from metrics import timed, increment
+
+VARIANT_DIR = ".variants"
+MIMETYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+_hash_cache = OrderedDict()
+_hash_cache_lock = threading.Lock()
+# A variant's lock lives only while some request is encoding or waiting on it
+_locks = weakref.WeakValueDictionary()
+_locks_lock = threading.Lock()
+
+
+def content_hash(path):
+    """
+    Short sha256 of a file's bytes, memoized on (path, size, mtime) for the
+    most recently hashed files.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_cache_lock:
+        digest = _hash_cache.get(key)
+        if digest is not None:
+            _hash_cache.move_to_end(key)
+            return digest
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()[:16]
+    with _hash_cache_lock:
+        _hash_cache[key] = digest
+        while len(_hash_cache) > SERVING_SETTINGS["hash_cache_size"]:
+            _hash_cache.popitem(last=False)
+    return digest
+
+
+def store_by_hash(data, directory, ext="png"):
+    """
+    Writes `data` to <directory>/<hash>.<ext> unless it's already there, so
+    identical uploads share a file and different ones never overwrite each
+    other. Returns the path.
+    """
+    path = os.path.join(directory, f"{hashlib.sha256(data).hexdigest()[:16]}.{ext}")
+    if os.path.exists(path):
+        os.utime(path)  # Still in use; keeps it from cache GC
+        return path
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _lock_for(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def variant_path(path, width=None, fmt=None):
+    """
+    Returns the path of `path` resized to `width` and/or re-encoded as
+    `fmt`, encoding it on first use. The variant is named after the
+    original's content hash, so a re-rendered slide never serves a stale one.
+    """
+    source_fmt = os.path.splitext(path)[1].lstrip(".").lower().replace("jpg", "jpeg")
+    fmt = fmt or source_fmt
+    if width is None and fmt == source_fmt:
+        return path
+    if width is not None and width not in SERVING_SETTINGS["variant_widths"]:
+        raise ValueError(f"Unsupported width: {width}")
+    if fmt not in SERVING_SETTINGS["variant_formats"]:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    base = os.path.splitext(os.path.basename(path))[0]
+    target = os.path.join(os.path.dirname(path), VARIANT_DIR, f"{base}.{content_hash(path)}.{width or 'full'}.{fmt}")
+    if os.path.exists(target):
+        increment("slide_variant_hits")
+        return target
+
+    with _lock_for(target):
+        if os.path.exists(target):
+            return target
+        from PIL import Image
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with timed("slide_variant_encode", format=fmt):
+            with Image.open(path) as image:
+                if width and image.width > width:
+                    image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                if fmt == "jpeg":
+                    image = image.convert("RGB")
+                options = {"optimize": True}
+                if fmt == "webp":
+                    options = {"quality": SERVING_SETTINGS["webp_quality"], "method": 4}
+                elif fmt == "jpeg":
+                    options["quality"] = SERVING_SETTINGS["jpeg_quality"]
+                tmp_path = f"{target}.{os.getpid()}.tmp"
+                image.save(tmp_path, fmt.upper(), **options)
+            os.replace(tmp_path, target)
+        increment("slide_variant_misses")
+    return target
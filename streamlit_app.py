@@ -1,15 +1,20 @@
 import streamlit as st
 import os
 import shutil
-import uuid
-import zipfile
 import json
-from io import BytesIO
+import uuid
 import streamlit.components.v1 as components
-from carousel_generator import CarouselGenerator
+from carousel_generator import CarouselGenerator, generate_variants
 from youtube_extractor import get_transcript_text
-from content_processor import process_content, verify_api_key
-from config import COLOR_SCHEMES, FONT_OPTIONS, BACKGROUND_MODES, CONTENT_TYPES, DEFAULT_SETTINGS
+from content_processor import process_content, regenerate_slides, summarize_offline, summarize_source, verify_api_key
+from exporters import build_zip, build_pdf, build_video
+from output_store import get_output_store, start_cache_gc
+from metrics import job_context, get_metrics
+from profiler import profile_job
+from prewarm import start_prewarm
+from preview_renderer import get_preview_renderer
+from slide_assets import store_by_hash
+from config import COLOR_SCHEMES, FONT_OPTIONS, BACKGROUND_MODES, CONTENT_TYPES, DEFAULT_SETTINGS, OUTPUT_SETTINGS, PREVIEW_SETTINGS, RENDER_SETTINGS
 
 # Page Config
 st.set_page_config(
@@ -106,14 +111,14 @@ with st.sidebar:
     st.divider()
     
     st.subheader("🎨 Design System")
-    color_scheme_name = st.selectbox("Color Palette", list(COLOR_SCHEMES.keys()))
+    color_scheme_name = st.selectbox("Color Palette", list(COLOR_SCHEMES.keys()), key="color_scheme")
     scheme = COLOR_SCHEMES[color_scheme_name]
     
     col1, col2 = st.columns(2)
     primary_color = col1.color_picker("Primary", scheme['primary'])
     secondary_color = col2.color_picker("Secondary", scheme['secondary'])
     
-    font_name = st.selectbox("Typography", list(FONT_OPTIONS.keys()))
+    font_name = st.selectbox("Typography", list(FONT_OPTIONS.keys()), key="font_name")
     
     st.divider()
     
@@ -121,6 +126,23 @@ with st.sidebar:
     brand_name = st.text_input("Brand Name", DEFAULT_SETTINGS['brand_name'])
     author_handle = st.text_input("Handle", DEFAULT_SETTINGS['author_handle'])
     logo_file = st.file_uploader("Logo (PNG)", type=['png'])
+    
+    st.divider()
+    
+    with st.expander("📈 Stage Timings", expanded=False):
+        stage_metrics = get_metrics()["stages"]
+        if stage_metrics:
+            st.dataframe(
+                [{"stage": m["stage"], **m["labels"], "count": m["count"], "avg_s": m["avg_s"], "p95_s": m["p95_s"]} for m in stage_metrics],
+                use_container_width=True
+            )
+        else:
+            st.caption("No timings recorded yet.")
+        # None leaves it to PROFILING_SETTINGS' sample rate
+        profile_force = True if st.checkbox("🔬 Profile jobs", help="Save a sampling profile and top allocations with each job's output") else None
+
+output_store = get_output_store(OUTPUT_SETTINGS["streamlit_root"])
+start_cache_gc()
 
 # --- Session State ---
 if 'slides' not in st.session_state:
@@ -129,8 +151,67 @@ if 'generated_html' not in st.session_state:
     st.session_state.generated_html = None
 if 'generated_paths' not in st.session_state:
     st.session_state.generated_paths = None
+if 'preview_session' not in st.session_state:
+    st.session_state.preview_session = str(uuid.uuid4())
+    st.session_state.preview_last = {}
 if 'output_dir' not in st.session_state:
     st.session_state.output_dir = None
+if 'pdf_path' not in st.session_state:
+    st.session_state.pdf_path = None
+if 'source_summary' not in st.session_state:
+    st.session_state.source_summary = ""
+if 'variants' not in st.session_state:
+    st.session_state.variants = None
+
+def render_thumbnails(theme):
+    """
+    Shows the preview thumbnails: cached ones right away, the last rendered
+    image (marked as updating) for slides still being re-rendered.
+    Returns True while any are pending.
+    """
+    renderer = get_preview_renderer()
+    results = renderer.thumbnails(st.session_state.preview_session, st.session_state.slides, theme)
+    last = st.session_state.preview_last
+    cols = st.columns(2)
+    for i, (key, data) in enumerate(results):
+        if data is not None:
+            last[i] = data
+        shown = data if data is not None else last.get(i)
+        with cols[i % 2]:
+            if shown:
+                st.image(shown, caption=f"Slide {i+1}" + ("" if data is not None else " · updating…"), use_container_width=True)
+            else:
+                st.caption(f"Slide {i+1} · rendering…")
+    return any(data is None for _, data in results)
+
+def poll_thumbnails():
+    # Re-checks until the background renders land, then refreshes the page once
+    renderer = get_preview_renderer()
+    if not renderer.is_pending(st.session_state.preview_session):
+        st.rerun()
+
+def save_upload(upload, directory, filename):
+    """
+    Writes an uploaded file into `directory` for the renderer. Returns its path, or None.
+    """
+    if not upload:
+        return None
+    path = os.path.join(directory, filename)
+    upload.seek(0)
+    with open(path, "wb") as f:
+        f.write(upload.read())
+    return path
+
+def apply_variant(variant):
+    """
+    Adopts a style variant's layouts, palette and font (runs before widgets are built).
+    """
+    st.session_state.slides = [dict(slide) for slide in variant["slides"]]
+    if variant["scheme"] in COLOR_SCHEMES:
+        st.session_state.color_scheme = variant["scheme"]
+    st.session_state.font_name = variant["font"]
+    for i, slide in enumerate(st.session_state.slides):
+        st.session_state[f"layout_{i}"] = slide.get("layout", "layout-cover")
 
 # --- Main Content ---
 tab1, tab2, tab3 = st.tabs(["1. Content & Generate", "2. Edit & Refine", "3. Export"])
@@ -159,21 +240,41 @@ with tab1:
         content_type = st.selectbox("Content Type", list(CONTENT_TYPES.keys()))
     with col2:
         style_seed = st.number_input("Style Seed (Randomness)", min_value=0, value=42)
+
+    offline_only = st.checkbox("⚡ Offline draft only (no AI, instant)", value=not api_key)
         
     if st.button("🚀 Generate Carousel", type="primary", use_container_width=True):
-        with st.spinner("Analyzing content and designing slides..."):
+        with st.spinner("Analyzing content and designing slides..."), profile_job(force=profile_force):
             # Get Text
             if source_type == "YouTube URL" and url:
-                text_content = get_transcript_text(url)
-                if not text_content:
-                    st.error("Could not fetch transcript.")
+                try:
+                    text_content, _ = get_transcript_text(url)
+                except ValueError as e:
+                    st.error(f"Could not fetch transcript: {e}")
                     st.stop()
             elif source_type == "Manual Text":
                 text_content = manual_text
             
             if text_content:
+                # Kept for single-slide regeneration in the editor
+                st.session_state.source_summary = summarize_source(text_content)
+
+                draft = summarize_offline(text_content, content_type=content_type, style_seed=style_seed)
+
                 api_key_val = api_key if api_key else None
-                slides, error = process_content(text_content, api_key=api_key_val, content_type=content_type, style_seed=style_seed)
+                if offline_only or not api_key_val:
+                    slides, error = draft, None if draft else "Text too short to summarize"
+                else:
+                    draft_notice = st.empty()
+                    if draft:
+                        # Shown (and kept, if the run is interrupted) until the AI result replaces it
+                        st.session_state.slides = draft
+                        with draft_notice.container():
+                            st.info(f"Draft ready ({len(draft)} slides), refining with AI…")
+                            for i, slide in enumerate(draft):
+                                st.markdown(f"{i + 1}. **{slide.get('title', '')}**")
+                    slides, error = process_content(text_content, api_key=api_key_val, content_type=content_type, style_seed=style_seed, draft=draft)
+                    draft_notice.empty()
                 
                 if slides:
                     st.session_state.slides = slides
@@ -233,47 +334,81 @@ with tab2:
                             stat['value'] = c1.text_input(f"Value {j+1}", stat.get('value', ''), key=f"val_{i}_{j}")
                             stat['label'] = c2.text_input(f"Label {j+1}", stat.get('label', ''), key=f"lbl_{i}_{j}")
 
+                    # Rewrite just this slide; the rest of the deck is untouched
+                    instructions = st.text_input("AI instructions (optional)", "", key=f"regen_hint_{i}", placeholder="e.g. punchier, add a statistic")
+                    if st.button("🔄 Regenerate this slide", key=f"regen_{i}", disabled=not api_key):
+                        with st.spinner("Rewriting slide..."):
+                            new_slides, error = regenerate_slides(
+                                st.session_state.slides, i,
+                                api_key=api_key,
+                                source_summary=st.session_state.source_summary,
+                                content_type=content_type,
+                                instructions=instructions
+                            )
+                        if error:
+                            st.error(error)
+                        else:
+                            st.session_state.slides[i] = new_slides[0]
+                            # Drop this slide's widget state so the inputs show the new copy
+                            for widget_key in [k for k in st.session_state.keys() if isinstance(k, str) and (k.endswith(f"_{i}") or k.startswith((f"val_{i}_", f"lbl_{i}_")))]:
+                                del st.session_state[widget_key]
+                            st.rerun()
+
         with col_prev:
             st.markdown("### 📱 Live Preview")
+            preview_modes = ["Thumbnails", "Interactive HTML"]
+            preview_mode = st.radio("Preview mode", preview_modes, index=preview_modes.index(PREVIEW_SETTINGS["mode"]), horizontal=True, key="preview_mode", label_visibility="collapsed")
             
             # Generate HTML for preview
-            # We need to save temp files for logo/bg if uploaded
-            preview_dir = "preview_assets"
-            os.makedirs(preview_dir, exist_ok=True)
-            
-            logo_path = None
-            if logo_file:
-                logo_path = os.path.join(preview_dir, "logo.png")
-                with open(logo_path, "wb") as f:
-                    f.write(logo_file.getbuffer())
+            # Uploads are saved by content hash, so sessions never overwrite each other's
+            preview_dir = PREVIEW_SETTINGS["asset_dir"]
+            logo_path = store_by_hash(bytes(logo_file.getbuffer()), preview_dir) if logo_file else None
+            bg_path = store_by_hash(bytes(bg_image.getbuffer()), preview_dir) if bg_image else None
             
-            bg_path = None
-            if bg_image:
-                bg_path = os.path.join(preview_dir, "bg.png")
-                with open(bg_path, "wb") as f:
-                    f.write(bg_image.getbuffer())
+            preview_theme = {
+                "logo_path": logo_path,
+                "brand_color": primary_color,
+                "secondary_color": secondary_color,
+                "font_name": font_name,
+                "author_handle": author_handle,
+                "brand_name": brand_name,
+                "bg_image_url": bg_path,
+                "bg_opacity": bg_opacity,
+                "bg_mode": bg_mode
+            }
+            renderer = get_preview_renderer()
             
-            generator = CarouselGenerator(
-                logo_path=logo_path,
-                brand_color=primary_color,
-                secondary_color=secondary_color,
-                font_name=font_name,
-                author_handle=author_handle,
-                brand_name=brand_name
-            )
-            
-            html = generator.generate_html_only(
-                st.session_state.slides,
-                bg_image_url=bg_path,
-                bg_opacity=bg_opacity,
-                bg_mode=bg_mode
-            )
-            
-            # Render in iframe
-            # Calculate height based on number of slides * slide height + gaps
-            # But we want a scrollable preview.
-            # Let's just show it.
-            components.html(html, height=800, scrolling=True)
+            if preview_mode == "Thumbnails" and renderer.available():
+                # Small cached rasters; only edited slides are re-rendered, in the background
+                pending = render_thumbnails(preview_theme)
+                if pending and hasattr(st, "fragment"):
+                    st.fragment(run_every=PREVIEW_SETTINGS["poll_s"])(poll_thumbnails)()
+                elif pending:
+                    st.button("🔄 Refresh preview")
+            else:
+                if preview_mode == "Thumbnails":
+                    st.caption(f"Thumbnail preview unavailable ({renderer.error}); showing the full page instead.")
+                generator = CarouselGenerator(
+                    logo_path=logo_path,
+                    brand_color=primary_color,
+                    secondary_color=secondary_color,
+                    font_name=font_name,
+                    author_handle=author_handle,
+                    brand_name=brand_name
+                )
+                
+                html = generator.generate_html_only(
+                    st.session_state.slides,
+                    bg_image_url=bg_path,
+                    bg_opacity=bg_opacity,
+                    bg_mode=bg_mode
+                )
+                
+                # Render in iframe
+                # Calculate height based on number of slides * slide height + gaps
+                # But we want a scrollable preview.
+                # Let's just show it.
+                components.html(html, height=800, scrolling=True)
             
     else:
         st.info("👈 Generate some content first!")
@@ -286,24 +421,15 @@ with tab3:
         
         if st.button("📸 Render High-Res Assets", type="primary"):
             with st.spinner("Rendering slides with Selenium (this may take a moment)..."):
-                session_id = str(uuid.uuid4())
-                out_dir = os.path.join("output", session_id)
-                os.makedirs(out_dir, exist_ok=True)
+                # Each render replaces this session's previous output; anything
+                # abandoned is garbage-collected by the store
+                output_store.release(st.session_state.output_dir)
+                st.session_state.generated_paths = None
+                session_id, out_dir = output_store.create_job_dir()
                 
                 # Save assets again for the renderer
-                logo_path = None
-                if logo_file:
-                    logo_path = os.path.join(out_dir, "logo.png")
-                    logo_file.seek(0)
-                    with open(logo_path, "wb") as f:
-                        f.write(logo_file.read())
-                
-                bg_path = None
-                if bg_image:
-                    bg_path = os.path.join(out_dir, "bg.png")
-                    bg_image.seek(0)
-                    with open(bg_path, "wb") as f:
-                        f.write(bg_image.read())
+                logo_path = save_upload(logo_file, out_dir, "logo.png")
+                bg_path = save_upload(bg_image, out_dir, "bg.png")
                 
                 generator = CarouselGenerator(
                     logo_path=logo_path,
@@ -314,18 +440,26 @@ with tab3:
                     brand_name=brand_name
                 )
                 
+                # Vector PDF is printed from the same browser session as the PNGs
+                pdf_path = os.path.join(out_dir, "carousel.pdf") if RENDER_SETTINGS["vector_pdf"] else None
+                
                 try:
-                    paths = generator.generate_all_slides(
-                        st.session_state.slides,
-                        out_dir,
-                        bg_image_url=bg_path,
-                        bg_opacity=bg_opacity,
-                        bg_mode=bg_mode
-                    )
+                    with job_context(session_id), profile_job(out_dir, session_id, profile_force) as profile:
+                        paths = generator.generate_all_slides(
+                            st.session_state.slides,
+                            out_dir,
+                            bg_image_url=bg_path,
+                            bg_opacity=bg_opacity,
+                            bg_mode=bg_mode,
+                            pdf_path=pdf_path
+                        )
                     
                     st.session_state.generated_paths = paths
+                    st.session_state.pdf_path = pdf_path
                     st.session_state.output_dir = out_dir
                     st.success(f"Successfully rendered {len(paths)} slides!")
+                    if profile and profile.profile_dir:
+                        st.caption(f"Profile saved to {profile.profile_dir}")
                     
                 except Exception as e:
                     st.error(f"Rendering failed: {e}")
@@ -337,11 +471,7 @@ with tab3:
             col1, col2, col3 = st.columns(3)
             
             # 1. ZIP Download
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for i, path in enumerate(st.session_state.generated_paths):
-                    zip_file.write(path, f"slide_{i+1}.png")
-            zip_buffer.seek(0)
+            zip_buffer = build_zip(st.session_state.generated_paths)
             
             with col1:
                 st.download_button(
@@ -354,15 +484,12 @@ with tab3:
             
             # 2. PDF Download
             try:
-                from PIL import Image
-                pdf_buffer = BytesIO()
-                images = [Image.open(p).convert('RGB') for p in st.session_state.generated_paths]
-                if images:
-                    images[0].save(
-                        pdf_buffer, "PDF", resolution=100.0, save_all=True, append_images=images[1:]
-                    )
-                    pdf_buffer.seek(0)
-                    
+                if st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
+                    with open(st.session_state.pdf_path, "rb") as f:
+                        pdf_buffer = f.read()
+                else:
+                    pdf_buffer = build_pdf(st.session_state.generated_paths)
+                if pdf_buffer:
                     with col2:
                         st.download_button(
                             "📄 Download PDF",
@@ -377,13 +504,8 @@ with tab3:
             # 3. MP4 Download
             try:
                 # We need to install moviepy first. If it fails, we hide the button.
-                from moviepy.editor import ImageSequenceClip
-                
-                # Create video
                 # Each slide 2 seconds
-                clip = ImageSequenceClip(st.session_state.generated_paths, fps=0.5) 
-                video_path = os.path.join(st.session_state.output_dir, "carousel.mp4")
-                clip.write_videofile(video_path, codec="libx264", fps=24)
+                video_path = build_video(st.session_state.generated_paths, st.session_state.output_dir)
                 
                 with open(video_path, "rb") as f:
                     video_bytes = f.read()
@@ -409,6 +531,63 @@ with tab3:
                 with cols[i % 4]:
                     st.image(path, caption=f"Slide {i+1}")
         
+        st.divider()
+        
+        # Style variants: one content pass, many looks, one browser session
+        with st.expander("🎨 Style Variants", expanded=False):
+            variant_seeds = st.text_input("Layout seeds (comma-separated)", str(style_seed))
+            variant_schemes = st.multiselect("Palettes", list(COLOR_SCHEMES.keys()), default=list(COLOR_SCHEMES.keys())[:4])
+            variant_fonts = st.multiselect("Fonts", list(FONT_OPTIONS.keys()), default=[font_name])
+            
+            if st.button("🧪 Render Variants"):
+                seeds = [int(x) for x in variant_seeds.split(",") if x.strip().isdigit()] or [42]
+                with st.spinner(f"Rendering {len(seeds) * max(len(variant_schemes), 1) * max(len(variant_fonts), 1)} variants..."):
+                    if st.session_state.variants:
+                        output_store.release(st.session_state.variants["output_dir"])
+                    session_id, variant_dir = output_store.create_job_dir()
+                    # The same logo and background as the full render
+                    variant_bg_path = save_upload(bg_image, variant_dir, "bg.png")
+                    generator = CarouselGenerator(
+                        logo_path=save_upload(logo_file, variant_dir, "logo.png"),
+                        brand_color=primary_color,
+                        secondary_color=secondary_color,
+                        font_name=font_name,
+                        author_handle=author_handle,
+                        brand_name=brand_name
+                    )
+                    try:
+                        with job_context(session_id):
+                            result = generate_variants(
+                                generator,
+                                st.session_state.slides,
+                                variant_dir,
+                                seeds=seeds,
+                                schemes=variant_schemes,
+                                fonts=variant_fonts,
+                                content_type=content_type,
+                                bg_image_url=variant_bg_path,
+                                bg_opacity=bg_opacity,
+                                bg_mode=bg_mode
+                            )
+                        st.session_state.variants = dict(result, output_dir=variant_dir)
+                    except Exception as e:
+                        st.error(f"Variant rendering failed: {e}")
+            
+            if st.session_state.variants:
+                variants = st.session_state.variants["variants"]
+                if st.session_state.variants["contact_sheet"]:
+                    st.image(st.session_state.variants["contact_sheet"], caption="Contact sheet")
+                choice = st.selectbox(
+                    "Variant",
+                    range(len(variants)),
+                    format_func=lambda i: f"#{i+1}  seed {variants[i]['seed']} · {variants[i]['scheme']} · {variants[i]['font']}"
+                )
+                st.button("✅ Use this style", on_click=apply_variant, args=(variants[choice],))
+        
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.info("👈 Generate content first!")
+
+# UI is on screen; load the heavy dependencies (Gemini SDK, yt-dlp, Selenium)
+# in the background so the first generation doesn't pay for them
+start_prewarm()
@@ -0,0 +1,118 @@
+import json
+from types import SimpleNamespace
+import pytest
+import content_processor
+from config import RATE_LIMIT_SETTINGS
+from content_processor import regenerate_slides, validate_slide
+
+DECK = [
+    {"layout": "layout-cover", "title": "How We Cut Support Load", "subtitle": "Success Story"},
+    {"layout": "layout-list", "title": "What Changed", "body": ["Triage", "Routing"]},
+    {"layout": "layout-quote", "title": "The Lesson", "body": "Boring automation compounds."},
+    {"layout": "layout-cta", "title": "Try It", "body": "Follow for more"},
+]
+
+
+class FakeGenai:
+    """
+    Stands in for google.generativeai: every model answers from `replies`
+    (model name -> text or exception) and prompts are recorded.
+    """
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.prompts = []
+
+    def configure(self, api_key):
+        pass
+
+    def GenerativeModel(self, model_name):
+        def generate_content(prompt):
+            self.prompts.append((model_name, prompt))
+            reply = self.replies.get(model_name, RuntimeError(f"{model_name} unavailable"))
+            if isinstance(reply, Exception):
+                raise reply
+            return SimpleNamespace(text=reply)
+        return SimpleNamespace(generate_content=generate_content)
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "enabled", False)
+
+    def install(replies):
+        fake = FakeGenai(replies)
+        monkeypatch.setattr(content_processor, "genai", fake)
+        return fake
+    return install
+
+
+def test_validate_slide_coerces_common_slips():
+    assert validate_slide({"layout": "layout-list", "title": " Steps ", "body": "Only one"}) == {
+        "layout": "layout-list", "title": "Steps", "body": ["Only one"]
+    }
+    assert validate_slide({"title": "Quote", "body": ["Two", "parts"]}, "layout-quote")["body"] == "Two parts"
+
+
+def test_validate_slide_keeps_only_usable_stats():
+    slide = validate_slide({"layout": "layout-data", "title": "Numbers", "stats": [
+        {"value": 45, "label": "Growth"}, {"value": "", "label": "Empty"}, "junk",
+        {"value": "3x", "label": "Faster"}, {"value": "1", "label": "a"}, {"value": "2", "label": "b"}, {"value": "3", "label": "c"}
+    ]})
+    assert slide["stats"] == [
+        {"value": "45", "label": "Growth"}, {"value": "3x", "label": "Faster"}, {"value": "1", "label": "a"}, {"value": "2", "label": "b"}
+    ]
+
+
+@pytest.mark.parametrize("slide, layout", [
+    ("not a dict", None),
+    ({"layout": "layout-poster", "title": "x"}, None),
+    ({"layout": "layout-split", "title": "x"}, None),
+    ({"layout": "layout-cover", "title": "   "}, None),
+    ({"title": "x", "body": ["", " "]}, "layout-list"),
+    ({"title": "x", "stats": [{"value": "1"}]}, "layout-data"),
+    ({"title": "x", "body": 3}, "layout-quote"),
+])
+def test_validate_slide_rejects_unusable_slides(slide, layout):
+    with pytest.raises(ValueError):
+        validate_slide(slide, layout)
+
+
+def test_regenerate_slides_keeps_layouts_and_sends_only_the_summary(fake_genai):
+    model = content_processor.AI_SETTINGS["models_priority"][0]
+    fake = fake_genai({model: "Sure! " + json.dumps([
+        {"layout": "layout-cover", "title": "New list", "body": "One, two"},
+        {"title": "New quote", "body": ["Keep", "going"]},
+    ])})
+
+    slides, error = regenerate_slides(DECK, 1, 2, api_key="key", source_summary="SUMMARY", instructions="Be bold.")
+
+    assert error is None
+    assert slides == [
+        {"layout": "layout-list", "title": "New list", "body": ["One, two"]},
+        {"layout": "layout-quote", "title": "New quote", "body": "Keep going"},
+    ]
+    prompt = fake.prompts[0][1]
+    assert "SUMMARY" in prompt and "Be bold." in prompt
+    assert "How We Cut Support Load" in prompt and "Try It" in prompt
+
+
+def test_regenerate_slides_falls_through_models_and_keeps_originals_on_failure(fake_genai):
+    first, second = content_processor.AI_SETTINGS["models_priority"][:2]
+    fake = fake_genai({first: "[]", second: json.dumps([{"title": "Fixed", "body": "Better"}])})
+    slides, error = regenerate_slides(DECK, 2, api_key="key")
+    assert error is None
+    assert slides == [{"layout": "layout-quote", "title": "Fixed", "body": "Better"}]
+    assert [name for name, _ in fake.prompts][:2] == [first, second]
+
+    fake_genai({})
+    slides, error = regenerate_slides(DECK, 2, api_key="key")
+    assert slides == [DECK[2]]
+    assert error.startswith("AI regeneration failed")
+
+
+def test_regenerate_slides_checks_its_arguments():
+    assert regenerate_slides(DECK, 3, 5, api_key="key") == ([], "Slide range 3-5 is out of bounds")
+    slides, error = regenerate_slides(DECK, 1)
+    assert slides == [DECK[1]]
+    assert "API key" in error
@@ -0,0 +1,45 @@
+import json
+import font_store
+from config import FONT_SETTINGS
+
+
+def test_css_cache_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.setitem(FONT_SETTINGS, "cache_dir", str(tmp_path))
+    monkeypatch.setitem(FONT_SETTINGS, "subset_fonts", False)
+    monkeypatch.setitem(FONT_SETTINGS, "css_cache_size", 3)
+    monkeypatch.setattr(font_store, "_css_cache", font_store.OrderedDict())
+    font_dir = tmp_path / "inter"
+    font_dir.mkdir()
+    (font_dir / "inter.woff2").write_bytes(b"font")
+    (font_dir / "manifest.json").write_text(json.dumps({
+        "family": "Inter",
+        "faces": [{"subset": "latin", "style": "normal", "weight": "400", "unicode_range": None, "file": "inter.woff2"}]
+    }))
+
+    for i in range(10):
+        assert "@font-face" in font_store.get_font_face_css("Inter", f"glyphs{i}")
+
+    assert list(font_store._css_cache) == [("Inter", f"glyphs{i}") for i in (7, 8, 9)]
+
+
+def test_failed_download_is_not_retried(monkeypatch, tmp_path):
+    monkeypatch.setitem(FONT_SETTINGS, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(font_store, "_download_failures", {})
+    calls = []
+
+    class FakeRequests:
+        @staticmethod
+        def get(*args, **kwargs):
+            calls.append(args)
+            raise OSError("network unreachable")
+
+    monkeypatch.setitem(__import__("sys").modules, "requests", FakeRequests)
+
+    assert font_store.load_manifest("Inter") is None
+    assert font_store.load_manifest("Inter") is None
+    assert len(calls) == 1
+
+    # Once the retry window has passed, it tries again
+    monkeypatch.setitem(FONT_SETTINGS, "download_retry_s", 0)
+    assert font_store.load_manifest("Inter") is None
+    assert len(calls) == 2
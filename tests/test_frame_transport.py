@@ -0,0 +1,94 @@
+import os
+import re
+import time
+from io import BytesIO
+import pytest
+from PIL import Image
+from frame_transport import FramePipeline, FrameRing
+
+
+def png_bytes(color, size=(24, 16)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def pdf_page_count(path):
+    # Appending adds an incremental update; the last page tree is current
+    with open(path, "rb") as f:
+        return int(re.findall(rb"/Count\s+(\d+)", f.read())[-1])
+
+
+def test_ring_reuses_slots_only_after_every_consumer_releases():
+    ring = FrameRing(consumers=2, slots=1, width=4, height=4)
+    try:
+        slot = ring.acquire_slot()
+        ring.slot_array(slot, 2, 2)[:] = 7
+        ring.publish(slot, 0, 2, 2)
+        ring.finish()
+        with pytest.raises(TimeoutError):
+            ring.acquire_slot(timeout=0.05)
+
+        for consumer in range(2):
+            frames = list(ring.frames(consumer))
+            assert [(s, index, pixels.shape) for s, index, pixels in frames] == [(slot, 0, (2, 2, 4))]
+            assert (frames[0][2] == 7).all()
+            del frames
+            if consumer == 0:
+                ring.release(slot)
+                with pytest.raises(TimeoutError):
+                    ring.acquire_slot(timeout=0.05)
+            else:
+                ring.release(slot)
+        assert ring.acquire_slot(timeout=1) == slot
+    finally:
+        ring.close()
+
+
+def test_pipeline_encodes_out_of_order_frames_and_keeps_pages_after_a_gap(tmp_path, capfd):
+    colors = {0: "red", 2: "green", 3: "blue"}
+    with FramePipeline(str(tmp_path), encoders=("png", "pdf"), slots=2, width=32, height=32) as pipeline:
+        # Slide 2 never arrives
+        for index in (2, 0, 3):
+            pipeline.submit_png(index, png_bytes(colors[index]))
+
+    assert pipeline.errors == {}
+    assert [os.path.basename(path) for path in pipeline.outputs["png"]] == ["slide_1.png", "slide_3.png", "slide_4.png"]
+    for path, index in zip(pipeline.outputs["png"], (0, 2, 3)):
+        with Image.open(path) as image:
+            assert image.size == (24, 16)
+            assert image.convert("RGB").getpixel((0, 0)) == Image.new("RGB", (1, 1), colors[index]).getpixel((0, 0))
+
+    assert pipeline.outputs["pdf"] == [str(tmp_path / "carousel_raster.pdf")]
+    assert pdf_page_count(pipeline.outputs["pdf"][0]) == 3
+    assert "missing slide(s) 2" in capfd.readouterr().out
+
+
+def test_a_dead_encoder_fails_fast(tmp_path):
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="Encoder webp stopped"):
+        with FramePipeline(str(tmp_path), encoders=("webp", "png"), slots=1, width=32, height=32) as pipeline:
+            pipeline._processes[0].kill()
+            pipeline._processes[0].join(5)
+            for index in range(3):
+                pipeline.submit_png(index, png_bytes("red"))
+    assert time.monotonic() - started < 15
+    assert "exited with code" in pipeline.errors["webp"]
+    assert pipeline.outputs["webp"] == []
+
+
+def test_captures_go_to_the_sink_instead_of_disk(tmp_path):
+    from carousel_generator import CarouselGenerator
+
+    class Element:
+        screenshot_as_png = png_bytes("red")
+
+    class Driver:
+        def find_element(self, by, value):
+            return Element()
+
+    received = []
+    paths = CarouselGenerator(logo_path=None).capture_slides(Driver(), 2, str(tmp_path), frame_sink=lambda i, data: received.append(i))
+    assert received == [0, 1]
+    assert [os.path.basename(path) for path in paths] == ["slide_1.png", "slide_2.png"]
+    assert os.listdir(tmp_path) == []
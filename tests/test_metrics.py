@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+import pytest
+import metrics
+from config import METRICS_SETTINGS
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics(monkeypatch):
+    monkeypatch.setitem(METRICS_SETTINGS, "enabled", True)
+    monkeypatch.setitem(METRICS_SETTINGS, "log_timings", False)
+    monkeypatch.setitem(METRICS_SETTINGS, "buckets", [0.1, 1.0])
+    metrics.reset_metrics()
+    yield
+    metrics.reset_metrics()
+
+
+def timed_for(monkeypatch, seconds, stage, **labels):
+    clock = iter([0.0, seconds])
+    monkeypatch.setattr(metrics, "time", SimpleNamespace(perf_counter=lambda: next(clock)))
+    with metrics.timed(stage, **labels):
+        pass
+
+
+def test_timed_fills_cumulative_buckets(monkeypatch):
+    for seconds in (0.05, 0.5, 2.0):
+        timed_for(monkeypatch, seconds, "render")
+    with pytest.raises(ValueError):
+        clock = iter([0.0, 0.2])
+        monkeypatch.setattr(metrics, "time", SimpleNamespace(perf_counter=lambda: next(clock)))
+        with metrics.timed("render"):
+            raise ValueError("boom")
+
+    text = metrics.render_prometheus()
+    assert 'carousel_stage_duration_seconds_bucket{stage="render",le="0.1"} 1' in text
+    assert 'carousel_stage_duration_seconds_bucket{stage="render",le="1.0"} 3' in text
+    assert 'carousel_stage_duration_seconds_bucket{stage="render",le="+Inf"} 4' in text
+    assert 'carousel_stage_duration_seconds_count{stage="render"} 4' in text
+    total = float(text.split('carousel_stage_duration_seconds_sum{stage="render"} ')[1].split("\n")[0])
+    assert total == pytest.approx(2.75)
+    assert "# TYPE carousel_stage_errors_total counter" in text
+    assert 'carousel_stage_errors_total{stage="render"} 1' in text
+
+    stage = metrics.get_metrics()["stages"][0]
+    assert (stage["count"], stage["min_s"], stage["max_s"], stage["p50_s"]) == (4, 0.05, 2.0, 1.0)
+
+
+def test_label_values_are_escaped(monkeypatch):
+    timed_for(monkeypatch, 0.01, "fetch", source='say "hi"\\now\nthen')
+    metrics.increment("videos_ingested", ok="true")
+
+    text = metrics.render_prometheus()
+    assert 'carousel_stage_duration_seconds_count{stage="fetch",source="say \\"hi\\"\\\\now\\nthen"} 1' in text
+    assert 'carousel_videos_ingested_total{ok="true"} 1' in text
+    assert text.endswith("\n")
@@ -0,0 +1,67 @@
+import content_processor
+from offline_summarizer import STOPWORDS, extract_stats
+
+TRANSCRIPT = """
+We started the year with a support team that was drowning in tickets.
+Every agent spent 10 hours per week on manual triage before anyone answered a customer.
+So we built a small classifier that routes tickets to the right queue automatically.
+Within three months we cut tickets by 3x.
+Retention rose to 92 percent.
+We also grew revenue by 45% in 2023, mostly from customers who stayed longer.
+The lesson is that boring automation compounds faster than new features.
+If you run a support team, start by measuring where the hours actually go.
+Then automate the most repetitive step first and measure again.
+"""
+
+
+def test_extract_stats_labels_trailing_numbers_from_preceding_words():
+    stats = extract_stats([
+        "We grew revenue by 45% in 2023.",
+        "We cut tickets by 3x.",
+        "Retention rose to 92 percent.",
+    ])
+    assert stats == [
+        {"value": "45%", "label": "Grew Revenue"},
+        {"value": "3x", "label": "Cut Tickets"},
+        {"value": "92%", "label": "Retention Rose"},
+    ]
+
+
+def test_extract_stats_prefers_following_words_and_skips_years():
+    assert extract_stats(["It saves 10 hours per week of manual work."]) == [{"value": "10", "label": "Hours Per Week"}]
+    assert extract_stats(["Version 3.5 shipped to 1,200 customers"]) == [
+        {"value": "3.5", "label": "Shipped"},
+        {"value": "1,200", "label": "Customers"},
+    ]
+    assert extract_stats(["It all started in 2019 with one of us."]) == []
+
+
+def test_extract_stats_labels_have_no_stopwords():
+    stats = extract_stats(["Churn fell 30% after the launch.", "We onboarded 250 of the new teams."])
+    assert [stat["value"] for stat in stats] == ["30%", "250"]
+    for stat in stats:
+        assert not {word.lower() for word in stat["label"].split()} & STOPWORDS
+
+
+def test_summarize_offline_builds_a_deck():
+    slides = content_processor.summarize_offline(TRANSCRIPT, content_type="Data Insights", style_seed=1)
+    assert 5 <= len(slides) <= 8
+    assert slides[0]["layout"] == "layout-cover"
+    assert slides[-1]["layout"] == "layout-cta"
+    assert all(slide.get("title") for slide in slides)
+    assert content_processor.summarize_offline("Too short.") == []
+
+
+def test_process_content_falls_back_to_the_given_draft(monkeypatch):
+    def fail():
+        raise RuntimeError("no network")
+
+    def no_second_summary(*args, **kwargs):
+        raise AssertionError("summarized twice")
+
+    draft = [{"layout": "layout-cover", "title": "Draft"}]
+    monkeypatch.setattr(content_processor, "_genai", fail)
+    monkeypatch.setattr(content_processor, "summarize_offline", no_second_summary)
+    slides, error = content_processor.process_content(TRANSCRIPT, api_key="key", draft=draft)
+    assert slides is draft
+    assert "no network" in error
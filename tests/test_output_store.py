@@ -0,0 +1,89 @@
+import os
+import time
+import output_store
+from output_store import OutputStore
+from config import OUTPUT_SETTINGS
+
+
+def _age(path, seconds):
+    stamp = time.time() - seconds
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            os.utime(os.path.join(dirpath, name), (stamp, stamp))
+    os.utime(path, (stamp, stamp))
+
+
+def _job(store, name, size, age):
+    job_id, path = store.create_job_dir(name)
+    with open(os.path.join(path, "slide_1.png"), "wb") as f:
+        f.write(b"x" * size)
+    _age(path, age)
+    return path
+
+
+def test_expired_jobs_are_removed(tmp_path):
+    store = OutputStore(str(tmp_path), max_total_mb=100, max_age_hours=1, min_age_seconds=0)
+    old = _job(store, "old", 10, 2 * 3600)
+    fresh = _job(store, "fresh", 10, 60)
+
+    assert store.collect_garbage() == (1, 10)
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+
+def test_quota_evicts_oldest_but_spares_young_jobs(tmp_path):
+    store = OutputStore(str(tmp_path), max_total_mb=1, max_age_hours=24, min_age_seconds=300)
+    oldest = _job(store, "a", 600 * 1024, 3000)
+    older = _job(store, "b", 600 * 1024, 2000)
+    young = _job(store, "c", 600 * 1024, 10)
+
+    removed, _ = store.collect_garbage()
+
+    # 1.8 MB over a 1 MB quota: the two oldest go, the in-progress one stays
+    assert removed == 2
+    assert not os.path.exists(oldest) and not os.path.exists(older)
+    assert os.path.exists(young)
+
+
+def test_zero_limits_are_respected(tmp_path):
+    store = OutputStore(str(tmp_path), max_total_mb=0, max_age_hours=0, min_age_seconds=0)
+    assert store.max_total_bytes == 0
+    assert store.max_age_seconds == 0
+    _job(store, "a", 10, 5)
+    assert store.collect_garbage()[0] == 1
+
+
+def test_flat_cache_files_are_collected(tmp_path):
+    store = OutputStore(str(tmp_path), max_total_mb=100, max_age_hours=1, min_age_seconds=0, use_tmpfs=False)
+    cold, hot = tmp_path / "cold.png", tmp_path / "hot.png"
+    cold.write_bytes(b"x")
+    hot.write_bytes(b"x")
+    _age(str(cold), 2 * 3600)
+
+    assert store.collect_garbage() == (1, 1)
+    assert not cold.exists() and hot.exists()
+
+
+def test_tmpfs_roots_do_not_collide(monkeypatch, tmp_path):
+    monkeypatch.setitem(OUTPUT_SETTINGS, "use_tmpfs", True)
+    monkeypatch.setitem(OUTPUT_SETTINGS, "tmpfs_path", str(tmp_path / "carousel"))
+
+    flask_root = output_store._resolve_root("static/output")
+    streamlit_root = output_store._resolve_root("output")
+
+    assert flask_root != streamlit_root
+    assert os.path.dirname(flask_root) == str(tmp_path / "carousel")
+    assert output_store._resolve_root("static/output") == flask_root
+
+
+def test_release_only_deletes_inside_root(tmp_path):
+    store = OutputStore(str(tmp_path / "store"))
+    job_id, path = store.create_job_dir()
+    outside = tmp_path / "keep"
+    outside.mkdir()
+
+    store.release(str(outside))
+    store.release(job_id)
+
+    assert outside.exists()
+    assert not os.path.exists(path)
@@ -0,0 +1,55 @@
+import os
+import time
+import threading
+from config import PREVIEW_SETTINGS
+from preview_renderer import PreviewRenderer
+from slide_assets import store_by_hash
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_is_pending_tracks_each_sessions_own_renders(monkeypatch, tmp_path):
+    monkeypatch.setitem(PREVIEW_SETTINGS, "cache_dir", str(tmp_path))
+    renderer = PreviewRenderer(debounce_s=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def render(todo, theme):
+        started.set()
+        release.wait(5)
+        for key in todo:
+            renderer._remember(key, b"png")
+
+    renderer._render = render
+    slide = {"layout": "layout-cover", "title": "Hello"}
+    key = renderer.slide_key(slide, {})
+
+    renderer.schedule("alice", [(key, slide)], {})
+    assert started.wait(5)
+    # Bob queues behind Alice's render; Carol asked for nothing
+    renderer.schedule("bob", [(renderer.slide_key(slide, {"brand_color": "#000"}), slide)], {"brand_color": "#000"})
+    assert renderer.is_pending("alice")
+    assert renderer.is_pending("bob")
+    assert not renderer.is_pending("carol")
+
+    release.set()
+    assert wait_until(lambda: not renderer.is_pending("alice") and not renderer.is_pending("bob"))
+    assert renderer.get(key) == b"png"
+    assert not renderer._waiting and not renderer._in_flight
+
+
+def test_store_by_hash_gives_different_uploads_different_paths(tmp_path):
+    first = store_by_hash(b"logo one", str(tmp_path))
+    second = store_by_hash(b"logo two", str(tmp_path))
+    assert first != second
+    assert store_by_hash(b"logo one", str(tmp_path)) == first
+    with open(first, "rb") as f:
+        assert f.read() == b"logo one"
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in (first, second))
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+import pytest
+import profiler
+from config import PROFILING_SETTINGS
+
+
+@pytest.fixture(autouse=True)
+def profiling_settings(monkeypatch, tmp_path):
+    monkeypatch.delenv("CAROUSEL_PROFILE", raising=False)
+    monkeypatch.setitem(PROFILING_SETTINGS, "interval_ms", 2)
+    monkeypatch.setitem(PROFILING_SETTINGS, "min_duration_s", 0.0)
+    monkeypatch.setitem(PROFILING_SETTINGS, "fallback_dir", str(tmp_path / "profiles"))
+
+
+def test_should_profile_precedence(monkeypatch):
+    monkeypatch.setitem(PROFILING_SETTINGS, "enabled", True)
+    monkeypatch.setitem(PROFILING_SETTINGS, "sample_rate", 1.0)
+    assert profiler.should_profile()
+    monkeypatch.setitem(PROFILING_SETTINGS, "sample_rate", 0.0)
+    assert not profiler.should_profile()
+
+    monkeypatch.setitem(PROFILING_SETTINGS, "enabled", False)
+    assert not profiler.should_profile()
+    monkeypatch.setenv("CAROUSEL_PROFILE", "1")
+    assert profiler.should_profile()
+    assert not profiler.should_profile(force=False)
+    monkeypatch.setenv("CAROUSEL_PROFILE", "no")
+    assert not profiler.should_profile()
+    assert profiler.should_profile(force=True)
+
+
+def test_hottest_counts_self_and_total_samples():
+    sampler = profiler.StackSampler(0.01)
+    sampler.counts = Counter({
+        "thread:main;run;render;capture": 5,
+        "thread:main;run;render": 2,
+        "thread:main;run;parse": 3,
+        "thread:idle": 4,
+    })
+    hottest = sampler.hottest(limit=2)
+    assert hottest["self"] == [{"frame": "capture", "samples": 5}, {"frame": "parse", "samples": 3}]
+    assert hottest["total"] == [{"frame": "run", "samples": 10}, {"frame": "render", "samples": 7}]
+
+
+@pytest.mark.skipif(tracemalloc.is_tracing(), reason="tracemalloc already started by -X tracemalloc")
+def test_nested_jobs_share_one_tracemalloc_trace():
+    profiler._start_tracemalloc()
+    profiler._start_tracemalloc()
+    assert tracemalloc.is_tracing()
+    profiler._stop_tracemalloc()
+    assert tracemalloc.is_tracing()
+    _, peak = profiler._stop_tracemalloc()
+    assert not tracemalloc.is_tracing()
+    assert peak > 0
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    blocks = []
+    while time.perf_counter() < deadline:
+        blocks.append(bytearray(4096))
+    return blocks
+
+
+def test_profile_job_writes_its_files(tmp_path):
+    with profiler.profile_job(str(tmp_path), "job-1", force=True) as profile:
+        blocks = busy(0.1)
+    assert blocks
+    profile_dir = tmp_path / "profile"
+    assert profile.profile_dir == str(profile_dir)
+    assert sorted(os.listdir(profile_dir)) == ["allocations.txt", "stacks.collapsed", "summary.json"]
+
+    summary = json.loads((profile_dir / "summary.json").read_text())
+    assert summary["job_id"] == "job-1"
+    assert summary["samples"] > 0
+    assert summary["peak_traced_mb"] > 0
+    assert summary["hottest"]["self"]
+    assert "test_profiler.py" in (profile_dir / "allocations.txt").read_text()
+    collapsed = (profile_dir / "stacks.collapsed").read_text()
+    assert "busy (test_profiler.py:" in collapsed
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("thread:") and int(count) > 0
+
+
+def test_profile_job_without_output_dir_uses_the_fallback_dir():
+    with profiler.profile_job(job_id="job-2", force=True) as profile:
+        busy(0.02)
+    assert profile.profile_dir == os.path.join(PROFILING_SETTINGS["fallback_dir"], "job-2", "profile")
+    assert os.path.exists(os.path.join(profile.profile_dir, "summary.json"))
+
+    with profiler.profile_job(job_id="job-3", force=False) as profile:
+        pass
+    assert profile is None
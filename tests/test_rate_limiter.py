@@ -0,0 +1,145 @@
+import time
+import threading
+from datetime import timedelta
+import pytest
+import rate_limiter
+from config import RATE_LIMIT_SETTINGS
+
+
+@pytest.fixture(autouse=True)
+def limiter_db(monkeypatch, tmp_path):
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "db_path", str(tmp_path / "rate_limits.sqlite"))
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "enabled", True)
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "per_key", {"rate_per_min": 6000, "burst": 50})
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "default_model", {"rate_per_min": 6000, "burst": 50})
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "per_model", {})
+    monkeypatch.setattr(rate_limiter._local, "conn", None, raising=False)
+
+
+def test_identical_concurrent_calls_share_one_request(monkeypatch):
+    coalesced = threading.Semaphore(0)
+    monkeypatch.setattr(rate_limiter, "increment", lambda name, **labels: coalesced.release() if name == "llm_calls_coalesced" else None)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(rate_limiter.generate("key", "model", "prompt", call)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(rate_limiter.generate("key", "model", "prompt", call))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for _ in followers:
+        assert coalesced.acquire(timeout=5)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["answer"] * 4
+    # Finished calls aren't reused: asking again makes a fresh call
+    assert rate_limiter.generate("key", "model", "prompt", lambda: "again") == "again"
+
+
+def test_calls_in_flight_in_another_process_are_waited_for():
+    call_key = "shared-call"
+    assert rate_limiter._claim(call_key, "other-process")
+    assert not rate_limiter._claim(call_key, "this-process")
+
+    threading.Timer(0.1, rate_limiter._finish, args=(call_key,), kwargs={"result": "theirs"}).start()
+    # The timer thread has its own connection to the same database file
+    assert rate_limiter._wait_for_other_process(call_key) == "theirs"
+
+
+def test_429_penalizes_the_model_and_retries_after_the_hint():
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("429 Resource exhausted, please retry in 0.2s")
+        return "ok"
+
+    assert rate_limiter.generate("key", "model", "prompt", call) == "ok"
+    assert len(attempts) == 2
+    model_bucket = rate_limiter._buckets_for("key", "model")[1][0]
+    blocked_until = rate_limiter._connection().execute("SELECT blocked_until FROM buckets WHERE key = ?", (model_bucket,)).fetchone()[0]
+    assert blocked_until > 0
+
+
+def test_repeated_429s_raise_rate_limited(monkeypatch):
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "max_retries", 1)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise RuntimeError("429 quota exceeded; retry in 0.05s")
+
+    with pytest.raises(rate_limiter.RateLimited) as info:
+        rate_limiter.generate("key", "model", "prompt", call)
+    assert len(attempts) == 2
+    assert info.value.retry_after == pytest.approx(0.05)
+
+
+def test_other_errors_are_not_retried():
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        rate_limiter.generate("key", "model", "prompt", call)
+    assert len(attempts) == 1
+
+
+def test_empty_bucket_reports_the_wait(monkeypatch):
+    monkeypatch.setitem(RATE_LIMIT_SETTINGS, "default_model", {"rate_per_min": 60, "burst": 1})
+    buckets = rate_limiter._buckets_for("key", "slow-model")
+    assert rate_limiter.try_acquire(buckets) == 0
+    assert 0 < rate_limiter.try_acquire(buckets) <= 1.0
+    with pytest.raises(rate_limiter.RateLimited):
+        rate_limiter.acquire("key", "slow-model", max_wait=0)
+
+
+def test_retry_hint_and_error_detection():
+    class Quota(Exception):
+        retry_delay = timedelta(seconds=7)
+
+    assert rate_limiter.retry_hint(Quota("ResourceExhausted")) == 7
+    assert rate_limiter.retry_hint(RuntimeError("Please retry in 12.5s.")) == 12.5
+    assert rate_limiter.retry_hint(RuntimeError("retry_delay { seconds: 30 }")) == 30
+    assert rate_limiter.retry_hint(RuntimeError("Retry-After: 4")) == 4
+    assert rate_limiter.retry_hint(RuntimeError("boom")) is None
+    assert rate_limiter.is_rate_limit_error(RuntimeError("429 Too Many Requests"))
+    assert not rate_limiter.is_rate_limit_error(RuntimeError("500 Internal"))
+
+
+def test_waiters_on_a_failed_call_make_only_one_new_call():
+    call_key = "failing-call"
+    assert rate_limiter._claim(call_key, "other-process")
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.5)
+        return "retried"
+
+    results = []
+    waiters = [threading.Thread(target=lambda: results.append(rate_limiter._run_shared(call_key, "key", "model", call))) for _ in range(2)]
+    for thread in waiters:
+        thread.start()
+    time.sleep(0.1)
+    rate_limiter._finish(call_key, error="upstream failed")
+    for thread in waiters:
+        thread.join(10)
+
+    assert calls == [1]
+    assert results == ["retried", "retried"]
@@ -0,0 +1,112 @@
+import base64
+import hashlib
+import os
+import pytest
+import render_server
+from carousel_generator import CarouselGenerator
+from render_server import request_key
+
+SLIDES = [{"layout": "layout-cover", "title": "Hello"}, {"layout": "layout-cta", "title": "Bye"}]
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    renders = []
+
+    def generate_all_slides(self, slides_content, output_dir, bg_image_url=None, bg_opacity=0.15, bg_mode="Solid Color", driver=None, pdf_path=None, **kwargs):
+        renders.append({"slides": slides_content, "logo": self.logo_path, "background": bg_image_url})
+        if any(slide["title"] == "Crash" for slide in slides_content):
+            raise RuntimeError("tab crashed")
+        paths = []
+        for i, slide in enumerate(slides_content):
+            path = os.path.join(output_dir, f"slide_{i + 1}.png")
+            with open(path, "wb") as f:
+                f.write(slide["title"].encode("utf-8"))
+            paths.append(path)
+        return paths
+
+    monkeypatch.setattr(render_server, "start_cache_gc", lambda: None)
+    monkeypatch.setattr(CarouselGenerator, "generate_all_slides", generate_all_slides)
+    app = render_server.create_app(slots=1, asset_dir=str(tmp_path / "assets"), output_root=str(tmp_path / "out"), driver_factory=FakeDriver)
+    client = app.test_client()
+    client.renders = renders
+    return client
+
+
+def test_request_key_is_stable_and_ignores_delivery_options():
+    data = {"slides": SLIDES, "theme": {"brand_color": "#111", "font_name": "Inter"}, "assets": {"logo": "ab" * 8}, "bg_mode": "Solid Color"}
+    reordered = {"bg_mode": "Solid Color", "assets": {"logo": "ab" * 8}, "theme": {"font_name": "Inter", "brand_color": "#111"}, "slides": SLIDES}
+    assert request_key(data) == request_key(reordered)
+    assert request_key(data) == request_key(dict(data, inline=True))
+    assert request_key(data) != request_key(dict(data, pdf=True))
+    assert request_key(data) != request_key(dict(data, assets={"logo": "cd" * 8}))
+    assert request_key(data) != request_key(dict(data, slides=SLIDES[:1]))
+
+
+def test_assets_are_stored_once_under_their_hash(server):
+    data = b"logo bytes"
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    assert server.head(f"/assets/{digest}").status_code == 404
+    assert server.put(f"/assets/{digest}", data=data).status_code == 201
+    assert server.put(f"/assets/{digest}", data=data).status_code == 200
+    assert server.head(f"/assets/{digest}").status_code == 200
+    assert server.put(f"/assets/{'0' * 16}", data=data).status_code == 400
+
+
+def test_render_asks_for_missing_assets_then_reuses_the_output(server):
+    data = b"background"
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    payload = {"slides": SLIDES, "theme": {"brand_color": "#123456"}, "assets": {"background": digest}, "inline": True}
+
+    response = server.post("/render", json=payload)
+    assert response.status_code == 409
+    assert response.get_json()["missing"] == [digest]
+
+    server.put(f"/assets/{digest}", data=data)
+    first = server.post("/render", json=payload).get_json()
+    assert first["cached"] is False
+    assert [base64.b64decode(image["data"]) for image in first["images"]] == [b"Hello", b"Bye"]
+    assert server.renders[0]["background"].endswith(digest)
+    assert server.get(first["images"][0]["url"]).data == b"Hello"
+
+    second = server.post("/render", json=payload).get_json()
+    assert second["cached"] is True
+    assert second["job"] == first["job"]
+    assert len(server.renders) == 1
+
+
+def test_render_refuses_server_paths_and_urls_as_backgrounds(server):
+    for url in ("/etc/hostname", "file:///etc/hostname", "http://169.254.169.254/latest/meta-data/"):
+        response = server.post("/render", json={"slides": SLIDES, "bg_mode": "Uploaded Image", "bg_image_url": url})
+        assert response.status_code == 400
+    assert server.renders == []
+
+
+def test_failed_renders_release_their_job_lock(server):
+    assert server.post("/render", json={"slides": []}).status_code == 400
+    response = server.post("/render", json={"slides": [{"layout": "layout-cover", "title": "Crash"}]})
+    assert response.status_code == 500
+    assert "tab crashed" in response.get_json()["error"]
+    assert len(server.application.extensions["render_job_locks"]) == 0
+
+
+def test_client_uploads_remote_backgrounds_as_assets(server, monkeypatch):
+    import render_client
+
+    def request(self, method, path, body=None, headers=None):
+        response = server.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.data
+
+    assert render_client._download("/etc/hostname") is None
+    monkeypatch.setattr(render_client.RenderClient, "request", request)
+    monkeypatch.setattr(render_client, "_download", lambda url: b"remote image")
+    client = render_client.RenderClient(url="http://render.invalid")
+    result = client.render(SLIDES, {}, bg_image_url="https://example.com/bg.png", bg_mode="Uploaded Image")
+
+    assert len(result["images"]) == 2
+    assert server.renders[0]["background"].endswith(hashlib.sha256(b"remote image").hexdigest()[:16])
@@ -0,0 +1,79 @@
+import gc
+import os
+import pytest
+from PIL import Image
+import output_store
+import slide_assets
+from config import PREWARM_SETTINGS, SERVING_SETTINGS
+
+
+@pytest.fixture
+def slide(tmp_path):
+    store = output_store.OutputStore(str(tmp_path / "out"), use_tmpfs=False)
+    session_id, job_dir = store.create_job_dir()
+    path = os.path.join(job_dir, "slide_1.png")
+    Image.new("RGB", (1080, 1350), "navy").save(path)
+    return store, session_id, path
+
+
+@pytest.fixture
+def client(monkeypatch, slide):
+    monkeypatch.setitem(PREWARM_SETTINGS, "enabled", False)
+    monkeypatch.setattr(output_store, "start_cache_gc", lambda: None)
+    import app as app_module
+    monkeypatch.setattr(app_module, "output_store", slide[0])
+    return app_module.app.test_client()
+
+
+def slide_url(session_id, path, query=""):
+    return f"/slides/{session_id}/{slide_assets.content_hash(path)}/slide_1.png{query}"
+
+
+def test_hash_urls_are_immutable_and_revalidate_with_etags(client, slide):
+    _, session_id, path = slide
+    response = client.get(slide_url(session_id, path))
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.cache_control.immutable and response.cache_control.public
+    assert response.cache_control.max_age == SERVING_SETTINGS["max_age_seconds"]
+
+    etag = response.headers["ETag"]
+    assert client.get(slide_url(session_id, path), headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_ranges_and_variants(client, slide):
+    _, session_id, path = slide
+    response = client.get(slide_url(session_id, path), headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert len(response.data) == 100
+
+    response = client.get(slide_url(session_id, path, "?w=360&fmt=webp"))
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    with Image.open(slide_assets.variant_path(path, 360, "webp")) as image:
+        assert image.size == (360, 450)
+
+    assert client.get(slide_url(session_id, path, "?w=123")).status_code == 400
+    assert client.get(slide_url(session_id, path, "?fmt=gif")).status_code == 400
+    assert client.get(f"/slides/{session_id}/{slide_assets.content_hash(path)}/slide_9.png").status_code == 404
+
+
+def test_stale_hash_redirects_to_the_current_content(client, slide):
+    _, session_id, path = slide
+    old_url = slide_url(session_id, path)
+    Image.new("RGB", (1080, 1350), "teal").save(path)
+    response = client.get(old_url)
+    assert response.status_code == 302
+    assert slide_assets.content_hash(path) in response.headers["Location"]
+
+
+def test_caches_do_not_grow_without_bound(monkeypatch, tmp_path):
+    monkeypatch.setitem(SERVING_SETTINGS, "hash_cache_size", 3)
+    for i in range(10):
+        path = tmp_path / f"slide_{i}.png"
+        Image.new("RGB", (8, 8), (i, 0, 0)).save(path)
+        slide_assets.content_hash(str(path))
+        slide_assets.variant_path(str(path), fmt="webp")
+    assert len(slide_assets._hash_cache) <= 3
+    gc.collect()
+    assert len(slide_assets._locks) == 0
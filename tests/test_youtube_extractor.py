@@ -0,0 +1,70 @@
+import time
+import threading
+import metrics
+from benchmarks.fixtures import FakeYoutube
+from youtube_extractor import ingest_source
+
+PLAYLIST = "https://www.youtube.com/playlist?list=PLfixture"
+
+
+def test_ingest_source_retries_transient_failures_only():
+    youtube = FakeYoutube(num_videos=10, flaky={"vid00001", "vid00002"})
+    results = {r["id"]: r for r in ingest_source(PLAYLIST, max_workers=3, extract=youtube.extract, fetch=youtube.fetch, backoff_s=0)}
+
+    assert len(results) == 10
+    for video_id in ("vid00001", "vid00002"):
+        assert results[video_id]["error"] is None
+        assert results[video_id]["attempts"] == 2
+        assert results[video_id]["text"]
+    # No subtitles is permanent: reported after one attempt
+    assert "No English subtitles" in results["vid00004"]["error"]
+    assert results["vid00004"]["attempts"] == 1
+    assert results["vid00000"]["attempts"] == 1 and results["vid00000"]["thumbnail"]
+
+
+def test_ingest_source_gives_up_after_the_retries():
+    youtube = FakeYoutube(num_videos=3)
+    attempts = []
+
+    def extract(url, flat=False):
+        if "watch?v=vid00000" in url:
+            attempts.append(url)
+            raise ConnectionError("HTTP Error 503")
+        return youtube.extract(url, flat)
+
+    results = {r["id"]: r for r in ingest_source(PLAYLIST, retries=2, extract=extract, fetch=youtube.fetch, backoff_s=0)}
+    assert results["vid00000"]["attempts"] == 3
+    assert "503" in results["vid00000"]["error"]
+    assert len(attempts) == 3
+    assert results["vid00001"]["error"] is None
+
+
+def test_closing_early_cancels_the_remaining_videos():
+    youtube = FakeYoutube(num_videos=40, latency=0.02)
+    fetched = []
+    lock = threading.Lock()
+
+    def fetch(url):
+        with lock:
+            fetched.append(url)
+        return youtube.fetch(url)
+
+    results = ingest_source(PLAYLIST, max_workers=2, extract=youtube.extract, fetch=fetch, backoff_s=0)
+    next(results)
+    results.close()
+    time.sleep(0.3)
+    # Only the videos already running when the consumer stopped are finished
+    assert len(fetched) <= 4
+
+
+def test_workers_inherit_the_job_context():
+    youtube = FakeYoutube(num_videos=4)
+    seen = set()
+
+    def fetch(url):
+        seen.add(metrics._current_job.get())
+        return youtube.fetch(url)
+
+    with metrics.job_context("job-123"):
+        list(ingest_source(PLAYLIST, extract=youtube.extract, fetch=fetch, backoff_s=0))
+    assert seen == {"job-123"}
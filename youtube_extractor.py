@@ -1,104 +1,220 @@
-import yt_dlp
 import json
 import os
+import time
+from metrics import timed, increment
 
-def get_transcript_text(video_url):
+@timed("transcript_parse")
+def parse_subtitle_content(content):
+    """
+    Extracts plain transcript text from a json3 or VTT/SRT subtitle payload.
+    """
+    # Parse JSON3 format (common for YouTube subs) or VTT/SRT
+    # YouTube usually returns a custom JSON format if we use the internal API, 
+    # but yt-dlp exposes standard formats in the 'url'.
+    # The URL usually points to a 'srv1', 'json3', or 'vtt' format.
+    # Let's try to parse it as simple text if it's VTT/SRT, or JSON if it looks like JSON.
+    
+    transcript_text = ""
+    
+    # Simple parsing logic
+    if content.strip().startswith('{'):
+        # JSON format (json3)
+        try:
+            data = json.loads(content)
+            events = data.get('events', [])
+            text_parts = []
+            for event in events:
+                segs = event.get('segs', [])
+                for seg in segs:
+                    text_parts.append(seg.get('utf8', ''))
+            transcript_text = " ".join(text_parts).strip()
+        except:
+            pass
+    
+    if not transcript_text:
+        # Fallback: Remove timestamps from VTT/SRT-like text
+        # This is a rough heuristic
+        lines = content.split('\n')
+        clean_lines = []
+        for line in lines:
+            line = line.strip()
+            if not line: continue
+            if '-->' in line: continue # Timestamp
+            if line.isdigit(): continue # Index
+            if line.startswith('WEBVTT'): continue
+            if line.startswith('Kind:'): continue
+            if line.startswith('Language:'): continue
+            clean_lines.append(line)
+        
+        transcript_text = " ".join(clean_lines)
+    
+    return transcript_text
+
+YDL_OPTS = {
+    'skip_download': True,
+    'writesubtitles': True,
+    'writeautomaticsub': True,
+    'subtitleslangs': ['en'],
+    'quiet': True,
+    'no_warnings': True,
+}
+
+
+def extract_info(url, flat=False):
+    """
+    Runs yt-dlp metadata extraction. With `flat`, playlist and channel
+    entries are listed without resolving each video.
+    """
+    opts = dict(YDL_OPTS, extract_flat='in_playlist') if flat else YDL_OPTS
+    import yt_dlp
+    # A fresh YoutubeDL per call: instances aren't safe to share across threads
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        return ydl.extract_info(url, download=False)
+
+
+def fetch_url(url):
+    import requests
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    return response.text
+
+
+def select_subtitle_url(info):
+    """
+    Picks the English subtitle track, preferring manual over auto-generated.
+    """
+    subtitles = info.get('subtitles') or {}
+    auto_subtitles = info.get('automatic_captions') or {}
+    for tracks in (subtitles, auto_subtitles):
+        if 'en' in tracks:
+            return tracks['en'][0]['url']
+    for tracks in (subtitles, auto_subtitles):
+        for lang in tracks:
+            if lang.startswith('en'):
+                return tracks[lang][0]['url']
+    raise ValueError("No English subtitles found (manual or auto-generated).")
+
+
+@timed("transcript_fetch")
+def get_transcript_text(video_url, extract=None, fetch=None):
+    """
+    Returns (transcript_text, thumbnail_url) for one video.
+    `extract`/`fetch` replace the yt-dlp and HTTP calls (e.g. with recorded
+    fixtures). Raises ValueError on failure.
+    """
     if not video_url:
         raise ValueError("Invalid YouTube URL")
-    
+    extract = extract or extract_info
+    fetch = fetch or fetch_url
+
     try:
-        # Configure yt-dlp to download subtitles (auto or manual)
-        # We don't want to download the video, just the subs
-        ydl_opts = {
-            'skip_download': True,
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'subtitleslangs': ['en'],
-            'quiet': True,
-            'no_warnings': True,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
-            
-            # Check for subtitles
-            subtitles = info.get('subtitles', {})
-            auto_subtitles = info.get('automatic_captions', {})
-            
-            # Prefer manual English subs
-            if 'en' in subtitles:
-                subs_url = subtitles['en'][0]['url']
-            # Fallback to auto-generated English subs
-            elif 'en' in auto_subtitles:
-                subs_url = auto_subtitles['en'][0]['url']
-            else:
-                # Try to find any english variant
-                found = False
-                for lang in subtitles:
-                    if lang.startswith('en'):
-                        subs_url = subtitles[lang][0]['url']
-                        found = True
-                        break
-                if not found:
-                    for lang in auto_subtitles:
-                        if lang.startswith('en'):
-                            subs_url = auto_subtitles[lang][0]['url']
-                            found = True
-                            break
-                if not found:
-                    raise ValueError("No English subtitles found (manual or auto-generated).")
-
-            # Extract thumbnail URL
-            thumbnail_url = info.get('thumbnail')
-            
-            # Download the subtitle content
-            # Since we have the URL, we can fetch it using requests (lighter than letting yt-dlp write to disk and parsing)
-            import requests
-            response = requests.get(subs_url)
-            response.raise_for_status()
-            
-            # Parse JSON3 format (common for YouTube subs) or VTT/SRT
-            # YouTube usually returns a custom JSON format if we use the internal API, 
-            # but yt-dlp exposes standard formats in the 'url'.
-            # The URL usually points to a 'srv1', 'json3', or 'vtt' format.
-            # Let's try to parse it as simple text if it's VTT/SRT, or JSON if it looks like JSON.
-            
-            content = response.text
-            transcript_text = ""
-            
-            # Simple parsing logic
-            if content.strip().startswith('{'):
-                # JSON format (json3)
-                try:
-                    data = json.loads(content)
-                    events = data.get('events', [])
-                    text_parts = []
-                    for event in events:
-                        segs = event.get('segs', [])
-                        for seg in segs:
-                            text_parts.append(seg.get('utf8', ''))
-                    transcript_text = " ".join(text_parts).strip()
-                except:
-                    pass
-            
-            if not transcript_text:
-                # Fallback: Remove timestamps from VTT/SRT-like text
-                # This is a rough heuristic
-                lines = content.split('\n')
-                clean_lines = []
-                for line in lines:
-                    line = line.strip()
-                    if not line: continue
-                    if '-->' in line: continue # Timestamp
-                    if line.isdigit(): continue # Index
-                    if line.startswith('WEBVTT'): continue
-                    if line.startswith('Kind:'): continue
-                    if line.startswith('Language:'): continue
-                    clean_lines.append(line)
-                
-                transcript_text = " ".join(clean_lines)
-            
-            return transcript_text, thumbnail_url
+        with timed("ytdlp_extract_info"):
+            info = extract(video_url)
+        subs_url = select_subtitle_url(info)
+
+        # Fetching the track ourselves is lighter than letting yt-dlp write to disk
+        with timed("subtitle_download"):
+            content = fetch(subs_url)
+
+        return parse_subtitle_content(content), info.get('thumbnail')
 
     except Exception as e:
         raise ValueError(f"yt-dlp failed: {str(e)}")
+
+
+def _video_url(entry):
+    url = entry.get('url') or entry.get('webpage_url') or ""
+    if url.startswith('http'):
+        return url
+    return f"https://www.youtube.com/watch?v={entry.get('id') or url}"
+
+
+def _is_video(entry):
+    if entry.get('ie_key') == 'Youtube' or entry.get('_type') == 'video':
+        return True
+    url = entry.get('url') or ''
+    return '/watch' in url or '/shorts/' in url
+
+
+@timed("source_expand")
+def expand_source(url, extract=None, limit=None, max_depth=2):
+    """
+    Lists the videos behind a video, playlist or channel URL using flat
+    (metadata-only) extraction. Channel tabs and nested playlists are
+    followed up to `max_depth`. Returns [{"id", "url", "title"}] in order.
+    """
+    extract = extract or extract_info
+    videos = []
+    seen = set()
+
+    def walk(info, depth):
+        if limit and len(videos) >= limit:
+            return
+        entries = info.get('entries')
+        if entries is None:
+            video_id = info.get('id')
+            if video_id and video_id not in seen:
+                seen.add(video_id)
+                videos.append({"id": video_id, "url": _video_url(info), "title": info.get('title')})
+            return
+        for entry in entries:
+            if not entry or (limit and len(videos) >= limit):
+                continue
+            if entry.get('entries') is not None:
+                walk(entry, depth)
+            elif _is_video(entry):
+                walk(dict(entry, entries=None), depth)
+            elif depth < max_depth and entry.get('url'):
+                # A channel tab or nested playlist: list it too
+                try:
+                    walk(extract(entry['url'], flat=True), depth + 1)
+                except Exception as e:
+                    print(f"Could not expand {entry['url']}: {e}")
+
+    walk(extract(url, flat=True), 0)
+    return videos
+
+
+def ingest_source(url, max_workers=4, retries=2, limit=None, extract=None, fetch=None, backoff_s=1.0):
+    """
+    Expands a playlist/channel and fetches every video's transcript on a
+    bounded worker pool. Yields one result dict per video as it completes:
+    {"id", "url", "title", "text", "thumbnail", "error", "attempts"}.
+    Failures are reported per video; transient ones are retried.
+    """
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    extract = extract or extract_info
+    videos = expand_source(url, extract=extract, limit=limit)
+
+    def work(video):
+        result = dict(video, text=None, thumbnail=None, error=None, attempts=0)
+        for attempt in range(retries + 1):
+            result["attempts"] = attempt + 1
+            try:
+                result["text"], result["thumbnail"] = get_transcript_text(video["url"], extract=extract, fetch=fetch)
+                result["error"] = None
+                return result
+            except ValueError as e:
+                result["error"] = str(e)
+                # Missing subtitles won't appear on retry
+                if "No English subtitles" in result["error"] or attempt == retries:
+                    return result
+                time.sleep(backoff_s * (2 ** attempt))
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = []
+    try:
+        # Each worker runs in a copy of the caller's context, so job_context carries over
+        futures = [pool.submit(contextvars.copy_context().run, work, video) for video in videos]
+        for future in as_completed(futures):
+            result = future.result()
+            increment("videos_ingested", ok=str(result["error"] is None).lower())
+            yield result
+    finally:
+        # The consumer may stop early (or the generator be closed); don't fetch the rest
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)